@@ -0,0 +1,276 @@
+#!/usr/bin/python3
+# throughput benchmark of SmartConnector against the local stand-in of Management Web API (see standin.py)
+# the reference input of each size is generated, smartconnector.py is run against empty stand-in server and
+# objects/sec, requests per object and wall time are reported for the whole run and for each phase of migration
+# example: python benchmark.py --sizes 100,1000 --latency add=20,show=20,publish=500 --connector-args "--workers 4"
+
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+
+from standin import StandInServer, installStandIn
+
+smartConnectorFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "smartconnector.py")
+
+# the phase of migration (key), the function of SmartConnector and the keys of input objects which are processed
+# in the phase (value); the phase name is the one which is printed by printMessageProcessObjects
+phasesObjects = {
+    "domains": ("processDomains", ["CheckPoint_Domain"]),
+    "hosts": ("processHosts", ["CheckPoint_Host"]),
+    "networks": ("processNetworks", ["CheckPoint_Network"]),
+    "ranges": ("processRanges", ["CheckPoint_Range"]),
+    "network groups": ("processNetGroups", ["CheckPoint_NetworkGroup", "CheckPoint_GroupWithExclusion"]),
+    "simple gateways": ("processSimpleGateways", ["CheckPoint_SimpleGateway"]),
+    "zones": ("processZones", ["CheckPoint_Zone"]),
+    "tcp services": ("processServices", ["CheckPoint_TcpService"]),
+    "udp services": ("processServices", ["CheckPoint_UdpService"]),
+    "sctp services": ("processServices", ["CheckPoint_SctpService"]),
+    "icmp services": ("processServices", ["CheckPoint_IcmpService"]),
+    "other services": ("processServices", ["CheckPoint_OtherService"]),
+    "services groups": ("processServicesGroups", ["CheckPoint_ServiceGroup"]),
+    "times groups": ("processTimesGroups", ["CheckPoint_TimeGroup"]),
+    "times": ("processTimes", ["CheckPoint_Time"]),
+    "package": ("processPackage/addAccessRules", ["CheckPoint_Layer", "CheckPoint_Rule"]),
+    "nat rules": ("processNatRules", ["CheckPoint_NAT_Rule"])
+}
+
+
+# providing the common fields of input object
+def provideUserObject(typeName, name):
+    return {"TypeName": typeName, "Name": name, "Comments": "", "Tags": [], "ConversionComments": ""}
+
+
+def provideUserRule(name, layerName, sources, destinations, services, action=0, subPolicyName=""):
+    userRule = provideUserObject("CheckPoint_Rule", name)
+    userRule.update({"Layer": layerName, "Source": [{"Name": source} for source in sources],
+                     "Destination": [{"Name": destination} for destination in destinations],
+                     "Service": [{"Name": service} for service in services], "Time": [{"Name": "Any"}],
+                     "Action": action, "SubPolicyName": subPolicyName, "SourceNegated": False,
+                     "DestinationNegated": False, "Enabled": True, "Track": 1})
+    return userRule
+
+
+# generating the reference input of size: the number of hosts is the size, the other objects are proportional
+# size - the number of hosts
+# fileName - the name of JSON file which is written
+# ---
+# returns: the number of input objects of each type: TypeName (key) and the number (value)
+def generateReferenceInput(size, fileName):
+    userObjects = [provideUserObject("CheckPoint_Domain", ".example.com")]
+    userObjects[0]["IsSubDomain"] = False
+    hostsNames = []
+    for i in range(size):
+        hostsNames.append("host_" + str(i))
+        # each 50th host has the IP of previous host, so IP duplication is processed
+        hostIndex = i - 1 if i % 50 == 49 else i
+        userObjects.append(dict(provideUserObject("CheckPoint_Host", hostsNames[-1]),
+                                IpAddress="10." + str(hostIndex // 62500) + "." + str(hostIndex // 250 % 250) + "." +
+                                          str(hostIndex % 250 + 1)))
+    networksNames = []
+    for i in range(max(size // 4, 1)):
+        networksNames.append("net_" + str(i))
+        userObjects.append(dict(provideUserObject("CheckPoint_Network", networksNames[-1]),
+                                Subnet="172." + str(16 + i // 256 % 16) + "." + str(i % 256) + ".0",
+                                Netmask="255.255.255.0", MaskLength=None))
+    for i in range(max(size // 20, 1)):
+        userObjects.append(dict(provideUserObject("CheckPoint_Range", "range_" + str(i)),
+                                RangeFrom="192.168." + str(i % 256) + ".1", RangeTo="192.168." + str(i % 256) + ".99"))
+    groupsNames = []
+    for i in range(max(size // 20, 1)):
+        groupsNames.append("group_" + str(i))
+        members = [hostsNames[(i * 20 + j) % size] for j in range(15)] + \
+                  [networksNames[(i * 5 + j) % len(networksNames)] for j in range(5)]
+        if i > 0 and i % 10 == 0:
+            members.append(groupsNames[i - 1])
+        userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", groupsNames[-1]), Members=members))
+    userObjects.append(dict(provideUserObject("CheckPoint_GroupWithExclusion", "group_exclusion"),
+                            Include=groupsNames[-1], Except=groupsNames[0]))
+    userObjects.append(dict(provideUserObject("CheckPoint_SimpleGateway", "gateway"), IpAddress="192.0.2.1"))
+    userObjects.append(provideUserObject("CheckPoint_Zone", "zone"))
+    servicesNames = []
+    for i in range(max(size // 10, 1)):
+        servicesNames.append("tcp_" + str(10000 + i))
+        userObjects.append(dict(provideUserObject("CheckPoint_TcpService", servicesNames[-1]), Port=str(10000 + i),
+                                SourcePort=None, SessionTimeout=3600))
+    for i in range(max(size // 20, 1)):
+        servicesNames.append("udp_" + str(20000 + i))
+        userObjects.append(dict(provideUserObject("CheckPoint_UdpService", servicesNames[-1]), Port=str(20000 + i),
+                                SourcePort=None, SessionTimeout=40))
+    userObjects.append(dict(provideUserObject("CheckPoint_IcmpService", "icmp_echo"), Type="8", Code="0"))
+    userObjects.append(dict(provideUserObject("CheckPoint_OtherService", "gre"), IpProtocol="47"))
+    servicesGroupsNames = []
+    for i in range(max(size // 50, 1)):
+        servicesGroupsNames.append("services_group_" + str(i))
+        userObjects.append(dict(provideUserObject("CheckPoint_ServiceGroup", servicesGroupsNames[-1]),
+                                Members=[servicesNames[(i * 10 + j) % len(servicesNames)] for j in range(10)]))
+    userTime = provideUserObject("CheckPoint_Time", "work_hours")
+    userTime.update({"StartNow": True, "StartDate": None, "StartTime": None, "EndNever": True, "EndDate": None,
+                     "EndTime": None, "HoursRangesEnabled_1": True, "HoursRangesFrom_1": "08:00",
+                     "HoursRangesTo_1": "17:00", "HoursRangesEnabled_2": False, "HoursRangesFrom_2": None,
+                     "HoursRangesTo_2": None, "HoursRangesEnabled_3": False, "HoursRangesFrom_3": None,
+                     "HoursRangesTo_3": None, "RecurrencePattern": 2, "RecurrenceWeekdays": [1, 2, 3, 4, 5]})
+    userObjects.append(userTime)
+    userObjects.append(dict(provideUserObject("CheckPoint_TimeGroup", "work_times"), Members=["work_hours"]))
+    subRules = [provideUserRule("sub_rule_" + str(i), "sub_layer", [hostsNames[i % size]], ["Any"],
+                                [servicesNames[i % len(servicesNames)]]) for i in range(max(size // 10, 1))]
+    parentRules = [provideUserRule("rule_" + str(i), "benchmark Network", [groupsNames[i % len(groupsNames)]],
+                                   [networksNames[i % len(networksNames)]],
+                                   [servicesGroupsNames[i % len(servicesGroupsNames)]])
+                   for i in range(max(size // 2, 1))]
+    parentRules.insert(0, provideUserRule("to_sub_layer", "benchmark Network", ["Any"], ["Any"], ["Any"], action=3,
+                                          subPolicyName="sub_layer"))
+    parentRules.append(provideUserRule("cleanup", "benchmark Network", ["Any"], ["Any"], ["Any"], action=1))
+    userPackage = provideUserObject("CheckPoint_Package", "benchmark")
+    userPackage["SubPolicies"] = [dict(provideUserObject("CheckPoint_Layer", "sub_layer"), Rules=subRules,
+                                       ApplicationsAndUrlFiltering=False)]
+    userPackage["ParentLayer"] = dict(provideUserObject("CheckPoint_Layer", "benchmark Network"), Rules=parentRules)
+    userObjects.append(userPackage)
+    for i in range(max(size // 10, 1)):
+        userNatRule = provideUserObject("CheckPoint_NAT_Rule", "")
+        userNatRule.update({"Source": {"Name": hostsNames[i % size]}, "Destination": None, "Service": None,
+                            "TranslatedSource": {"Name": hostsNames[(i + 1) % size]}, "TranslatedDestination": None,
+                            "TranslatedService": None, "Method": 1, "Enabled": True})
+        userObjects.append(userNatRule)
+    with open(fileName, "w") as inputFile:
+        json.dump(userObjects, inputFile)
+    objectsCounts = {}
+    for userObject in userObjects:
+        objectsCounts[userObject['TypeName']] = objectsCounts.get(userObject['TypeName'], 0) + 1
+    objectsCounts["CheckPoint_Layer"] = 2
+    objectsCounts["CheckPoint_Rule"] = len(subRules) + len(parentRules) - 1
+    return objectsCounts
+
+
+# providing the phase of current request from the state of running smartconnector.py, see printMessageProcessObjects
+# ---
+# returns: the phase or None if it is not set
+def provideSmartConnectorPhase():
+    apiCallState = getattr(sys.modules.get("__main__"), "apiCallState", None)
+    return getattr(apiCallState, "phase", None)
+
+
+# running smartconnector.py against the stand-in server in directory
+# server - the stand-in server
+# workDir - the directory where input is located and where the logs are written
+# connectorArgs - the list of additional arguments of smartconnector.py
+# ---
+# returns: the wall time of run in seconds
+def runSmartConnector(server, workDir, connectorArgs):
+    installStandIn(server)
+    currentDir = os.getcwd()
+    currentArgv = sys.argv
+    os.chdir(workDir)
+    sys.argv = [smartConnectorFile, "-r", "-f", "cp_objects.json"] + connectorArgs
+    start = time.time()
+    try:
+        with open("console.out", "w") as consoleFile, contextlib.redirect_stdout(consoleFile):
+            runpy.run_path(smartConnectorFile, run_name="__main__")
+    except SystemExit:
+        pass
+    finally:
+        os.chdir(currentDir)
+        sys.argv = currentArgv
+    return time.time() - start
+
+
+# collecting the statistics of run from the requests which are recorded by the stand-in server
+# server - the stand-in server
+# objectsCounts - the number of input objects by TypeName
+# wallTime - the wall time of run in seconds
+# ---
+# returns: the statistics of run and its phases
+def collectStatistics(server, objectsCounts, wallTime):
+    phasesCalls = {}
+    for call in server.calls:
+        phasesCalls.setdefault(call['phase'] or "session", []).append(call)
+    phases = []
+    for phase, calls in phasesCalls.items():
+        function, typeNames = phasesObjects.get(phase, ("", []))
+        objectsCount = sum(objectsCounts.get(typeName, 0) for typeName in typeNames)
+        phaseTime = max(call['start'] + call['time'] for call in calls) - min(call['start'] for call in calls)
+        phases.append({"phase": phase, "function": function, "objects": objectsCount, "calls": len(calls),
+                       "failed-calls": len([call for call in calls if not call['success']]),
+                       "wall-time": round(phaseTime, 3),
+                       "objects-per-second":
+                           round(objectsCount / phaseTime, 1) if phaseTime > 0 and objectsCount > 0 else None,
+                       "calls-per-object": round(len(calls) / objectsCount, 2) if objectsCount > 0 else None})
+    objectsCount = sum(objectsCounts.get(typeName, 0)
+                       for function, typeNames in phasesObjects.values() for typeName in typeNames)
+    return {"objects": objectsCount, "calls": len(server.calls), "publishes": server.publishCount,
+            "wall-time": round(wallTime, 3), "objects-per-second": round(objectsCount / wallTime, 1),
+            "calls-per-object": round(len(server.calls) / objectsCount, 2), "phases": phases}
+
+
+def printStatistics(size, statistics):
+    print("size " + str(size) + ": " + str(statistics['objects']) + " objects, " + str(statistics['calls']) +
+          " requests, " + str(statistics['publishes']) + " publishes, " + str(statistics['wall-time']) + " seconds, " +
+          str(statistics['objects-per-second']) + " objects/sec, " + str(statistics['calls-per-object']) +
+          " requests/object")
+    print("\t{:<16} {:<30} {:>8} {:>8} {:>7} {:>10} {:>12} {:>12}".format(
+        "phase", "function", "objects", "requests", "failed", "wall, sec", "objects/sec", "requests/obj"))
+    for phase in statistics['phases']:
+        print("\t{:<16} {:<30} {:>8} {:>8} {:>7} {:>10} {:>12} {:>12}".format(
+            phase['phase'], phase['function'], phase['objects'], phase['calls'], phase['failed-calls'],
+            phase['wall-time'], str(phase['objects-per-second']), str(phase['calls-per-object'])))
+    print("")
+
+
+# parsing the latencies of commands, e.g. add-host=30,show=20
+def parseLatencies(latenciesArg):
+    latencies = {}
+    for latency in latenciesArg.split(","):
+        if "=" in latency:
+            command, milliseconds = latency.split("=", 1)
+            latencies[command.strip()] = float(milliseconds)
+    return latencies
+
+
+args_parser = argparse.ArgumentParser()
+
+args_parser._optionals.title = "arguments"
+
+args_parser.add_argument('--sizes', default="100,1000",
+                         help="Comma separated reference input sizes: the number of hosts, the number of other objects "
+                              "is proportional. Default: 100,1000")
+args_parser.add_argument('--latency', default="",
+                         help="Comma separated latencies of commands at stand-in server in milliseconds, the command "
+                              "or its verb can be set, e.g. add-host=30,show=20,publish=800. "
+                              "Default: login=50,add=20,set=20,delete=20,show=20,publish=500")
+args_parser.add_argument('--publish-latency-per-change', type=float, default=1.0,
+                         help="The latency of publish in milliseconds which is added for each published change. "
+                              "Default: 1")
+args_parser.add_argument('--connector-args', default="",
+                         help="Additional arguments of smartconnector.py, e.g. \"--workers 4 --batch-size 100\"")
+args_parser.add_argument('--output',
+                         help="The name of JSON file where the statistics of all sizes are written.")
+args_parser.add_argument('--keep-dir',
+                         help="The directory where the inputs and the logs of runs are kept. "
+                              "The temporary directory is used and removed by default.")
+
+if __name__ == "__main__":
+    args = args_parser.parse_args()
+    baseDir = args.keep_dir if args.keep_dir is not None else tempfile.mkdtemp(prefix="smartconnector_benchmark_")
+    allStatistics = {}
+    try:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            workDir = os.path.join(baseDir, "size_" + str(size))
+            os.makedirs(workDir, exist_ok=True)
+            objectsCounts = generateReferenceInput(size, os.path.join(workDir, "cp_objects.json"))
+            server = StandInServer(parseLatencies(args.latency), args.publish_latency_per_change,
+                                   provideSmartConnectorPhase)
+            wallTime = runSmartConnector(server, workDir, shlex.split(args.connector_args))
+            allStatistics[size] = collectStatistics(server, objectsCounts, wallTime)
+            printStatistics(size, allStatistics[size])
+    finally:
+        if args.keep_dir is None:
+            shutil.rmtree(baseDir, ignore_errors=True)
+    if args.output is not None:
+        with open(args.output, "w") as outputFile:
+            json.dump(allStatistics, outputFile, indent=2)
@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+# simulated server of --plan mode of SmartConnector: the requests are counted by phases instead of sending to server
+# the server keeps the objects which are added by the run and the objects of inventory cache, so the names and IPs
+# are duplicated as at real server and SmartConnector makes the same decisions and requests
+# the module is loaded by smartconnector.py only in --plan mode, see provideApiClient of smartconnector.py
+
+import json
+import threading
+import time
+import uuid
+
+
+# the response of simulated server, it has the fields of cpapi response which are used by SmartConnector
+class PlanResponse:
+    def __init__(self, data, success=True):
+        self.data = data
+        self.success = success
+        self.status_code = 200 if success else 400
+        self.error_message = "" if success else data.get('message', "")
+
+
+# the simulated server which is shared by all sessions (clients)
+class PlanServer:
+    # providePhase - function which returns the phase of current request (e.g. hosts), the requests are counted by it
+    # provideIpKeys - function which returns the keys of IPs of host or network, the objects with the same key
+    #                 have the same IP
+    def __init__(self, providePhase, provideIpKeys):
+        self.providePhase = providePhase
+        self.provideIpKeys = provideIpKeys
+        # the name (key) and the object (value) of objects which exist at simulated server
+        self.objects = {}
+        # the phase (key) and the map of command and number of requests (value)
+        self.calls = {}
+        self.publishTime = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+        self.lock = threading.Lock()
+
+    # counting the request by the phase of current thread
+    def countCall(self, command):
+        phase = self.providePhase() or "session"
+        with self.lock:
+            phaseCalls = self.calls.setdefault(phase, {})
+            phaseCalls[command] = phaseCalls.get(command, 0) + 1
+
+    # loading the objects of the entry of inventory cache, the server is published at the time of entry
+    # returns the number of objects at server
+    def loadInventory(self, cachedEntry):
+        with self.lock:
+            for serverObjects in cachedEntry['objects'].values():
+                for serverObject in serverObjects:
+                    self.objects[serverObject['name']] = serverObject
+            self.publishTime = cachedEntry.get('publish-time', self.publishTime)
+            return len(self.objects)
+
+    # providing the objects which are read by show-* command
+    def provideServerObjects(self, command, payload):
+        objectsType = command[len("show-"):]
+        with self.lock:
+            serverObjects = list(self.objects.values())
+        if objectsType == "objects":
+            return [serverObject for serverObject in serverObjects
+                    if ('type' not in payload or serverObject['type'] == payload['type']) and
+                    payload.get('filter', "") in json.dumps(serverObject)]
+        if objectsType.startswith("services-"):
+            objectsType = "service-" + objectsType[len("services-"):]
+        else:
+            objectsType = objectsType[:-1]
+        return [serverObject for serverObject in serverObjects if serverObject['type'] == objectsType]
+
+    # adding the objects of add-* or add-objects-batch; the batch is added completely or it is not added
+    def addObjects(self, typedPayloads):
+        addedObjects = []
+        with self.lock:
+            for objectType, payload in typedPayloads:
+                if objectType in ("access-rule", "nat-rule"):
+                    addedObjects.append({"uid": str(uuid.uuid4()), "type": objectType})
+                    continue
+                if payload['name'] in self.objects:
+                    return PlanResponse({"message": "Validation failed",
+                                         "errors": [{"message": "More than one object named '" + payload['name'] +
+                                                                "' exists."}]}, False)
+                addedObject = dict(payload, uid=str(uuid.uuid4()), type=objectType, domain={"domain-type": "domain"})
+                addedObject.pop('ignore-warnings', None)
+                if objectType == "host":
+                    addedObject["ipv4-address" if ":" not in payload['ip-address'] else "ipv6-address"] = \
+                        payload['ip-address']
+                elif objectType == "network" and "mask-length6" in payload:
+                    addedObject["subnet6"] = payload['subnet']
+                elif objectType == "network":
+                    addedObject["subnet4"] = payload['subnet']
+                elif objectType == "address-range":
+                    ipVersion = "ipv4" if ":" not in payload['ip-address-first'] else "ipv6"
+                    addedObject[ipVersion + "-address-first"] = payload['ip-address-first']
+                    addedObject[ipVersion + "-address-last"] = payload['ip-address-last']
+                if objectType in ("host", "network") and not payload.get('ignore-warnings', False):
+                    addedObjectKeys = self.provideIpKeys(addedObject)
+                    for serverObject in self.objects.values():
+                        if serverObject['type'] == objectType and \
+                                not set(addedObjectKeys).isdisjoint(self.provideIpKeys(serverObject)):
+                            return PlanResponse({"message": "Validation failed", "warnings": [
+                                {"message": "Multiple objects have the same IP address " + payload.get(
+                                    'ip-address', payload.get('subnet'))}]}, False)
+                addedObjects.append(addedObject)
+            for addedObject in addedObjects:
+                if 'name' in addedObject:
+                    self.objects[addedObject['name']] = addedObject
+        if len(typedPayloads) > 1:
+            return PlanResponse({"tasks": [{"task-details": [{"objects": addedObjects}]}]})
+        return PlanResponse(addedObjects[0])
+
+    # providing the number of requests by phases and the projected time of run
+    # rtt - round trip time to server in milliseconds
+    # latencies - the command or verb (key) and the latency at server in milliseconds (value); the latency is found by
+    #             command, e.g. add-host, then by its verb, e.g. add
+    # returns the list of phases: the phase, the number of requests, the numbers of requests by verbs, the projected
+    #         time in seconds and the numbers of requests by commands
+    def provideReport(self, rtt, latencies):
+        report = []
+        with self.lock:
+            calls = [(phase, dict(phaseCalls)) for phase, phaseCalls in self.calls.items()]
+        for phase, phaseCalls in calls:
+            verbsCounts = {}
+            phaseTime = 0.0
+            for command, count in phaseCalls.items():
+                verb = command.split("-")[0] if command.split("-")[0] in ("add", "set", "show", "publish") else "other"
+                verbsCounts[verb] = verbsCounts.get(verb, 0) + count
+                latency = latencies[command] if command in latencies else latencies.get(command.split("-")[0], 0)
+                phaseTime += count * (rtt + latency) / 1000.0
+            report.append((phase, sum(phaseCalls.values()), verbsCounts, phaseTime, phaseCalls))
+        return report
+
+
+# the client of simulated server, it has the methods of cpapi APIClient which are used by SmartConnector
+class PlanClient:
+    def __init__(self, clientArgs, server):
+        self.clientArgs = clientArgs
+        self.server = server
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, excTraceback):
+        return False
+
+    def check_fingerprint(self):
+        return True
+
+    def login(self, user, password, domain=None, **kwargs):
+        return self.api_call("login", {})
+
+    def login_as_root(self, domain=None, **kwargs):
+        return self.api_call("login", {})
+
+    def login_with_api_key(self, key, domain=None, **kwargs):
+        return self.api_call("login", {})
+
+    def api_query(self, command, details_level="standard", container_key="objects", include_container_key=False,
+                  payload=None):
+        serverObjects = self.server.provideServerObjects(command, payload or {})
+        # the objects are read by pages of 50 objects as cpapi does
+        for offset in range(50, len(serverObjects), 50):
+            self.server.countCall(command)
+        return self.api_call(command, dict(payload or {}, objects=serverObjects))
+
+    def api_call(self, command, payload=None, sid=None, wait_for_task=True, timeout=-1):
+        payload = payload or {}
+        self.server.countCall(command)
+        if command == "add-objects-batch":
+            return self.server.addObjects([(objectsGroup['type'], dict(item)) for objectsGroup in payload['objects']
+                                           for item in objectsGroup['list']])
+        if command.startswith("add-"):
+            return self.server.addObjects([(command[len("add-"):], dict(payload))])
+        if command == "show-last-published-session":
+            return PlanResponse({"publish-time": {"iso-8601": self.server.publishTime}})
+        if command.startswith("show-") and 'objects' in payload:
+            return PlanResponse(payload['objects'])
+        return PlanResponse({})
@@ -0,0 +1,551 @@
+#!/usr/bin/python3
+# regression runs of SmartConnector against the local stand-in of Management Web API (see standin.py)
+# each scenario writes small input, runs smartconnector.py against the stand-in server and checks the objects at
+# server, the files which are written by the run and the state of run; the failed checks are printed and the exit
+# code is 1 if any check is failed
+# example: python regression.py --scenarios waves --keep-dir /tmp/regression
+
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import uuid
+
+from benchmark import generateReferenceInput, provideSmartConnectorPhase, provideUserObject, provideUserRule, \
+    smartConnectorFile
+from standin import StandInServer, installStandIn
+
+
+# adding the object to stand-in server as it was published before the run
+# server - the stand-in server
+# objectType - the type of object, e.g. host
+# name - the name of object
+# fields - the other fields of object
+# ---
+# returns: the object
+def provideServerObject(server, objectType, name, **fields):
+    serverObject = {"name": name, "uid": str(uuid.uuid4()), "type": objectType,
+                    "domain": {"domain-type": "domain", "name": "SMC User"}}
+    serverObject.update(fields)
+    server.objects[name] = serverObject
+    return serverObject
+
+
+# running smartconnector.py against the stand-in server in directory, the input is written to cp_objects.json
+# server - the stand-in server
+# workDir - the directory where input is located and where the logs are written
+# userObjects - the list of input objects
+# connectorArgs - the list of additional arguments of smartconnector.py
+# ---
+# returns: tuple of the globals of run (None if the run is exited) and the exit code
+def runSmartConnector(server, workDir, userObjects, connectorArgs):
+    with open(os.path.join(workDir, "cp_objects.json"), "w") as inputFile:
+        json.dump(userObjects, inputFile)
+    installStandIn(server)
+    currentDir = os.getcwd()
+    currentArgv = sys.argv
+    os.chdir(workDir)
+    sys.argv = [smartConnectorFile, "-r", "-f", "cp_objects.json"] + connectorArgs
+    try:
+        with open("console.out", "a") as consoleFile, contextlib.redirect_stdout(consoleFile):
+            return runpy.run_path(smartConnectorFile, run_name="__main__"), 0
+    except SystemExit as e:
+        return None, e.code if isinstance(e.code, int) else 1
+    finally:
+        os.chdir(currentDir)
+        sys.argv = currentArgv
+
+
+def provideStandInServer(latencies=None):
+    return StandInServer(dict({"login": 0, "add": 0, "set": 0, "delete": 0, "show": 0, "publish": 0},
+                              **(latencies or {})), 0, provideSmartConnectorPhase)
+
+
+# providing the objects of type at server: name (key) and the object without uid (value)
+def provideServerObjects(server, objectType):
+    return dict((name, dict((key, value) for key, value in serverObject.items() if key != "uid"))
+                for name, serverObject in server.objects.items() if serverObject['type'] == objectType)
+
+
+# providing the maximal number of requests of command which are handled by server at the same time
+# server - the stand-in server
+# command - the command or None for all commands
+# ---
+# returns: the number of requests
+def provideMaxConcurrency(server, command=None):
+    events = []
+    for call in server.calls:
+        if command is None or call['command'] == command:
+            events.append((call['start'], 1))
+            events.append((call['start'] + call['time'], -1))
+    concurrency = maxConcurrency = 0
+    # the request which is ended is counted before the request which is started at the same time
+    for eventTime, delta in sorted(events):
+        concurrency += delta
+        maxConcurrency = max(maxConcurrency, concurrency)
+    return maxConcurrency
+
+
+# providing the pairs of requests of command which are handled by server at the same time
+def provideOverlappingCalls(server, command):
+    calls = sorted((call for call in server.calls if call['command'] == command), key=lambda call: call['start'])
+    return [(call, otherCall) for i, call in enumerate(calls) for otherCall in calls[i + 1:]
+            if otherCall['start'] < call['start'] + call['time']]
+
+
+# providing the server object by uid or name which is the value of the maps of SmartConnector
+def findServerObject(server, value):
+    for serverObject in server.objects.values():
+        if value in (serverObject['uid'], serverObject['name']):
+            return serverObject
+    return None
+
+
+def check(failures, condition, message):
+    if not condition:
+        failures.append(message)
+
+
+# the hosts of wave scenarios: the IP of each 6th host is the IP of previous host, so it is collapsed before adding
+# (see collapseEquivalentObjects); the name and the IP of other 6th host are the name and the IP of previous host,
+# it is not collapsed since the name is repeated, so the wave keys separate the hosts; the name of one host and
+# the IP of other host exist at server
+def provideWavesHosts():
+    userHosts = []
+    for i in range(30):
+        userHosts.append(dict(provideUserObject("CheckPoint_Host", "host_" + str(i - 1 if i % 6 == 5 else i)),
+                              IpAddress="10.1.0." + str(i if i % 6 in (2, 5) else i + 1)))
+    userHosts.append(dict(provideUserObject("CheckPoint_Host", "existing_host"), IpAddress="10.1.1.1"))
+    userHosts.append(dict(provideUserObject("CheckPoint_Host", "server_ip_host"), IpAddress="10.1.1.2"))
+    return userHosts
+
+
+def provideWavesServer(latencies=None):
+    server = provideStandInServer(latencies)
+    provideServerObject(server, "host", "existing_host", **{"ipv4-address": "10.2.2.2"})
+    provideServerObject(server, "host", "server_host", **{"ipv4-address": "10.1.1.2"})
+    return server
+
+
+# wave scheduling of --in-flight: the hosts are added concurrently, the result at server is the same as the result
+# of adding one by one; --server-in-flight limits the requests of all sessions
+def checkWaves(workDir):
+    failures = []
+    results = {}
+    for inFlight, serverInFlight in ((1, 0), (4, 0), (4, 2)):
+        runDir = os.path.join(workDir, "in_flight_" + str(inFlight) + "_" + str(serverInFlight))
+        os.makedirs(runDir)
+        server = provideWavesServer({"add-host": 20})
+        runGlobals, exitCode = runSmartConnector(server, runDir, provideWavesHosts(),
+                                                 ["--in-flight", str(inFlight),
+                                                  "--server-in-flight", str(serverInFlight)])
+        check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'],
+              "run with --in-flight " + str(inFlight) + " is not completed")
+        results[(inFlight, serverInFlight)] = (provideServerObjects(server, "host"),
+                                               provideMaxConcurrency(server, "add-host"))
+        for call, otherCall in provideOverlappingCalls(server, "add-host"):
+            check(failures, call['payload']['ip-address'] != otherCall['payload']['ip-address'] and
+                  call['payload']['name'] != otherCall['payload']['name'],
+                  "--in-flight " + str(inFlight) + ": " + call['payload']['name'] + " and " +
+                  otherCall['payload']['name'] + " with the same key are added at the same time")
+    serverHosts, concurrency = results[(1, 0)]
+    check(failures, concurrency == 1, "--in-flight 1: " + str(concurrency) + " add-host requests at the same time")
+    # 20 hosts of 30: 5 hosts are collapsed and 5 hosts with repeated names are mapped to the first hosts by IP,
+    # existing_host is added as existing_host_1, server_ip_host is mapped to server_host
+    check(failures, len(serverHosts) == 23,
+          "--in-flight 1: " + str(len(serverHosts)) + " hosts at server instead of 23")
+    check(failures, "existing_host" in serverHosts and serverHosts["existing_host"]["ipv4-address"] == "10.2.2.2",
+          "--in-flight 1: existing host at server is changed")
+    for key in ((4, 0), (4, 2)):
+        check(failures, results[key][0] == serverHosts,
+              "--in-flight 4 --server-in-flight " + str(key[1]) + ": hosts at server differ from --in-flight 1: " +
+              str(sorted(set(results[key][0]) ^ set(serverHosts))))
+    concurrency = results[(4, 0)][1]
+    check(failures, 1 < concurrency <= 4,
+          "--in-flight 4: " + str(concurrency) + " add-host requests at the same time, expected 2-4")
+    concurrency = results[(4, 2)][1]
+    check(failures, 1 < concurrency <= 2,
+          "--in-flight 4 --server-in-flight 2: " + str(concurrency) + " add-host requests at the same time, "
+                                                                        "expected 2")
+    return failures
+
+
+# metrics of requests: the numbers of requests and failures of .metrics.json and .metrics.prom files are the numbers
+# of requests which are handled by server, by commands and by phases
+def checkMetrics(workDir):
+    failures = []
+    generateReferenceInput(40, os.path.join(workDir, "cp_objects.json"))
+    with open(os.path.join(workDir, "cp_objects.json")) as inputFile:
+        userObjects = json.load(inputFile)
+    server = provideStandInServer()
+    # the name of host exists at server, so the first request of the host is failed
+    provideServerObject(server, "host", "host_3", **{"ipv4-address": "10.2.2.2"})
+    runGlobals, exitCode = runSmartConnector(server, workDir, userObjects, ["--workers", "2", "--in-flight", "2"])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "run is not completed")
+    with open(os.path.join(workDir, "smartconnector.metrics.json")) as metricsFile:
+        metrics = json.load(metricsFile)
+    failedCalls = [call for call in server.calls if not call['success']]
+    check(failures, metrics['requests'] == len(server.calls),
+          str(metrics['requests']) + " requests in metrics, " + str(len(server.calls)) + " requests at server")
+    check(failures, metrics['failures'] == len(failedCalls),
+          str(metrics['failures']) + " failures in metrics, " + str(len(failedCalls)) + " failures at server")
+    check(failures, len(failedCalls) > 0, "no failed requests, the failures are not checked")
+    for command in sorted(set(call['command'] for call in server.calls) | set(metrics['commands'])):
+        count = len([call for call in server.calls if call['command'] == command])
+        failedCount = len([call for call in failedCalls if call['command'] == command])
+        commandMetrics = metrics['commands'].get(command, {"requests": 0, "failures": 0})
+        check(failures, (commandMetrics['requests'], commandMetrics['failures']) == (count, failedCount),
+              command + ": " + str(commandMetrics['requests']) + " requests and " + str(commandMetrics['failures']) +
+              " failures in metrics, " + str(count) + " and " + str(failedCount) + " at server")
+    for phase in sorted(set(call['phase'] or "session" for call in server.calls) | set(metrics['phases'])):
+        count = len([call for call in server.calls if (call['phase'] or "session") == phase])
+        phaseCount = metrics['phases'].get(phase, {"requests": 0})['requests']
+        check(failures, phaseCount == count,
+              "phase " + phase + ": " + str(phaseCount) + " requests in metrics, " + str(count) + " at server")
+    with open(os.path.join(workDir, "smartconnector.metrics.prom")) as metricsFile:
+        promCount = sum(int(line.rsplit(" ", 1)[1]) for line in metricsFile
+                        if line.startswith("smartconnector_api_requests_total{"))
+    check(failures, promCount == len(server.calls),
+          str(promCount) + " requests in .metrics.prom, " + str(len(server.calls)) + " requests at server")
+    return failures
+
+
+# providing the input of delta scenario: hosts, group, package with access rules and NAT rule
+# isChanged - the flag which indicates that the second version of input is provided: the destination of one rule
+#             and the members of group are changed, one host is removed
+def provideDeltaInput(isChanged):
+    userObjects = [dict(provideUserObject("CheckPoint_Host", "h" + str(i)), IpAddress="10.3.0." + str(i + 1))
+                   for i in range(5 if isChanged else 6)]
+    userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", "g"),
+                            Members=["h0", "h1"] if isChanged else ["h0", "h1", "h2"]))
+    userRules = [provideUserRule("r" + str(i), "delta Network", ["g"],
+                                 ["h4" if isChanged and i == 2 else "h" + str(i)], ["Any"]) for i in range(5)]
+    userRules.append(provideUserRule("cleanup", "delta Network", ["Any"], ["Any"], ["Any"], action=1))
+    userPackage = provideUserObject("CheckPoint_Package", "delta")
+    userPackage["SubPolicies"] = []
+    userPackage["ParentLayer"] = dict(provideUserObject("CheckPoint_Layer", "delta Network"), Rules=userRules)
+    userObjects.append(userPackage)
+    userNatRule = provideUserObject("CheckPoint_NAT_Rule", "")
+    userNatRule.update({"Source": {"Name": "h0"}, "Destination": None, "Service": None,
+                        "TranslatedSource": {"Name": "h1"}, "TranslatedDestination": None, "TranslatedService": None,
+                        "Method": 1, "Enabled": True})
+    userObjects.append(userNatRule)
+    return userObjects
+
+
+# delta run (--delta): the changed rule replaces the rule of previous run at the same position, the removed host
+# is deleted, the removed member of group is removed; the rest objects and rules are not sent again
+def checkDelta(workDir):
+    failures = []
+    for connectorArgs in ([], ["--batch-size", "10"]):
+        runDir = os.path.join(workDir, "delta" + "".join(connectorArgs).replace("-", "_"))
+        os.makedirs(runDir)
+        failures.extend(" ".join(connectorArgs + [failure]) for failure in checkDeltaRuns(runDir, connectorArgs))
+    return failures
+
+
+def checkDeltaRuns(workDir, connectorArgs):
+    failures = []
+    server = provideStandInServer()
+    runGlobals, exitCode = runSmartConnector(server, workDir, provideDeltaInput(False), connectorArgs)
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "first run is not completed")
+    shutil.copy(os.path.join(workDir, "smartconnector.manifest.json"), os.path.join(workDir, "manifest1.json"))
+    # the name of package is adjusted by SmartConnector, the layer of package is named by the package
+    packageName = [name for name, serverObject in server.objects.items() if serverObject['type'] == "package"][0]
+    rulesCount = len(server.objects[packageName + " Network"]['rules'])
+    natRulesCount = len(server.natRules[packageName])
+    firstCallsCount = len(server.calls)
+    runGlobals, exitCode = runSmartConnector(server, workDir, provideDeltaInput(True),
+                                             connectorArgs + ["--delta", "manifest1.json"])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "delta run is not completed")
+    uidsNames = dict((serverObject['uid'], name) for name, serverObject in server.objects.items())
+    rules = server.objects[packageName + " Network"]['rules']
+    check(failures, len(rules) == rulesCount,
+          str(len(rules)) + " access rules after delta run, " + str(rulesCount) + " after first run")
+    check(failures, [rule['name'] for rule in rules] == ["r0", "r1", "r2", "r3", "r4", "Cleanup rule"],
+          "access rules after delta run: " + ", ".join(str(rule['name']) for rule in rules))
+    changedRules = [rule for rule in rules if rule['name'] == "r2"]
+    check(failures, len(changedRules) == 1 and
+          [uidsNames.get(destination, destination) for destination in changedRules[0]['destination']] == ["h4"],
+          "destination of changed rule: " + str([rule['destination'] for rule in changedRules]))
+    check(failures, len(server.natRules[packageName]) == natRulesCount,
+          str(len(server.natRules[packageName])) + " NAT rules after delta run, " + str(natRulesCount) +
+          " after first run")
+    check(failures, "h5" not in server.objects, "removed host h5 is not deleted")
+    check(failures, server.objects["g"]['members'] == ["h0", "h1"],
+          "members of changed group: " + str(server.objects["g"]['members']))
+    addedItems = []
+    for call in server.calls[firstCallsCount:]:
+        if call['command'] == "add-objects-batch":
+            addedItems.extend(objectsGroup['type'] + " " + str(item.get('name'))
+                              for objectsGroup in call['payload']['objects'] for item in objectsGroup['list'])
+        elif call['command'].startswith("add-"):
+            addedItems.append(call['command'][len("add-"):] + " " + str(call['payload'].get('name')))
+    check(failures, addedItems == ["access-rule r2"],
+          "the objects and rules are added by delta run: " + ", ".join(addedItems))
+    return failures
+
+
+# collapsing of objects with the same value: the host with the same IP as the previous host is not added, the hosts
+# with repeated name are processed as usual both with and without --stream-input
+def checkCollapse(workDir):
+    failures = []
+    userHosts = [dict(provideUserObject("CheckPoint_Host", name), IpAddress=ip)
+                 for name, ip in (("a", "10.4.0.1"), ("b", "10.4.0.1"), ("dup", "10.4.0.1"), ("dup", "10.4.0.9"),
+                                  ("c", "10.4.0.9"), ("d", "10.4.0.2"))]
+    userHosts.append(dict(provideUserObject("CheckPoint_NetworkGroup", "g"), Members=["a", "b", "dup", "c", "d"]))
+    for connectorArgs in ([], ["--stream-input"]):
+        runDir = os.path.join(workDir, "collapse" + "".join(connectorArgs).replace("-", "_"))
+        os.makedirs(runDir)
+        server = provideStandInServer()
+        runGlobals, exitCode = runSmartConnector(server, runDir, userHosts, connectorArgs)
+        prefix = " ".join(connectorArgs + [""])
+        check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], prefix + "run is not completed")
+        if runGlobals is None:
+            continue
+        addedNames = [call['payload']['name'] for call in server.calls if call['command'] == "add-host"]
+        check(failures, "b" not in addedNames and "dup" in addedNames and "c" in addedNames,
+              prefix + "add-host requests are sent for " + ", ".join(addedNames))
+        mergedMap = runGlobals['mergedNetworkObjectsMap']
+        resolvedIps = dict((name, (findServerObject(server, mergedMap.get(name)) or {}).get('ipv4-address'))
+                           for name in ("a", "b", "dup", "c", "d"))
+        check(failures, resolvedIps == {"a": "10.4.0.1", "b": "10.4.0.1", "dup": "10.4.0.9", "c": "10.4.0.9",
+                                        "d": "10.4.0.2"},
+              prefix + "the hosts are mapped to the server hosts with IPs " + str(resolvedIps))
+        check(failures, len(server.objects["g"]['members']) == 3,
+              prefix + "members of group at server: " + str(server.objects["g"]['members']))
+    return failures
+
+
+# collapsing of groups with the same members: the group with the same members as other group (also nested) is not
+# added, the groups without resolved members (empty or with undefined members only) and the groups with other
+# comments are added each; the references to collapsed groups are replaced in the copies of user's groups
+def checkGroupsCollapse(workDir):
+    failures = []
+    userObjects = [dict(provideUserObject("CheckPoint_Host", "h" + str(i)), IpAddress="10.5.0." + str(i + 1))
+                   for i in range(2)]
+    for name, members in (("e1", []), ("e2", []), ("u1", ["undefined"]), ("u2", ["undefined"]), ("g1", ["h0", "h1"]),
+                          ("g2", ["h1", "h0"]), ("outer1", ["g1"]), ("outer2", ["g2"]), ("mixed", ["g2", "h0"])):
+        userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", name), Members=members))
+    for name, comments in (("c1", "first"), ("c2", "second"), ("d1", "same"), ("d2", "same")):
+        userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", name), Members=["h0"], Comments=comments))
+    server = provideStandInServer()
+    runGlobals, exitCode = runSmartConnector(server, workDir, userObjects, [])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "run is not completed")
+    if runGlobals is None:
+        return failures
+    serverGroups = provideServerObjects(server, "group")
+    check(failures, sorted(serverGroups) == ["c1", "c2", "d1", "e1", "e2", "g1", "mixed", "outer1", "u1", "u2"],
+          "groups at server: " + ", ".join(sorted(serverGroups)))
+    check(failures, serverGroups.get("outer1", {}).get('members') == ["g1"],
+          "members of nested group: " + str(serverGroups.get("outer1", {}).get('members')))
+    check(failures, sorted(serverGroups.get("mixed", {}).get('members') or []) == ["g1", "h0"],
+          "members of group with collapsed member: " + str(serverGroups.get("mixed", {}).get('members')))
+    check(failures, serverGroups.get("c2", {}).get('comments') == "second",
+          "comments of group: " + str(serverGroups.get("c2", {}).get('comments')))
+    userGroupsMembers = dict((userGroup['Name'], userGroup['Members']) for userGroup in runGlobals['userNetGroups'])
+    check(failures, userGroupsMembers.get("mixed") == ["g2", "h0"] and userGroupsMembers.get("outer2") == ["g2"],
+          "members of user's groups are changed: " + str(userGroupsMembers))
+    mergedMap = runGlobals['mergedNetworkObjectsMap']
+    for name, otherName in (("g2", "g1"), ("outer2", "outer1"), ("e2", None), ("u2", None), ("c2", None),
+                            ("d2", "d1")):
+        resolvedName = (findServerObject(server, mergedMap.get(name)) or {}).get('name')
+        check(failures, resolvedName == (otherName or name),
+              name + " is mapped to " + str(resolvedName) + " instead of " + str(otherName or name))
+    return failures
+
+
+# pruning of objects which are not referenced by rules (--prune-unreferenced): the objects of rules, of NAT rules and
+# the members of referenced groups (also nested) are added, the rest objects are written to .pruned.json file
+def checkPrune(workDir):
+    failures = []
+    userObjects = [dict(provideUserObject("CheckPoint_Host", "h" + str(i)), IpAddress="10.6.0." + str(i + 1))
+                   for i in range(6)]
+    userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", "inner"), Members=["h1"]))
+    userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", "outer"), Members=["inner", "h2"]))
+    userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", "unused_group"), Members=["h5"]))
+    for port in ("80", "8080"):
+        userObjects.append(dict(provideUserObject("CheckPoint_TcpService", "tcp_" + port), Port=port, SourcePort=None,
+                                SessionTimeout=3600))
+    userRules = [provideUserRule("r0", "prune Network", ["h0"], ["outer"], ["tcp_80"]),
+                 provideUserRule("cleanup", "prune Network", ["Any"], ["Any"], ["Any"], action=1)]
+    userPackage = provideUserObject("CheckPoint_Package", "prune")
+    userPackage["SubPolicies"] = []
+    userPackage["ParentLayer"] = dict(provideUserObject("CheckPoint_Layer", "prune Network"), Rules=userRules)
+    userObjects.append(userPackage)
+    userNatRule = provideUserObject("CheckPoint_NAT_Rule", "")
+    userNatRule.update({"Source": {"Name": "h3"}, "Destination": None, "Service": None,
+                        "TranslatedSource": {"Name": "h0"}, "TranslatedDestination": None, "TranslatedService": None,
+                        "Method": 1, "Enabled": True})
+    userObjects.append(userNatRule)
+    server = provideStandInServer()
+    runGlobals, exitCode = runSmartConnector(server, workDir, userObjects, ["--prune-unreferenced", "true"])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "run is not completed")
+    with open(os.path.join(workDir, "smartconnector.pruned.json")) as prunedFile:
+        prunedNames = sorted(prunedObject['name'] for prunedObject in json.load(prunedFile)['objects'])
+    check(failures, prunedNames == ["h4", "h5", "tcp_8080", "unused_group"],
+          "pruned objects: " + ", ".join(prunedNames))
+    serverNames = sorted(name for name, serverObject in server.objects.items()
+                         if serverObject['type'] in ("host", "group", "service-tcp"))
+    check(failures, serverNames == ["h0", "h1", "h2", "h3", "inner", "outer", "tcp_80"],
+          "objects at server: " + ", ".join(serverNames))
+    return failures
+
+
+# the decoder of user's objects (userObjectsDecoder) builds plain maps which share one string for the names of fields
+# and for the names which are referenced by groups and rules
+def checkUserObjects(workDir):
+    failures = []
+    server = provideStandInServer()
+    runGlobals, exitCode = runSmartConnector(server, workDir, [provideUserObject("CheckPoint_Zone", "zone")], [])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "run is not completed")
+    if runGlobals is None:
+        return failures
+    userHostJson = json.dumps(dict(provideUserObject("CheckPoint_Host", "h" + str(uuid.uuid4())),
+                                   IpAddress="10.7.0.1"))
+    userHost = runGlobals['userObjectsDecoder'].decode(userHostJson)
+    check(failures, type(userHost) is dict and userHost == json.loads(userHostJson),
+          "host is decoded as " + type(userHost).__name__ + ": " + str(userHost))
+    userRuleJson = json.dumps(provideUserRule("r", "layer", [userHost["Name"]], ["Any"], ["Any"]))
+    userRule = runGlobals['userObjectsDecoder'].decode(userRuleJson)
+    check(failures, userRule == json.loads(userRuleJson), "rule is decoded as " + str(userRule))
+    hostFieldName = next(key for key in userHost if key == "Name")
+    ruleFieldName = next(key for key in userRule if key == "Name")
+    check(failures, hostFieldName is ruleFieldName, "names of fields are not shared")
+    check(failures, userRule["Source"][0]["Name"] is userHost["Name"], "name of host is not shared by rule")
+    userObject = runGlobals['userObjectsDecoder'].decode('{"Name": "first", "Name": "last"}')
+    check(failures, userObject == {"Name": "last"}, "object with repeated field: " + str(userObject))
+    return failures
+
+
+# the maps of independent phases are merged in order of phases while the largest map is updated in place
+def checkPhasesMaps(workDir):
+    failures = []
+    server = provideStandInServer()
+    runGlobals, exitCode = runSmartConnector(server, workDir, [provideUserObject("CheckPoint_Zone", "zone")], [])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "run is not completed")
+    if runGlobals is None:
+        return failures
+    phasesMaps = [{"a": 1, "b": 1}, {"b": 2, "c": 2}, {"a": 3, "d": 3, "e": 3, "f": 3}, {"e": 4}]
+    expectedMap = {}
+    for phaseMap in phasesMaps:
+        expectedMap.update(phaseMap)
+    mergedMap = runGlobals['mergePhasesMaps']([dict(phaseMap) for phaseMap in phasesMaps])
+    check(failures, mergedMap == expectedMap, "merged maps of phases: " + str(mergedMap))
+    return failures
+
+
+# referencing of objects by uid: the maps of user's objects contain the uids of server objects and the access rules,
+# the inline layer and the NAT rules reference the objects by uids which are resolved to the expected objects,
+# also if the object is renamed or the server object with the same IP is used
+def checkUids(workDir):
+    failures = []
+    userObjects = [dict(provideUserObject("CheckPoint_Host", name), IpAddress=ip)
+                   for name, ip in (("h0", "10.8.0.1"), ("existing_host", "10.8.0.2"), ("server_ip_host", "10.8.1.1"))]
+    userObjects.append(dict(provideUserObject("CheckPoint_NetworkGroup", "g"), Members=["h0", "existing_host"]))
+    userObjects.append(dict(provideUserObject("CheckPoint_TcpService", "tcp_8443"), Port="8443", SourcePort=None,
+                            SessionTimeout=3600))
+    subRules = [provideUserRule("s0", "uids_sub", ["h0"], ["Any"], ["tcp_8443"])]
+    userRules = [provideUserRule("to_sub", "uids Network", ["Any"], ["Any"], ["Any"], action=3,
+                                 subPolicyName="uids_sub"),
+                 provideUserRule("r0", "uids Network", ["g"], ["existing_host", "server_ip_host"], ["tcp_8443"]),
+                 provideUserRule("cleanup", "uids Network", ["Any"], ["Any"], ["Any"], action=1)]
+    userPackage = provideUserObject("CheckPoint_Package", "uids")
+    userPackage["SubPolicies"] = [dict(provideUserObject("CheckPoint_Layer", "uids_sub"), Rules=subRules,
+                                       ApplicationsAndUrlFiltering=False)]
+    userPackage["ParentLayer"] = dict(provideUserObject("CheckPoint_Layer", "uids Network"), Rules=userRules)
+    userObjects.append(userPackage)
+    userNatRule = provideUserObject("CheckPoint_NAT_Rule", "")
+    userNatRule.update({"Source": {"Name": "existing_host"}, "Destination": None, "Service": {"Name": "tcp_8443"},
+                        "TranslatedSource": {"Name": "server_ip_host"}, "TranslatedDestination": None,
+                        "TranslatedService": None, "Method": 1, "Enabled": True})
+    userObjects.append(userNatRule)
+    server = provideStandInServer()
+    provideServerObject(server, "host", "existing_host", **{"ipv4-address": "10.2.2.2"})
+    serverHost = provideServerObject(server, "host", "server_host", **{"ipv4-address": "10.8.1.1"})
+    runGlobals, exitCode = runSmartConnector(server, workDir, userObjects, [])
+    check(failures, exitCode == 0 and runGlobals['isMigrationCompleted'], "run is not completed")
+    if runGlobals is None:
+        return failures
+    uids = dict((serverObject['uid'], name) for name, serverObject in server.objects.items())
+    mergedMap = dict(runGlobals['mergedNetworkObjectsMap'], **runGlobals['mergedServicesObjectsMap'])
+    check(failures, all(value in uids for value in mergedMap.values()),
+          "the maps contain not uids: " + ", ".join(str(value) for value in mergedMap.values() if value not in uids))
+    check(failures, mergedMap.get("server_ip_host") == serverHost['uid'] and
+          uids.get(mergedMap.get("existing_host")) == "existing_host_1",
+          "server_ip_host is mapped to " + str(uids.get(mergedMap.get("server_ip_host"))) + ", existing_host to " +
+          str(uids.get(mergedMap.get("existing_host"))))
+    rulesPayloads = dict((call['payload']['name'], call['payload']) for call in server.calls
+                         if call['command'] == "add-access-rule" and call['success'])
+    expectedRules = {"to_sub": {"source": ["Any"], "destination": ["Any"], "service": ["Any"]},
+                     "r0": {"source": ["g"], "destination": ["existing_host_1", "server_host"], "service": ["tcp_8443"]},
+                     "s0": {"source": ["h0"], "destination": ["Any"], "service": ["tcp_8443"]}}
+    for ruleName, expectedFields in expectedRules.items():
+        payload = rulesPayloads.get(ruleName, {})
+        for fieldName, expectedNames in expectedFields.items():
+            values = payload.get(fieldName, [])
+            check(failures, all(value in uids for value in values if value != "Any") and
+                  [uids.get(value, value) for value in values] == expectedNames,
+                  "rule " + ruleName + ", " + fieldName + ": " + str(values) + " instead of " + str(expectedNames))
+    # the name of layer is adjusted by SmartConnector
+    inlineLayer = findServerObject(server, rulesPayloads.get("to_sub", {}).get('inline-layer')) or {}
+    check(failures, inlineLayer.get('type') == "access-layer" and inlineLayer['name'].startswith("uids_sub"),
+          "inline layer of rule: " + str(rulesPayloads.get("to_sub", {}).get('inline-layer')))
+    natPayloads = [call['payload'] for call in server.calls if call['command'] == "add-nat-rule" and call['success']]
+    check(failures, len(natPayloads) == 1 and
+          [uids.get(natPayloads[0].get(fieldName)) for fieldName in
+           ("original-source", "original-service", "translated-source")] ==
+          ["existing_host_1", "tcp_8443", "server_host"],
+          "NAT rule: " + str(natPayloads))
+    return failures
+
+
+# the scenario name (key) and the function which runs it in directory and returns the list of failed checks (value)
+scenarios = {
+    "waves": checkWaves,
+    "metrics": checkMetrics,
+    "delta": checkDelta,
+    "collapse": checkCollapse,
+    "groups-collapse": checkGroupsCollapse,
+    "prune": checkPrune,
+    "user-objects": checkUserObjects,
+    "phases-maps": checkPhasesMaps,
+    "uids": checkUids
+}
+
+args_parser = argparse.ArgumentParser()
+
+args_parser._optionals.title = "arguments"
+
+args_parser.add_argument('--scenarios', default=",".join(scenarios),
+                         help="Comma separated names of scenarios. Default: " + ",".join(scenarios))
+args_parser.add_argument('--keep-dir',
+                         help="The directory where the inputs and the logs of runs are kept. "
+                              "The temporary directory is used and removed by default.")
+
+if __name__ == "__main__":
+    args = args_parser.parse_args()
+    baseDir = args.keep_dir if args.keep_dir is not None else tempfile.mkdtemp(prefix="smartconnector_regression_")
+    failedCount = 0
+    try:
+        for scenario in [scenario.strip() for scenario in args.scenarios.split(",")]:
+            if scenario not in scenarios:
+                print("scenario " + scenario + ": unknown, scenarios: " + ", ".join(scenarios))
+                failedCount += 1
+                continue
+            workDir = os.path.join(baseDir, scenario)
+            shutil.rmtree(workDir, ignore_errors=True)
+            os.makedirs(workDir)
+            failures = scenarios[scenario](workDir)
+            print("scenario " + scenario + ": " + ("passed" if len(failures) == 0 else "FAILED"))
+            for failure in failures:
+                print("\t" + failure)
+            failedCount += 1 if len(failures) > 0 else 0
+    finally:
+        if args.keep_dir is None:
+            shutil.rmtree(baseDir, ignore_errors=True)
+    sys.exit(1 if failedCount > 0 else 0)
@@ -0,0 +1,442 @@
+#!/usr/bin/python3
+# local stand-in of Check Point Management Web API for measuring SmartConnector without management server
+# the stand-in keeps the objects in memory and answers the requests which SmartConnector sends:
+# login, add-*, set-*, delete-*, show-* with paging, add-objects-batch, publish, discard and logout
+# the rules are kept in the order of layer or package (NAT rules), they are found by uid for delete-*-rule
+# the server behaviour which affects the number of requests is reproduced:
+# - the name of object is unique: "More than one object named '...' exists." error
+# - the IP of host or network is unique unless ignore-warnings is set: "Multiple objects have the same IP address"
+#   and "More than one network have the same IP" warnings
+# - the object which is added or changed by session is locked till the session is published or discarded,
+#   other sessions get "locked" error on changing it; the unpublished objects are not shown to other sessions
+# - each request waits the latency of its command, the latency of publish grows with the number of changes
+# the stand-in is installed as "cpapi" module, so smartconnector.py is run without changes, see benchmark.py
+
+import json
+import sys
+import threading
+import time
+import types
+import uuid
+
+# the latency of commands in milliseconds: the command (e.g. add-host) or its verb (e.g. add) is the key
+defaultLatencies = {"login": 50, "add": 20, "set": 20, "delete": 20, "show": 20, "publish": 500}
+
+
+# the response of stand-in, it has the fields of cpapi response which are used by SmartConnector
+class StandInResponse:
+    def __init__(self, data, success=True, status_code=200):
+        self.data = data
+        self.success = success
+        self.status_code = status_code
+        self.error_message = "" if success else data.get('message', "")
+        self.res_obj = {"status_code": status_code, "data": data}
+
+
+# the arguments of client, the same as APIClientArgs of cpapi
+class StandInClientArgs:
+    def __init__(self, server="127.0.0.1", port=443, context="web_api", user_agent=None, **kwargs):
+        self.server = server
+        self.port = port
+        self.context = context
+        self.user_agent = user_agent
+
+
+# the management server which is shared by all sessions (clients)
+class StandInServer:
+    # latencies - the latency of commands in milliseconds, see defaultLatencies
+    # publishLatencyPerChange - the latency of publish in milliseconds which is added for each published change
+    # providePhase - function which returns the phase of current request (e.g. hosts), the phase is recorded with
+    #                the request for reports
+    def __init__(self, latencies=None, publishLatencyPerChange=1.0, providePhase=None):
+        self.latencies = dict(defaultLatencies)
+        self.latencies.update(latencies or {})
+        self.publishLatencyPerChange = publishLatencyPerChange
+        self.providePhase = providePhase
+        self.objects = {}
+        self.rules = {}
+        self.natRules = {}
+        self.owners = {}
+        self.changes = {}
+        self.publishCount = 0
+        self.calls = []
+        self.lock = threading.Lock()
+
+    # providing the latency of command in seconds: the latency is found by command, then by its verb
+    def provideLatency(self, command):
+        if command in self.latencies:
+            return self.latencies[command] / 1000.0
+        return self.latencies.get(command.split("-")[0], 0) / 1000.0
+
+    # handling the request of session: the latency is waited and the request is recorded
+    def call(self, sid, command, payload):
+        phase = self.providePhase() if self.providePhase is not None else None
+        start = time.time()
+        latency = self.provideLatency(command)
+        if command == "publish":
+            with self.lock:
+                latency += len(self.changes.get(sid, [])) * self.publishLatencyPerChange / 1000.0
+        time.sleep(latency)
+        with self.lock:
+            payload = json.loads(json.dumps(payload))
+            res = self.handle(sid, command, payload)
+            self.calls.append({"command": command, "phase": phase, "start": start, "time": time.time() - start,
+                               "success": res.success, "payload": payload})
+        return res
+
+    def handle(self, sid, command, payload):
+        if command == "login":
+            return StandInResponse({"sid": str(uuid.uuid4()), "api-server-version": "1.8"})
+        if command == "publish":
+            for name in self.changes.pop(sid, []):
+                self.owners.pop(name, None)
+                self.objects.get(name, {}).pop('isNew', None)
+            self.publishCount += 1
+            return StandInResponse({"task-id": str(uuid.uuid4())})
+        if command in ("discard", "logout"):
+            for name in self.changes.pop(sid, []):
+                if self.owners.pop(name, None) == sid and self.objects.get(name, {}).get('isNew', False):
+                    del self.objects[name]
+            return StandInResponse({"message": "OK"})
+        if command == "show-last-published-session":
+            return StandInResponse({"publish-time": {"iso-8601": "%08d" % self.publishCount}})
+        if command == "add-objects-batch":
+            return self.addObjectsBatch(sid, payload)
+        if command.startswith("add-"):
+            return self.addObject(sid, command[len("add-"):], payload)
+        if command.startswith("set-"):
+            return self.setObject(sid, payload)
+        if command in ("delete-access-rule", "delete-nat-rule"):
+            return self.deleteRule(sid, payload)
+        if command.startswith("delete-"):
+            return self.deleteObject(sid, payload)
+        if command == "show-objects":
+            serverObjects = [serverObject for serverObject in self.provideVisibleObjects(sid)
+                             if ('type' not in payload or serverObject['type'] == payload['type']) and
+                             payload.get('filter', "") in json.dumps(serverObject)]
+            return self.providePage(serverObjects, payload)
+        if command.startswith("show-services-") or command.startswith("show-") and command.endswith("s"):
+            objectsType = command[len("show-"):-1]
+            if command.startswith("show-services-"):
+                objectsType = "service-" + command[len("show-services-"):]
+            serverObjects = [serverObject for serverObject in self.provideVisibleObjects(sid)
+                             if serverObject['type'] == objectsType]
+            return self.providePage(serverObjects, payload)
+        return provideError("generic_err_command_not_found", "Unknown command \"" + command + "\"", status_code=404)
+
+    # providing the objects which are published or which are added by the session
+    def provideVisibleObjects(self, sid):
+        return [self.presentObject(serverObject) for name, serverObject in self.objects.items()
+                if self.owners.get(name, sid) == sid or not serverObject.get('isNew', False)]
+
+    # providing the page of objects by offset and limit of request as management server does
+    def providePage(self, serverObjects, payload):
+        offset = payload.get('offset', 0)
+        limit = min(payload.get('limit', 50), 500)
+        page = serverObjects[offset:offset + limit]
+        return StandInResponse({"objects": page, "from": offset + 1 if page else 0, "to": offset + len(page),
+                                "total": len(serverObjects)})
+
+    def presentObject(self, serverObject):
+        return {key: value for key, value in serverObject.items() if key != "isNew"}
+
+    # locking the object by session till the session is published or discarded
+    # returns: the error response if the object is locked by other session, None otherwise
+    def lockObject(self, sid, name):
+        if self.owners.get(name, sid) != sid:
+            return provideError("generic_err_object_locked",
+                                "Object '" + name + "' is locked by another session. Publish or discard the changes "
+                                                    "of that session.")
+        if name not in self.owners:
+            self.owners[name] = sid
+            self.changes.setdefault(sid, []).append(name)
+        return None
+
+    def addObject(self, sid, objectType, payload):
+        serverObject, res_error = self.validateObject(sid, objectType, payload)
+        if res_error is not None:
+            return res_error
+        if objectType in ("access-rule", "nat-rule"):
+            return StandInResponse(serverObject)
+        self.objects[serverObject['name']] = dict(serverObject, isNew=True)
+        self.lockObject(sid, serverObject['name'])
+        if objectType == "package":
+            layerName = serverObject['name'] + " Network"
+            self.objects[layerName] = {"name": layerName, "uid": str(uuid.uuid4()), "type": "access-layer",
+                                       "domain": {"domain-type": "domain", "name": "SMC User"},
+                                       "rules": [{"uid": str(uuid.uuid4()), "name": "Cleanup rule"}], "isNew": True}
+            self.rules[self.objects[layerName]['rules'][0]['uid']] = (layerName, self.objects[layerName]['rules'])
+            self.lockObject(sid, layerName)
+        return StandInResponse(serverObject)
+
+    # validating "new" object as management server does
+    # returns: tuple of the object and None if it is valid, tuple of None and error response otherwise
+    def validateObject(self, sid, objectType, payload):
+        serverObject = {key: value for key, value in payload.items() if key not in ("ignore-warnings", "ignore-errors")}
+        serverObject.update({"uid": str(uuid.uuid4()), "type": objectType,
+                             "domain": {"domain-type": "domain", "name": "SMC User"}})
+        if objectType == "access-rule":
+            res_error = self.addRule(sid, payload['layer'], serverObject, payload.get('position', "top"))
+            return (None, res_error) if res_error is not None else (serverObject, None)
+        if objectType == "nat-rule":
+            package = self.objects.get(payload.get('package')) or self.findObject({"uid": payload.get('package')})
+            if package is None or package['type'] != "package":
+                return None, provideError("generic_err_object_not_found",
+                                          "Requested object [" + str(payload.get('package')) + "] not found")
+            res_error = self.lockObject(sid, package['name'])
+            if res_error is None:
+                res_error = self.insertRule(self.natRules.setdefault(package['name'], []), serverObject,
+                                            payload.get('position', "top"))
+            if res_error is None:
+                self.rules[serverObject['uid']] = (package['name'], self.natRules[package['name']])
+            return (None, res_error) if res_error is not None else (serverObject, None)
+        if 'name' not in payload:
+            return None, provideError("generic_err_invalid_parameter", "Missing parameter: [name]")
+        if payload['name'] in self.objects:
+            return None, provideError("err_validation_failed", "Validation failed with 1 error",
+                                      errors=["More than one object named '" + payload['name'] + "' exists."])
+        if objectType == "host":
+            ipVersion = "ipv4" if ":" not in payload['ip-address'] else "ipv6"
+            serverObject[ipVersion + "-address"] = payload['ip-address']
+            if not payload.get('ignore-warnings', False) and self.isIpUsed("host", ipVersion + "-address",
+                                                                            payload['ip-address']):
+                return None, provideError("err_validation_failed", "Validation failed with 1 warning",
+                                          warnings=["Multiple objects have the same IP address " +
+                                                    payload['ip-address']])
+        elif objectType == "network":
+            ipField = "subnet6" if ":" in payload['subnet'] else "subnet4"
+            serverObject[ipField] = payload['subnet']
+            if not payload.get('ignore-warnings', False) and self.isIpUsed("network", ipField, payload['subnet']):
+                return None, provideError("err_validation_failed", "Validation failed with 1 warning",
+                                          warnings=["More than one network have the same IP " + payload['subnet']])
+        elif objectType == "address-range":
+            ipVersion = "ipv4" if ":" not in payload['ip-address-first'] else "ipv6"
+            serverObject[ipVersion + "-address-first"] = payload['ip-address-first']
+            serverObject[ipVersion + "-address-last"] = payload['ip-address-last']
+        elif objectType in ("group", "service-group", "time-group"):
+            serverObject['members'] = []
+        return serverObject, None
+
+    def isIpUsed(self, objectType, ipField, ip):
+        for serverObject in self.objects.values():
+            if serverObject['type'] == objectType and serverObject.get(ipField) == ip:
+                return True
+        return False
+
+    # adding the rule to layer at position: number, "top", "bottom" or {"above"/"below": rule}
+    # returns: the error response if the rule is not added, None otherwise
+    def addRule(self, sid, layerName, rule, position):
+        layer = self.objects.get(layerName) or self.findObject({"uid": layerName})
+        if layer is None or layer['type'] != "access-layer":
+            return provideError("generic_err_object_not_found", "Requested object [" + str(layerName) + "] not found")
+        res_error = self.lockObject(sid, layer['name'])
+        if res_error is None:
+            res_error = self.insertRule(layer.setdefault('rules', []), rule, position)
+        if res_error is None:
+            self.rules[rule['uid']] = (layer['name'], layer['rules'])
+        return res_error
+
+    # inserting the rule to the rules at position: number, "top", "bottom" or {"above"/"below": uid or name of rule}
+    # returns: the error response if the position is not found, None otherwise
+    def insertRule(self, rules, rule, position):
+        if isinstance(position, dict):
+            for i, otherRule in enumerate(rules):
+                if position.get('above', position.get('below')) in (otherRule['uid'], otherRule.get('name')):
+                    rules.insert(i if 'above' in position else i + 1, rule)
+                    return None
+            return provideError("generic_err_object_not_found", "Requested object [" + json.dumps(position) +
+                                "] not found")
+        if position == "top":
+            rules.insert(0, rule)
+        elif position == "bottom":
+            rules.append(rule)
+        elif isinstance(position, int) and 1 <= position <= len(rules) + 1:
+            rules.insert(position - 1, rule)
+        else:
+            return provideError("generic_err_invalid_parameter", "Invalid position: " + str(position))
+        return None
+
+    # adding the objects of batch: all objects are added or nothing is added
+    def addObjectsBatch(self, sid, payload):
+        addedObjects = []
+        addedNames = set()
+        layersRules = dict((name, list(serverObject['rules'])) for name, serverObject in self.objects.items()
+                           if 'rules' in serverObject)
+        natRules = dict((name, list(rules)) for name, rules in self.natRules.items())
+        rulesUids = set(self.rules)
+        for objectsGroup in payload['objects']:
+            for item in objectsGroup['list']:
+                item = dict(item, **{"ignore-warnings": payload.get('ignore-warnings', False)})
+                serverObject, res_error = self.validateObject(sid, objectsGroup['type'], item)
+                if res_error is None and serverObject.get('name') in addedNames:
+                    res_error = provideError("err_validation_failed", "Validation failed with 1 error",
+                                             errors=["More than one object named '" + serverObject['name'] +
+                                                     "' exists."])
+                if res_error is not None:
+                    for name, rules in layersRules.items():
+                        self.objects[name]['rules'][:] = rules
+                    for name, rules in natRules.items():
+                        self.natRules[name][:] = rules
+                    for uid in set(self.rules) - rulesUids:
+                        del self.rules[uid]
+                    return StandInResponse({"tasks": [{"status": "failed", "task-details": [
+                        {"errors": res_error.data.get('errors', []) + res_error.data.get('warnings', []) +
+                                   [{"message": res_error.data['message']}]}]}]}, False, 400)
+                addedObjects.append(serverObject)
+                if serverObject.get('name'):
+                    addedNames.add(serverObject['name'])
+        for addedObject in addedObjects:
+            if addedObject['type'] not in ("access-rule", "nat-rule"):
+                self.objects[addedObject['name']] = dict(addedObject, isNew=True)
+                self.lockObject(sid, addedObject['name'])
+        return StandInResponse({"tasks": [{"status": "succeeded", "task-details": [{"objects": addedObjects}]}]})
+
+    # finding the object by name or uid of request
+    def findObject(self, payload):
+        if 'name' in payload:
+            return self.objects.get(payload['name'])
+        for serverObject in self.objects.values():
+            if serverObject['uid'] == payload.get('uid'):
+                return serverObject
+        return None
+
+    def setObject(self, sid, payload):
+        serverObject = self.findObject(payload)
+        if serverObject is None:
+            return provideError("generic_err_object_not_found",
+                                "Requested object [" + str(payload.get('name', payload.get('uid'))) + "] not found")
+        res_error = self.lockObject(sid, serverObject['name'])
+        if res_error is not None:
+            return res_error
+        members = payload.get('members')
+        if members is not None:
+            # the members are set by list or by "add" and "remove", the names of members are kept
+            membersToAdd = members.get('add', []) if isinstance(members, dict) else members
+            membersToAdd = membersToAdd if isinstance(membersToAdd, list) else [membersToAdd]
+            membersToRemove = members.get('remove', []) if isinstance(members, dict) else []
+            membersToRemove = membersToRemove if isinstance(membersToRemove, list) else [membersToRemove]
+            names = dict((member['uid'], member['name']) for member in self.objects.values())
+            for member in membersToAdd + membersToRemove:
+                if member not in self.objects and member not in names:
+                    return provideError("generic_err_object_not_found", "Requested object [" + member + "] not found")
+            if not isinstance(members, dict):
+                serverObject['members'] = []
+            for member in membersToAdd:
+                if names.get(member, member) not in serverObject['members']:
+                    serverObject['members'].append(names.get(member, member))
+            for member in membersToRemove:
+                if names.get(member, member) in serverObject['members']:
+                    serverObject['members'].remove(names.get(member, member))
+        for key, value in payload.items():
+            if key not in ("name", "uid", "members", "new-name", "ignore-warnings", "ignore-errors"):
+                serverObject[key] = value
+        return StandInResponse(self.presentObject(serverObject))
+
+    def deleteObject(self, sid, payload):
+        serverObject = self.findObject(payload)
+        if serverObject is None:
+            return provideError("generic_err_object_not_found",
+                                "Requested object [" + str(payload.get('name', payload.get('uid'))) + "] not found")
+        res_error = self.lockObject(sid, serverObject['name'])
+        if res_error is not None:
+            return res_error
+        del self.objects[serverObject['name']]
+        return StandInResponse({"message": "OK"})
+
+    # deleting the access rule or NAT rule by uid, the layer or the package of rule is locked
+    def deleteRule(self, sid, payload):
+        if payload.get('uid') not in self.rules:
+            return provideError("generic_err_object_not_found",
+                                "Requested object [" + str(payload.get('uid')) + "] not found")
+        containerName, rules = self.rules[payload['uid']]
+        res_error = self.lockObject(sid, containerName)
+        if res_error is not None:
+            return res_error
+        del self.rules[payload['uid']]
+        rules[:] = [rule for rule in rules if rule['uid'] != payload['uid']]
+        return StandInResponse({"message": "OK"})
+
+
+# providing the error response of management server
+# code - the code of error
+# message - the message of error
+# errors - the list of messages of errors
+# warnings - the list of messages of warnings
+# status_code - HTTP status of response
+# ---
+# returns: response
+def provideError(code, message, errors=None, warnings=None, status_code=400):
+    data = {"code": code, "message": message}
+    if errors:
+        data['errors'] = [{"message": error} for error in errors]
+    if warnings:
+        data['warnings'] = [{"message": warning} for warning in warnings]
+    return StandInResponse(data, False, status_code)
+
+
+# the client of stand-in, it has the methods of cpapi APIClient which are used by SmartConnector
+# each client is a separate session at server
+class StandInClient:
+    server = None
+
+    def __init__(self, clientArgs=None):
+        self.clientArgs = clientArgs
+        self.debug_file = ""
+        self.sid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, excTraceback):
+        return False
+
+    def check_fingerprint(self):
+        return True
+
+    def login(self, user, password, domain=None, **kwargs):
+        return self.loginToServer()
+
+    def login_as_root(self, domain=None, **kwargs):
+        return self.loginToServer()
+
+    def login_with_api_key(self, key, domain=None, **kwargs):
+        return self.loginToServer()
+
+    def loginToServer(self):
+        res_login = self.api_call("login", {})
+        if res_login.success:
+            self.sid = res_login.data['sid']
+        return res_login
+
+    # reading all objects of command by pages as cpapi does
+    def api_query(self, command, details_level="standard", container_key="objects", include_container_key=False,
+                  payload=None):
+        serverObjects = []
+        payload = dict(payload or {}, limit=50, offset=0, **{"details-level": details_level})
+        while True:
+            res_page = self.api_call(command, payload)
+            if res_page.success is False:
+                return res_page
+            serverObjects.extend(res_page.data.get(container_key, []))
+            if res_page.data['to'] >= res_page.data['total']:
+                break
+            payload['offset'] = res_page.data['to']
+        if include_container_key:
+            return StandInResponse({container_key: serverObjects})
+        return StandInResponse(serverObjects)
+
+    def api_call(self, command, payload=None, sid=None, wait_for_task=True, timeout=-1):
+        return StandInClient.server.call(sid or self.sid, command, payload or {})
+
+
+# installing the stand-in as "cpapi" module, so "from cpapi import APIClient, APIClientArgs" imports the stand-in
+# server - the stand-in server which is used by all clients
+# ---
+# returns: nothing
+def installStandIn(server):
+    StandInClient.server = server
+    cpapiModule = types.ModuleType("cpapi")
+    cpapiModule.APIClient = StandInClient
+    cpapiModule.APIClientArgs = StandInClientArgs
+    cpapiModule.APIResponse = StandInResponse
+    sys.modules["cpapi"] = cpapiModule
@@ -7,20 +7,245 @@ import os
 import re
 import operator
 import uuid
+import time
+import ipaddress
+import threading
+import queue
+import itertools
+import heapq
+import tempfile
+import atexit
+import gzip
+import hashlib
+import difflib
+import contextlib
+try:
+    # the file lock is used by the processes of domains, they are started by fork which is not available on Windows
+    import fcntl
+except ImportError:
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 from cpapi import APIClient, APIClientArgs
 
+# the lock for printing from the workers which process objects in parallel
+printLock = threading.Lock()
+
+# the buffered output of messages to console and log file, see printStatus and flushLog
+# logLevels - the levels of messages by verbosity: the message is written if its level is not above --log-level;
+#             the log file keeps the warnings and the reports always, so the run can be audited
+# isLogJsonLines - the log file contains JSON record per line instead of text
+# isLogBuffered - the lines are kept in buffers till the buffers are full or flushLog is called by the timer;
+#                 each line is written at once till the arguments are validated
+# logConsoleBuffer, logFileBuffer - the lines which are not written yet
+logLevels = {"warn": 0, "report": 1, "info": 2, "debug": 3}
+logLevel = logLevels["info"]
+logBufferLines = 1000
+isLogJsonLines = False
+isLogBuffered = False
+logConsoleBuffer = []
+logFileBuffer = []
+
+# the state of publish scheduler: id of client (key) and the map of changes which are not published yet (value)
+# publishStatistics - the number of publishes and the time which is spent for publishing in seconds
+publishSessions = {}
+publishStatistics = {"count": 0, "time": 0.0}
+publishLock = threading.Lock()
+
+# the limits of requests which are sent to server at the same time, see trackSessionChanges
+# sessionsSemaphores - id of client (key) and the semaphore which limits the requests of session to args.in_flight (value)
+# serverSemaphore - the semaphore which limits the requests of all sessions to args.server_in_flight, None - no limit
+# apiCallState - the state of current thread: the nested request, e.g. show-task which is sent by api_call while
+#                waiting for task, does not wait for the semaphores which are held by the thread
+sessionsSemaphores = {}
+serverSemaphore = None
+apiCallState = threading.local()
+
+# the metrics of requests which are sent to server, see recordApiCallMetrics and writeMetrics
+# apiCallsMetrics - the phase and the command (key) and the metrics (value): the durations of requests in seconds,
+#                   the number of failed requests and the number of retries
+# runStartTime - the time when the run is started
+apiCallsMetrics = {}
+metricsLock = threading.Lock()
+runStartTime = time.time()
+
+# the trace of requests which is enabled by --api-trace: JSON record per line is written while the requests are sent
+# file_api_trace - the current file of trace, None - the trace is disabled
+# apiTraceSize - the number of bytes which are written to the current file (before compression)
+# apiTraceSessions - id of client (key) and the number of session in trace (value)
+# apiTraceRedactedKeys - the fields of requests and responses which values are not written
+file_api_trace = None
+apiTraceSize = 0
+apiTraceSessions = {}
+apiTraceRedactedKeys = ("password", "api-key", "sid")
+apiTraceLock = threading.Lock()
+
+# the cache of objects which are read from server; the cache is kept in file between runs and it is revalidated by
+# the changes which are published at server since the objects were read
+# the file contains server and domain (key) and the entry (value) which contains the publish time of server when
+# the objects were read and the lists of objects by read command
+# inventoryCacheKey - the key of current server and domain
+# inventoryCacheEntry - the entry of current server and domain, None - the cache is not used
+# inventoryCacheServedCommands - the read commands which objects are taken from cache; the cached objects are taken once
+#                                because the next read of the same run has to contain the objects added by the run
+# defaultManagementPort - the port of Management Web API which is used by client if --port is not set
+inventoryCacheKey = None
+inventoryCacheEntry = None
+inventoryCacheServedCommands = set()
+defaultManagementPort = 443
+inventoryCacheLock = threading.Lock()
+
+# the simulated server of --plan mode, see openPlanServer
+# planServerDir - the directory of planserver.py module which is loaded only in --plan mode
+planServer = None
+planServerDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark")
+
+# the registry of names which are used at server: the names are collected from the objects which are read from server
+# and the objects which are added to server, so the free name is found without requests to server
+# serverNames - the set of used names
+# serverNamesPostfixes - initial name (key) and the postfix which is checked first for the next free name (value)
+serverNames = set()
+serverNamesPostfixes = {}
+serverNamesLock = threading.Lock()
+
+# the journal of published objects which is used for resuming of interrupted run
+# journalEntries - records of interrupted run: the name of phase (key) and the map of objects keys and values (value)
+# journalPendingEntries - records which are not published yet: id of client (key) and list of records (value)
+# journalRestoredKeys - the phases and keys of records which are restored by resumed run
+file_journal = None
+journalEntries = {}
+journalPendingEntries = {}
+journalRestoredKeys = set()
+journalLock = threading.Lock()
+
+# the uids of objects which are added or modified by the run and are not recorded to journal yet,
+# the uid is written to journal and manifest by the record of user's object which owns the object
+# serverNamesUids - the name of server object (key) and its uid (value)
+# serverUidsNames - the uid of server object (key) and its name (value), the name of rule can be None
+serverNamesUids = {}
+serverUidsNames = {}
+
+# the manifest of migration result which maps each user's object to server object (see --manifest and --delta)
+# contentHashes - the hashes of user's objects of file: the phase (key) and the map of keys and hashes (value),
+#                 the hash contains the type of server object as well
+# manifestRecords - the journal records of published or restored objects: (phase, key) (key) and record (value)
+# deltaModifiedObjects - the changed objects which are modified at server instead of adding:
+#                        (type of server object, name of user's object) (key) and record of old manifest (value)
+# deltaModifiedUids - the uids of changed objects, these objects of server are not used instead of user's objects
+# deltaGroupsMembers - the members of changed groups by old manifest: the name of group at server (key) and
+#                      the list of members (value), the members which are not in file are removed from group
+# deltaReplacedRecords - the records of old manifest which objects are removed from file or changed, the objects
+#                        which are not modified and not used are deleted at the end of run
+# deltaRemovedRules - the records of old manifest which rules are deleted before the rules are added
+# deltaNatRulesPositions - the positions of NAT rules which are inserted between the kept rules:
+#                          the index of NAT rule (key) and the position (value)
+contentHashes = {}
+manifestRecords = {}
+deltaModifiedObjects = {}
+deltaModifiedUids = set()
+deltaGroupsMembers = {}
+deltaReplacedRecords = []
+deltaRemovedRules = []
+deltaNatRulesPositions = {}
+
+# the phases of user's objects which are written to manifest: the type name (key) and tuple of the phase and
+# the type of server object (value)
+manifestObjectsTypes = {
+    'CheckPoint_Domain': ("domains", "dns-domain"),
+    'CheckPoint_Host': ("hosts", "host"),
+    'CheckPoint_Network': ("networks", "network"),
+    'CheckPoint_Range': ("ranges", "address-range"),
+    'CheckPoint_NetworkGroup': ("network-groups", "group"),
+    'CheckPoint_GroupWithExclusion': ("network-groups", "group-with-exclusion"),
+    'CheckPoint_SimpleGateway': ("simple-gateways", "simple-gateway"),
+    'CheckPoint_Zone': ("zones", "security-zone"),
+    'CheckPoint_TcpService': ("services-tcp", "service-tcp"),
+    'CheckPoint_UdpService': ("services-udp", "service-udp"),
+    'CheckPoint_SctpService': ("services-sctp", "service-sctp"),
+    'CheckPoint_IcmpService': ("services-icmp", "service-icmp"),
+    'CheckPoint_OtherService': ("services-other", "service-other"),
+    'CheckPoint_ServiceGroup': ("services-groups", "service-group"),
+    'CheckPoint_TimeGroup': ("times-groups", "time-group"),
+    'CheckPoint_Time': ("times", "time")
+}
+
+# the patterns are compiled once, the IP addresses of user's objects are normalized by normalizeUserObjectIp
+ipv4Pattern = re.compile(r"""
+    ^
+    (?:
+      # Dotted variants:
+      (?:
+        # Decimal 1-255 (no leading 0's)
+        [3-9]\d?|2(?:5[0-5]|[0-4]?\d)?|1\d{0,2}
+      |
+        0x0*[0-9a-f]{1,2}  # Hexadecimal 0x0 - 0xFF (possible leading 0's)
+      |
+        0+[1-3]?[0-7]{0,2} # Octal 0 - 0377 (possible leading 0's)
+      )
+      (?:                  # Repeat 0-3 times, separated by a dot
+        \.
+        (?:
+          [3-9]\d?|2(?:5[0-5]|[0-4]?\d)?|1\d{0,2}
+        |
+          0x0*[0-9a-f]{1,2}
+        |
+          0+[1-3]?[0-7]{0,2}
+        )
+      ){0,3}
+    |
+      0x0*[0-9a-f]{1,8}    # Hexadecimal notation, 0x0 - 0xffffffff
+    |
+      0+[0-3]?[0-7]{0,10}  # Octal notation, 0 - 037777777777
+    |
+      # Decimal notation, 1-4294967295:
+      429496729[0-5]|42949672[0-8]\d|4294967[01]\d\d|429496[0-6]\d{3}|
+      42949[0-5]\d{4}|4294[0-8]\d{5}|429[0-3]\d{6}|42[0-8]\d{7}|
+      4[01]\d{8}|[1-3]\d{0,9}|[4-9]\d{0,8}
+    )
+    $
+""", re.VERBOSE | re.IGNORECASE)
+
+ipv6Pattern = re.compile(r"""
+    ^
+    \s*                         # Leading whitespace
+    (?!.*::.*::)                # Only a single whildcard allowed
+    (?:(?!:)|:(?=:))            # Colon iff it would be part of a wildcard
+    (?:                         # Repeat 6 times:
+        [0-9a-f]{0,4}           #   A group of at most four hexadecimal digits
+        (?:(?<=::)|(?<!::):)    #   Colon unless preceeded by wildcard
+    ){6}                        #
+    (?:                         # Either
+        [0-9a-f]{0,4}           #   Another group
+        (?:(?<=::)|(?<!::):)    #   Colon unless preceeded by wildcard
+        [0-9a-f]{0,4}           #   Last group
+        (?: (?<=::)             #   Colon iff preceeded by exacly one colon
+         |  (?<!:)              #
+         |  (?<=:) (?<!::) :    #
+         )                      # OR
+     |                          #   A v4 address with NO leading zeros
+        (?:25[0-4]|2[0-4]\d|1\d\d|[1-9]?\d)
+        (?: \.
+            (?:25[0-4]|2[0-4]\d|1\d\d|[1-9]?\d)
+        ){3}
+    )
+    \s*                         # Trailing whitespace
+    $
+""", re.VERBOSE | re.IGNORECASE | re.DOTALL)
+
 
 # printing messages to console and log file
 # res_action - response from server, used if response is not OK
 # message - message to inform user
 # error - message with mark to inform user about issue
+# level - the level of message; "warn" is used for issues, "report" for messages which start from "REPORT:" and
+#         "info" for other messages if it is not set
 # ---
 # returns: nothing
-def printStatus(res_action, message, error=None):
+def printStatus(res_action, message, error=None, level=None):
     line = ""
+    lineLevel = "warn"
     if res_action is not None and res_action.success is False:
         if 'errors' in res_action.data:
             for msg_err in res_action.data['errors']:
@@ -35,12 +260,81 @@ def printStatus(res_action, message, error=None):
                 line = "WARN:" + "\t" + "Err of getting message from the mgmt server" + "\n"
     elif message is not None:
         line += "\t" + message + "\n"
+        lineLevel = level if level is not None else "report" if message.startswith("REPORT:") else "info"
     elif error is not None:
         line += "WARN:" + "\t" + error + "\n"
     if line != "":
-        print(line.rstrip())
-        file_log.write(line)
-        file_log.flush()
+        with printLock:
+            if logLevels[lineLevel] <= logLevel:
+                logConsoleBuffer.append(line.rstrip() + "\n")
+            if logLevels[lineLevel] <= max(logLevel, logLevels["report"]):
+                logFileBuffer.append(line if not isLogJsonLines else provideJsonLogLines(lineLevel, line))
+            if not isLogBuffered or len(logConsoleBuffer) + len(logFileBuffer) >= logBufferLines:
+                writeLogBuffers(not isLogBuffered)
+
+
+# checking if the messages of level are written to console and log file; it is used for the messages which are
+# expensive to make
+# level - the level of message
+# ---
+# returns: True - if the messages are written, False - otherwise
+def isLogLevelEnabled(level):
+    return logLevels[level] <= logLevel
+
+
+# providing the JSON records of the lines of message for the log file in JSON Lines format
+# level - the level of message
+# line - the lines of message, see printStatus
+# ---
+# returns: the records, each record is terminated by new line
+def provideJsonLogLines(level, line):
+    records = ""
+    for message in line.splitlines():
+        message = message[len("WARN:\t"):] if message.startswith("WARN:\t") else message.lstrip("\t")
+        if message != "":
+            records += json.dumps({"time": round(time.time(), 3), "level": level,
+                                   "phase": getattr(apiCallState, "phase", None), "message": message}) + "\n"
+    return records
+
+
+# writing the buffered lines to console and log file; printLock has to be held by caller
+# isFlushed - the flag which indicates to flush console and log file after writing
+# ---
+# returns: nothing
+def writeLogBuffers(isFlushed):
+    if len(logConsoleBuffer) > 0:
+        sys.stdout.write("".join(logConsoleBuffer))
+        del logConsoleBuffer[:]
+    if len(logFileBuffer) > 0 and not file_log.closed:
+        file_log.write("".join(logFileBuffer))
+    del logFileBuffer[:]
+    if isFlushed:
+        sys.stdout.flush()
+        if not file_log.closed:
+            file_log.flush()
+
+
+# writing the buffered lines to console and log file and flushing them
+# ---
+# returns: nothing
+def flushLog():
+    with printLock:
+        writeLogBuffers(True)
+
+
+# starting buffering of messages; the buffers are flushed every args.log_flush_interval seconds and at exit
+# ---
+# returns: nothing
+def startLogBuffering():
+    global isLogBuffered
+
+    def flushLogPeriodically():
+        while True:
+            time.sleep(args.log_flush_interval)
+            flushLog()
+
+    isLogBuffered = True
+    threading.Thread(target=flushLogPeriodically, daemon=True).start()
 
 
 # printing info message "process..." with delimeters
@@ -48,33 +342,863 @@ def printStatus(res_action, message, error=None):
 # ---
 # returns: nothing
 def printMessageProcessObjects(objectsType):
+    # the requests are counted by phases for the metrics and for --plan mode
+    apiCallState.phase = objectsType.rstrip(".")
     printStatus(None, "==========")
     printStatus(None, "process " + objectsType + " ...")
     printStatus(None, "")
 
 
-# publishing to database new updates by condition; increasing counter by 1
-# counter - is number of new updates. if it equals threshold then updates will be published
-# isForced - publishing to database anyway
+# checking if there are no user's objects; the objects are not consumed if they are provided by iterator
+# userObjects - list or iterator of user's objects
 # ---
-# returns: updated counter
-def publishUpdate(counter, isForced):
-    if counter < 0:
-        counter = 0
-    counter += 1
-    if isForced or counter >= args.threshold:
-        if not isForced:
-            printStatus(None, "")
-        printStatus(None, "----------")
-        printStatus(None, "publishing to database...")
-        res_publish = client.api_call("publish", {})
-        if res_publish.success:
-            counter = 0
-        printStatus(res_publish, "publish is completed")
-        printStatus(None, "----------")
-        if isForced:
-            printStatus(None, "")
-    return counter
+# returns: tuple: True if there are no objects, otherwise False; and list or iterator which provides all objects
+def peekUserObjects(userObjects):
+    if isinstance(userObjects, list):
+        return len(userObjects) == 0, userObjects
+    userObjectsIterator = iter(userObjects)
+    for firstUserObject in userObjectsIterator:
+        return False, itertools.chain([firstUserObject], userObjectsIterator)
+    return True, []
+
+
+# providing the state of publish scheduler for the session of client, the state is created at first call
+# client - client object
+# ---
+# returns: the map with the number of updates, the size of changes and the time of the first change in the session
+#          after the last publish
+def provideSessionState(client):
+    with publishLock:
+        if id(client) not in publishSessions:
+            publishSessions[id(client)] = {"count": 0, "size": 0, "since": None}
+        return publishSessions[id(client)]
+
+
+# tracking the changes which are done in the session of client: the size of successful add/set/delete requests
+# is added to the state of session; api_call of client object is wrapped, so all calls are tracked
+# the number of requests which are sent at the same time is limited by args.in_flight for the session and
+# by args.server_in_flight for all sessions
+# client - client object
+# ---
+# returns: nothing
+def trackSessionChanges(client):
+    global serverSemaphore
+    apiCall = client.api_call
+    with publishLock:
+        if serverSemaphore is None and args.server_in_flight > 0:
+            serverSemaphore = threading.BoundedSemaphore(args.server_in_flight)
+        sessionsSemaphores[id(client)] = threading.BoundedSemaphore(args.in_flight)
+    sessionSemaphore = sessionsSemaphores[id(client)]
+
+    def limitedApiCall(command, payload, *callArgs, **callKwargs):
+        if getattr(apiCallState, "isRunning", False):
+            return apiCall(command, payload, *callArgs, **callKwargs)
+        with sessionSemaphore:
+            if serverSemaphore is not None:
+                serverSemaphore.acquire()
+            apiCallState.isRunning = True
+            try:
+                return apiCall(command, payload, *callArgs, **callKwargs)
+            finally:
+                apiCallState.isRunning = False
+                if serverSemaphore is not None:
+                    serverSemaphore.release()
+
+    def trackedApiCall(command, payload=None, *callArgs, **callKwargs):
+        callStart = time.time()
+        res = None
+        try:
+            res = limitedApiCall(command, payload, *callArgs, **callKwargs)
+        finally:
+            recordApiCallMetrics(command, payload, time.time() - callStart, res)
+            if file_api_trace is not None:
+                traceApiCall(client, command, payload, time.time() - callStart, res)
+        if res.success and command.startswith(("add-", "set-", "delete-")):
+            session = provideSessionState(client)
+            # the size is measured only if it is limited, the payload of batch can be large
+            if args.publish_size > 0:
+                session["size"] += len(json.dumps(payload))
+            if session["since"] is None:
+                session["since"] = time.time()
+        return res
+
+    client.api_call = trackedApiCall
+
+
+# opening the trace of requests; the file is compressed by gzip if --api-trace-gzip is set
+# fileName - the name of trace file, ".gz" is added if the file is compressed
+# ---
+# returns: nothing
+def openApiTrace(fileName):
+    global file_api_trace, apiTraceSize
+    if args.api_trace_gzip.lower() == "true":
+        file_api_trace = gzip.open(fileName + ".gz", "wt")
+    else:
+        file_api_trace = open(fileName, "w")
+    apiTraceSize = 0
+
+
+# closing the trace of requests
+# ---
+# returns: nothing
+def closeApiTrace():
+    global file_api_trace
+    with apiTraceLock:
+        if file_api_trace is not None:
+            file_api_trace.close()
+            file_api_trace = None
+
+
+# rotating the trace files when the current file reaches --api-trace-max-size megabytes:
+# the trace file is renamed to <file>.1, <file>.1 to <file>.2 and so on, the oldest file is removed;
+# apiTraceLock has to be held by caller
+# ---
+# returns: nothing
+def rotateApiTrace():
+    fileName = args.api_trace
+    extension = ".gz" if args.api_trace_gzip.lower() == "true" else ""
+    file_api_trace.close()
+    for i in range(args.api_trace_files - 2, 0, -1):
+        if os.path.exists(fileName + "." + str(i) + extension):
+            os.replace(fileName + "." + str(i) + extension, fileName + "." + str(i + 1) + extension)
+    if args.api_trace_files > 1:
+        os.replace(fileName + extension, fileName + ".1" + extension)
+    openApiTrace(fileName)
+
+
+# replacing the values of secret fields, e.g. password, by "***"
+# data - payload of request or data of response
+# ---
+# returns: data without secret values
+def redactApiTraceData(data):
+    if isinstance(data, dict):
+        return dict((key, "***" if key in apiTraceRedactedKeys else redactApiTraceData(value))
+                    for key, value in data.items())
+    if isinstance(data, list):
+        return [redactApiTraceData(value) for value in data]
+    return data
+
+
+# writing the request and the response to the trace; the response body is truncated to --api-trace-max-body
+# characters if it is set
+# client - client object which sent the request
+# command - the command of request
+# payload - the payload of request
+# duration - the time of request in seconds
+# res - response from server, None - if the request is not completed
+# ---
+# returns: nothing
+def traceApiCall(client, command, payload, duration, res):
+    global apiTraceSize
+    record = {"time": round(time.time() - duration, 3), "duration": round(duration, 6),
+              "phase": getattr(apiCallState, "phase", None), "command": command,
+              "payload": redactApiTraceData(payload)}
+    if res is not None:
+        record["success"] = res.success
+        record["status-code"] = res.status_code
+        # the redacted data is a copy of response, it is serialized once with the record unless it can be truncated
+        response = redactApiTraceData(res.data)
+        responseText = json.dumps(response) if args.api_trace_max_body > 0 else None
+        if responseText is not None and len(responseText) > args.api_trace_max_body:
+            record["response-truncated"] = responseText[:args.api_trace_max_body]
+            record["response-size"] = len(responseText)
+        else:
+            record["response"] = response
+    with apiTraceLock:
+        if file_api_trace is None:
+            return
+        record["session"] = apiTraceSessions.setdefault(id(client), len(apiTraceSessions) + 1)
+        line = json.dumps(record) + "\n"
+        file_api_trace.write(line)
+        apiTraceSize += len(line)
+        if 0 < args.api_trace_max_size * 1048576 <= apiTraceSize:
+            rotateApiTrace()
+
+
+# recording the request in the metrics of current phase
+# the request is counted as retry if the previous request of the same command and name failed in the thread,
+# e.g. the host is added again with ignore-warnings or the members are added by halves
+# command - the command of request
+# payload - the payload of request
+# duration - the time of request in seconds
+# res - response from server, None - if the request is not completed
+# ---
+# returns: nothing
+def recordApiCallMetrics(command, payload, duration, res):
+    phase = getattr(apiCallState, "phase", None) or "session"
+    name = payload.get('name') if isinstance(payload, dict) else None
+    failedCalls = getattr(apiCallState, "failedCalls", None)
+    if failedCalls is None:
+        failedCalls = apiCallState.failedCalls = {}
+    isRetry = command in failedCalls and failedCalls[command] == name
+    isFailed = res is None or res.success is False
+    if isFailed:
+        failedCalls[command] = name
+    else:
+        failedCalls.pop(command, None)
+    with metricsLock:
+        metrics = apiCallsMetrics.setdefault((phase, command), {"durations": [], "failures": 0, "retries": 0})
+        metrics["durations"].append(duration)
+        metrics["failures"] += 1 if isFailed else 0
+        metrics["retries"] += 1 if isRetry else 0
+
+
+# providing the statistics of requests: the number of requests, failures and retries and the latency percentiles
+# metricsList - the list of metrics, see apiCallsMetrics
+# ---
+# returns: the statistics in JSON format
+def provideApiCallsStatistics(metricsList):
+    durations = sorted(duration for metrics in metricsList for duration in metrics["durations"])
+
+    def providePercentile(percent):
+        return round(durations[max(int(len(durations) * percent / 100.0 + 0.999999) - 1, 0)], 6) if durations else 0
+
+    return {
+        "requests": len(durations),
+        "failures": sum(metrics["failures"] for metrics in metricsList),
+        "retries": sum(metrics["retries"] for metrics in metricsList),
+        "total-seconds": round(sum(durations), 6),
+        "p50": providePercentile(50),
+        "p95": providePercentile(95),
+        "p99": providePercentile(99),
+        "max": round(durations[-1], 6) if durations else 0
+    }
+
+
+# writing the metrics of requests to JSON summary and to Prometheus text format file
+# fileName - the name of files without extension, ".json" and ".prom" are added
+# isCompleted - the flag which indicates that the migration is completed
+# ---
+# returns: nothing
+def writeMetrics(fileName, isCompleted):
+    with metricsLock:
+        metricsItems = sorted(apiCallsMetrics.items())
+    runDuration = time.time() - runStartTime
+    summary = provideApiCallsStatistics([metrics for key, metrics in metricsItems])
+    summary.update({"start-time": round(runStartTime, 3), "duration": round(runDuration, 3), "completed": isCompleted,
+                    "file": args.file, "domain": args.domain, "commands": {}, "phases": {}})
+    for command in sorted(set(command for (phase, command), metrics in metricsItems)):
+        summary["commands"][command] = provideApiCallsStatistics(
+            [metrics for key, metrics in metricsItems if key[1] == command])
+    for phase in sorted(set(phase for (phase, command), metrics in metricsItems)):
+        summary["phases"][phase] = provideApiCallsStatistics(
+            [metrics for key, metrics in metricsItems if key[0] == phase])
+        summary["phases"][phase]["commands"] = dict(
+            (key[1], provideApiCallsStatistics([metrics])) for key, metrics in metricsItems if key[0] == phase)
+    with open(fileName + ".json", "w") as metricsFile:
+        json.dump(summary, metricsFile, indent=2)
+    lines = ["# HELP smartconnector_api_requests_total The number of requests which are sent to server.",
+             "# TYPE smartconnector_api_requests_total counter"]
+    lines += ["smartconnector_api_requests_total{%s} %d" % (provideMetricsLabels(key), len(metrics["durations"]))
+              for key, metrics in metricsItems]
+    lines += ["# HELP smartconnector_api_request_failures_total The number of requests which are failed.",
+              "# TYPE smartconnector_api_request_failures_total counter"]
+    lines += ["smartconnector_api_request_failures_total{%s} %d" % (provideMetricsLabels(key), metrics["failures"])
+              for key, metrics in metricsItems]
+    lines += ["# HELP smartconnector_api_request_retries_total The number of requests which are sent again.",
+              "# TYPE smartconnector_api_request_retries_total counter"]
+    lines += ["smartconnector_api_request_retries_total{%s} %d" % (provideMetricsLabels(key), metrics["retries"])
+              for key, metrics in metricsItems]
+    lines += ["# HELP smartconnector_api_request_duration_seconds The latency of requests.",
+              "# TYPE smartconnector_api_request_duration_seconds summary"]
+    for key, metrics in metricsItems:
+        statistics = provideApiCallsStatistics([metrics])
+        for quantile, percentile in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append("smartconnector_api_request_duration_seconds{%s,quantile=\"%s\"} %s" %
+                         (provideMetricsLabels(key), quantile, repr(statistics[percentile])))
+        lines.append("smartconnector_api_request_duration_seconds_sum{%s} %s" %
+                     (provideMetricsLabels(key), repr(statistics["total-seconds"])))
+        lines.append("smartconnector_api_request_duration_seconds_count{%s} %d" %
+                     (provideMetricsLabels(key), statistics["requests"]))
+    lines += ["# HELP smartconnector_run_duration_seconds The wall time of run.",
+              "# TYPE smartconnector_run_duration_seconds gauge",
+              "smartconnector_run_duration_seconds %s" % repr(round(runDuration, 3)),
+              "# HELP smartconnector_run_completed The flag which indicates that the migration is completed.",
+              "# TYPE smartconnector_run_completed gauge",
+              "smartconnector_run_completed %d" % (1 if isCompleted else 0),
+              "# HELP smartconnector_run_start_time_seconds The time when the run is started.",
+              "# TYPE smartconnector_run_start_time_seconds gauge",
+              "smartconnector_run_start_time_seconds %s" % repr(round(runStartTime, 3))]
+    with open(fileName + ".prom", "w") as metricsFile:
+        metricsFile.write("\n".join(lines) + "\n")
+    printStatus(None, "REPORT: " + str(summary["requests"]) + " requests, " + str(summary["failures"]) + " failed, " +
+                str(summary["retries"]) + " retries; p50/p95/p99 latency: " +
+                "/".join("{:.1f}".format(summary[percentile] * 1000) for percentile in ("p50", "p95", "p99")) + " ms")
+    printStatus(None, "REPORT: metrics are written to " + fileName + ".json and " + fileName + ".prom")
+
+
+# providing the labels of metrics in Prometheus text format
+# metricsKey - the phase and the command
+# ---
+# returns: the labels as string
+def provideMetricsLabels(metricsKey):
+    return ",".join(label + "=\"" + value.replace("\\", "\\\\").replace("\"", "\\\"") + "\""
+                    for label, value in (("phase", metricsKey[0]), ("command", metricsKey[1])))
+
+
+# publishing to database new updates of session by condition; increasing the number of updates by 1
+# the updates are published if the number of updates reaches threshold, if the size of changes reaches
+# --publish-size or if the first change which is not published was done --publish-interval seconds ago
+# client - client object which session will be published
+# isForced - publishing to database anyway if there are changes which are not published; it is used only if
+#            the next step depends on committed state, e.g. the objects of worker session are used by main session
+# threshold - the number of updates which are published together; args.threshold is used if it is not set
+# ---
+# returns: nothing
+def publishUpdate(client, isForced, threshold=None):
+    session = provideSessionState(client)
+    if threshold is None:
+        threshold = args.threshold
+    if isForced:
+        if session["count"] == 0 and session["since"] is None:
+            return
+    else:
+        session["count"] += 1
+        if session["count"] < threshold and \
+                (args.publish_size <= 0 or session["size"] < args.publish_size * 1024) and \
+                (args.publish_interval <= 0 or session["since"] is None or
+                 time.time() - session["since"] < args.publish_interval):
+            return
+        printStatus(None, "")
+    printStatus(None, "----------")
+    printStatus(None, "publishing to database...")
+    publishStart = time.time()
+    res_publish = client.api_call("publish", {})
+    with publishLock:
+        publishStatistics["count"] += 1
+        publishStatistics["time"] += time.time() - publishStart
+    if res_publish.success:
+        session["count"] = 0
+        session["size"] = 0
+        session["since"] = None
+        commitJournalEntries(client)
+    printStatus(res_publish, "publish is completed")
+    printStatus(None, "----------")
+    if isForced:
+        printStatus(None, "")
+
+
+# opening the journal of published objects; the journal is append-only file where each line is JSON record
+# fileName - the name of journal file
+# isResume - True: to load records of interrupted run and to append new records; False: to start new journal
+# ---
+# returns: nothing
+def openJournal(fileName, isResume):
+    global file_journal
+    journalEntries.clear()
+    journalPendingEntries.clear()
+    if isResume and os.path.exists(fileName):
+        with open(fileName) as journal_file:
+            for line in journal_file:
+                if line.strip() == "":
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line can be broken if the run is interrupted while writing
+                    continue
+                journalEntries.setdefault(record['phase'], {})[record['key']] = record['value']
+                manifestRecords[(record['phase'], record['key'])] = record
+        printStatus(None, "journal is loaded: " + str(sum(len(entries) for entries in journalEntries.values()))
+                    + " published objects will be skipped")
+        file_journal = open(fileName, "a")
+    else:
+        if isResume:
+            printStatus(None, "journal does not exist, the run is started from the beginning")
+        file_journal = open(fileName, "w")
+
+
+# getting the value which is recorded in journal by the interrupted run
+# phase - the name of phase, e.g. hosts
+# key - the key of object in the phase, usually the name of user's object
+# ---
+# returns: recorded value, None - if object is not recorded
+def getJournalEntry(phase, key):
+    if phase in journalEntries:
+        return journalEntries[phase].get(key)
+    return None
+
+
+# providing the object which is restored from journal or from the manifest of --delta by its name at server
+# the uid is provided as well if it is recorded, so the object is referenced by uid as the added one
+# phase - the name of phase, e.g. network-groups
+# key - the key of object in the phase, usually the name of user's object
+# restoredName - the name of object at server which is restored from journal
+# ---
+# returns: the object in JSON format as it is returned by server: the name and the uid if it is known
+def provideRestoredObject(phase, key, restoredName):
+    restoredObject = {"name": restoredName}
+    record = manifestRecords.get((phase, key))
+    if record is not None and record.get('uid') is not None:
+        restoredObject["uid"] = record['uid']
+    return restoredObject
+
+
+# restoring the object from journal if the object has been published by the interrupted run
+# the record is restored once: the next user's object with the same name is processed as usual;
+# the object is not restored if the map contains its name with another value: e.g. services map contains the services
+# of server, the published service is restored if the map contains it already
+# phase - the name of phase, e.g. hosts
+# userObjectName - the name of user's object
+# mergedObjectsNamesMap - the map which contains name of user's object (key) and uid or name of resulting object (value)
+# ---
+# returns: True - if the object is restored, False - otherwise
+def restoreFromJournal(phase, userObjectName, mergedObjectsNamesMap):
+    value = getJournalEntry(phase, userObjectName)
+    if value is None or (phase, userObjectName) in journalRestoredKeys:
+        return False
+    if userObjectName in mergedObjectsNamesMap and mergedObjectsNamesMap[userObjectName] != value:
+        return False
+    journalRestoredKeys.add((phase, userObjectName))
+    mergedObjectsNamesMap[userObjectName] = value
+    printStatus(None, "REPORT: " + userObjectName + " is restored from journal as " + str(value))
+    printStatus(None, "")
+    return True
+
+
+# recording the object which is added to server; the record is written to journal after the session is published
+# client - client object which session contains the object
+# phase - the name of phase, e.g. hosts
+# key - the key of object in the phase, usually the name of user's object
+# value - the value which is restored by resumed run, usually the uid or the name of resulting object;
+#         the record contains the uid as well if the object is added or modified for the user's object
+# ---
+# returns: nothing
+def recordJournalEntry(client, phase, key, value):
+    record = {"phase": phase, "key": key, "value": value}
+    if isinstance(value, str):
+        with serverNamesLock:
+            # the object is owned by the first user's object which is recorded, the next user's objects which are
+            # mapped to it (e.g. by the same IP) are recorded without uid
+            if value in serverUidsNames:
+                record["uid"] = value
+                serverObjectName = serverUidsNames.pop(value)
+                if serverObjectName is not None:
+                    record["name"] = serverObjectName
+                    serverNamesUids.pop(serverObjectName, None)
+            elif value in serverNamesUids:
+                record["uid"] = serverNamesUids.pop(value)
+                serverUidsNames.pop(record["uid"], None)
+    with journalLock:
+        journalPendingEntries.setdefault(id(client), []).append(record)
+
+
+# writing to journal the records of published session
+# client - client object which session is published
+# ---
+# returns: nothing
+def commitJournalEntries(client):
+    with journalLock:
+        pendingEntries = journalPendingEntries.pop(id(client), [])
+        if file_journal is None or len(pendingEntries) == 0:
+            return
+        for record in pendingEntries:
+            manifestRecords[(record['phase'], record['key'])] = record
+            file_journal.write(json.dumps(record) + "\n")
+        file_journal.flush()
+        os.fsync(file_journal.fileno())
+
+
+# providing the hash of content of user's object
+# userObject - JSON presentation of user's object
+# ---
+# returns: SHA-1 hash in hex format
+def provideContentHash(userObject):
+    return hashlib.sha1(json.dumps(userObject, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# collecting the hashes of user's objects before the objects are processed, the processing changes the objects
+# the hashes of objects are kept with the type of server object by phases and names, the hashes of rules are kept as
+# the list by the names of layers and the hashes of NAT rules are kept as the list
+# userObjects - the map of user's objects by type, see parseUserObjects
+# ---
+# returns: nothing
+def collectContentHashes(userObjects):
+    contentHashes.clear()
+    for objectsName, phaseObjects in userObjects.items():
+        if objectsName == "package" or objectsName == "nat-rules":
+            continue
+        for userObject in phaseObjects:
+            phase, serverObjectType = manifestObjectsTypes[userObject['TypeName']]
+            contentHashes.setdefault(phase, {}).setdefault(userObject['Name'],
+                                                           (provideContentHash(userObject), serverObjectType))
+    contentHashes["nat-rules"] = [provideContentHash(userNatRule) for userNatRule in userObjects.get("nat-rules", [])]
+    userPackage = userObjects.get("package")
+    if userPackage is None:
+        return
+    contentHashes["package"] = {userPackage['Name']: (provideContentHash(
+        {key: value for key, value in userPackage.items() if key not in ("SubPolicies", "ParentLayer")}), "package")}
+    contentHashes["layers"] = {}
+    contentHashes["access-rules"] = {}
+    for userSubLayer in userPackage['SubPolicies'] or []:
+        contentHashes["layers"][userSubLayer['Name']] = (provideContentHash(
+            {key: value for key, value in userSubLayer.items() if key != "Rules"}), "access-layer")
+        contentHashes["access-rules"][userSubLayer['Name']] = [provideContentHash(userRule)
+                                                               for userRule in userSubLayer['Rules']]
+    if userPackage['ParentLayer'] is not None:
+        # "Clean up" rule of parent layer is not added, see processPackage
+        contentHashes["access-rules"][userPackage['ParentLayer']['Name']] = \
+            [provideContentHash(userRule) for userRule in userPackage['ParentLayer']['Rules'][:-1]]
+
+
+# providing the name of layer at server by the records of package and layers
+# the name of parent layer contains the name of package, so the name of package is replaced in it
+# originalLayerName - the name of layer in file
+# records - the map of records: (phase, key) (key) and record (value)
+# ---
+# returns: the name of layer at server, None - if the layer is not recorded
+def provideServerLayerName(originalLayerName, records):
+    if ("layers", originalLayerName) in records:
+        return records[("layers", originalLayerName)]['value']
+    for (phase, key), record in records.items():
+        if phase == "package" and key in originalLayerName:
+            return originalLayerName.replace(key, record['value'])
+    return None
+
+
+# restoring the record of old manifest as the record of journal, so the object is reused by the run
+# record - the record of old manifest
+# key - the key of object in the phase, it is changed for the rules which are moved
+# ---
+# returns: nothing
+def restoreDeltaRecord(record, key):
+    journalEntries.setdefault(record['phase'], {}).setdefault(key, record['value'])
+    manifestRecords.setdefault((record['phase'], key), dict(record, key=key))
+
+
+# matching the rules of old manifest with the hashes of rules of file
+# the unchanged rules keep the order, so the rules between them are inserted and deleted only
+# oldRules - the records of rules of old manifest in the order of rulebase
+# ruleHashes - the hashes of rules of file
+# ---
+# returns: tuple: the list of tuples of index of rule in file and record of unchanged rule, the list of records of
+#          rules which are deleted
+def matchDeltaRules(oldRules, ruleHashes):
+    keptRules = []
+    removedRules = []
+    matcher = difflib.SequenceMatcher(None, [oldRule.get('hash') for oldRule in oldRules], ruleHashes, autojunk=False)
+    for tag, oldFirst, oldLast, newFirst, newLast in matcher.get_opcodes():
+        if tag == "equal":
+            keptRules.extend(zip(range(newFirst, newLast), oldRules[oldFirst:oldLast]))
+        else:
+            removedRules.extend(oldRules[oldFirst:oldLast])
+    return keptRules, removedRules
+
+
+# opening the manifest of previous run and comparing it with the objects of file (see --delta)
+# the unchanged objects, group members and rules are restored as the journal records, so they are skipped;
+# the changed objects are modified instead of adding; the removed rules are deleted at once,
+# the removed objects are deleted at the end of run, see deleteDeltaObjects
+# client - client object
+# fileName - the name of manifest file
+# ---
+# returns: nothing
+def openDelta(client, fileName):
+    printMessageProcessObjects("delta manifest")
+    with open(fileName) as manifest_file:
+        manifest = json.load(manifest_file)
+    oldRecords = {}
+    for record in manifest['records']:
+        oldRecords[(record['phase'], record['key'])] = record
+    unchangedCount = 0
+    oldLayersRules = {}
+    for (phase, key), record in oldRecords.items():
+        if phase.endswith("-members") or phase == "nat-rules":
+            continue
+        if phase == "access-rules":
+            layerName, i = key.rsplit("#", 1)
+            oldLayersRules.setdefault(layerName, []).append((int(i), record))
+            continue
+        if record.get('type') is None:
+            # the object is not in file of previous run, e.g. it is restored from journal of other file
+            continue
+        contentHash = contentHashes.get(phase, {}).get(key)
+        if contentHash is None or contentHash[1] != record.get('type'):
+            deltaReplacedRecords.append(record)
+        elif contentHash[0] != record.get('hash') and record.get('uid') is None:
+            # the object of server is not owned by the user's object, e.g. it is used by the same IP,
+            # so the changed object is processed as new one
+            continue
+        elif contentHash[0] == record.get('hash') or phase == "package" or phase == "layers":
+            # the package and the layers are reused, their rules are compared below
+            restoreDeltaRecord(record, key)
+            if (phase + "-members", key) in oldRecords:
+                restoreDeltaRecord(oldRecords[(phase + "-members", key)], key)
+            unchangedCount += 1
+        else:
+            deltaModifiedObjects[(record['type'], key)] = record
+            deltaModifiedUids.add(record.get('uid'))
+            deltaReplacedRecords.append(record)
+            if (phase + "-members", key) in oldRecords and \
+                    isinstance(oldRecords[(phase + "-members", key)]['value'], list):
+                deltaGroupsMembers[record['value']] = oldRecords[(phase + "-members", key)]['value']
+    keptRulesCount = 0
+    for originalLayerName, ruleHashes in contentHashes.get("access-rules", {}).items():
+        serverLayerName = provideServerLayerName(originalLayerName, oldRecords)
+        if serverLayerName is None or serverLayerName not in oldLayersRules:
+            continue
+        oldRules = [record for i, record in sorted(oldLayersRules[serverLayerName], key=operator.itemgetter(0))]
+        keptRules, removedRules = matchDeltaRules(oldRules, ruleHashes)
+        for i, record in keptRules:
+            restoreDeltaRecord(record, serverLayerName + "#" + str(i))
+        keptRulesCount += len(keptRules)
+        deltaRemovedRules.extend(("delete-access-rule", {"uid": record['value'], "layer": serverLayerName})
+                                 for record in removedRules)
+    packageRecords = [record for (phase, key), record in oldRecords.items()
+                      if phase == "package" and key in contentHashes.get("package", {})]
+    if len(packageRecords) > 0:
+        oldNatRules = sorted((record for (phase, key), record in oldRecords.items() if phase == "nat-rules"),
+                             key=lambda record: int(record['key']))
+        keptRules, removedRules = matchDeltaRules(oldNatRules, contentHashes.get("nat-rules", []))
+        keptRulesUids = {}
+        for i, record in keptRules:
+            restoreDeltaRecord(record, str(i))
+            keptRulesUids[i] = record['value']
+        keptRulesCount += len(keptRules)
+        deltaRemovedRules.extend(("delete-nat-rule", {"uid": record['value'], "package": packageRecords[0]['value']})
+                                 for record in removedRules)
+        # the added NAT rule is placed above the next unchanged rule, so the order of file is kept
+        nextRuleUid = None
+        for i in range(len(contentHashes.get("nat-rules", [])) - 1, -1, -1):
+            if i in keptRulesUids:
+                nextRuleUid = keptRulesUids[i]
+            elif isinstance(nextRuleUid, str):
+                deltaNatRulesPositions[str(i)] = {"above": nextRuleUid}
+    printStatus(None, "REPORT: delta manifest is loaded: " + str(unchangedCount) + " objects and " +
+                str(keptRulesCount) + " rules are not changed, " + str(len(deltaModifiedObjects)) +
+                " objects are changed, " + str(len(deltaRemovedRules)) + " rules are deleted")
+    printStatus(None, "")
+    for apiCommand, payload in deltaRemovedRules:
+        if not isinstance(payload['uid'], str):
+            printStatus(None, None, "the rule can not be deleted, its uid is not recorded by manifest")
+            continue
+        res_delete_rule = client.api_call(apiCommand, payload)
+        printStatus(res_delete_rule, "REPORT: rule " + payload['uid'] + " is deleted")
+        if res_delete_rule.success:
+            publishUpdate(client, False, args.rules_threshold)
+    printStatus(None, "")
+
+
+# modifying the object of previous run at server by the changed user's object (see --delta)
+# client - client object
+# serverObjectType - the type of server object, e.g. host
+# payload - JSON representation of user's object for add-... request
+# ---
+# returns: modified object from server in JSON format, None - otherwise
+def modifyUserObjectAtServer(client, serverObjectType, payload):
+    record = deltaModifiedObjects.pop((serverObjectType, payload['name']), None)
+    if record is None:
+        return None
+    setPayload = {key: value for key, value in payload.items() if key != "name"}
+    setPayload["uid"] = record['uid']
+    setPayload["ignore-warnings"] = True
+    res_set_obj = client.api_call("set-" + serverObjectType, setPayload)
+    printStatus(res_set_obj, None)
+    if res_set_obj.success is False:
+        printStatus(None, "REPORT: " + payload['name'] + " is changed since previous run and is not modified")
+        return None
+    registerServerUid(res_set_obj.data)
+    printStatus(None, "REPORT: " + payload['name'] + " is changed since previous run, " + res_set_obj.data['name'] +
+                " is modified")
+    return res_set_obj.data
+
+
+# deleting the objects of previous run which are removed from file or which are changed and are not modified
+# (see --delta); the objects are deleted in reverse order of manifest, so the groups are deleted before members
+# only the objects which are owned by user's objects are deleted, the object is kept if it is used instead of
+# user's object, e.g. by the same IP
+# client - client object
+# mergedObjectsMaps - the list of maps of user's objects to the resulting objects
+# ---
+# returns: nothing
+def deleteDeltaObjects(client, mergedObjectsMaps):
+    printMessageProcessObjects("removed objects")
+    usedValues = set()
+    for mergedObjectsMap in mergedObjectsMaps:
+        usedValues.update(value for value in mergedObjectsMap.values() if isinstance(value, str))
+    for record in reversed(deltaReplacedRecords):
+        if record.get('uid') is None or record['value'] in usedValues or record['uid'] in usedValues:
+            continue
+        printStatus(None, "processing removed " + record['type'] + ": " + record['key'])
+        res_delete_obj = client.api_call("delete-" + record['type'], {"uid": record['uid']})
+        printStatus(res_delete_obj, "REPORT: " + str(record.get('name', record['value'])) + " is deleted")
+        if res_delete_obj.success:
+            publishUpdate(client, False)
+        printStatus(None, "")
+
+
+# writing the manifest of run: the records of journal with the hashes of content of user's objects
+# the manifest is passed to --delta argument of the next run with the changed file
+# fileName - the name of manifest file
+# isCompleted - True if the migration is completed, False if it is interrupted
+# ---
+# returns: nothing
+def writeManifest(fileName, isCompleted):
+    rulesHashes = {}
+    for originalLayerName, ruleHashes in contentHashes.get("access-rules", {}).items():
+        serverLayerName = provideServerLayerName(originalLayerName, manifestRecords)
+        for i, ruleHash in enumerate(ruleHashes):
+            rulesHashes[str(serverLayerName) + "#" + str(i)] = ruleHash
+    natRulesHashes = contentHashes.get("nat-rules", [])
+    records = []
+    for (phase, key), record in manifestRecords.items():
+        record = {recordKey: value for recordKey, value in record.items() if recordKey not in ("hash", "type")}
+        if phase == "access-rules":
+            record["hash"] = rulesHashes.get(key)
+        elif phase == "nat-rules":
+            record["hash"] = natRulesHashes[int(key)] if int(key) < len(natRulesHashes) else None
+        elif key in contentHashes.get(phase, {}):
+            record["hash"], record["type"] = contentHashes[phase][key]
+        records.append(record)
+    with open(fileName, "w") as manifest_file:
+        json.dump({"file": args.file, "domain": args.domain, "completed": isCompleted, "records": records},
+                  manifest_file, indent=2)
+    printStatus(None, "REPORT: manifest of " + str(len(records)) + " records is written to " + fileName)
+
+
+# checking if object from server is returned by the read command
+# apiCommand - the read command, e.g. show-services-tcp
+# serverObject - JSON presentation of object
+# ---
+# returns: True - if the object is returned by the command, False - otherwise
+def isInventoryObjectOfCommand(apiCommand, serverObject):
+    serverObjectType = serverObject.get('type', "")
+    if apiCommand == "show-objects":
+        return not serverObjectType.endswith("-rule") and not serverObjectType.endswith("-section")
+    objectsType = apiCommand[len("show-"):]
+    if objectsType.startswith("services-"):
+        return serverObjectType == "service-" + objectsType[len("services-"):]
+    return serverObjectType + "s" == objectsType
+
+
+# applying the changes which are published at server to the cached lists of objects
+# the object is found by uid; the added object replaces the cached one because the run can read its own objects
+# changes - the list of changes from show-changes response
+# ---
+# returns: nothing
+def applyInventoryChanges(changes):
+    for apiCommand, serverObjects in inventoryCacheEntry["objects"].items():
+        serverObjectsByUid = dict((serverObject['uid'], serverObject) for serverObject in serverObjects)
+        for change in changes:
+            operations = change.get('operations', {})
+            for serverObject in operations.get('deleted-objects', []):
+                serverObjectsByUid.pop(serverObject.get('uid'), None)
+            modifiedObjects = [modified['new-object'] for modified in operations.get('modified-objects', [])
+                               if 'new-object' in modified]
+            for serverObject in operations.get('added-objects', []) + modifiedObjects:
+                if isInventoryObjectOfCommand(apiCommand, serverObject):
+                    serverObjectsByUid[serverObject['uid']] = serverObject
+                else:
+                    serverObjectsByUid.pop(serverObject.get('uid'), None)
+        inventoryCacheEntry["objects"][apiCommand] = list(serverObjectsByUid.values())
+
+
+# reading the cache from file
+# fileName - the name of cache file
+# ---
+# returns: the content of cache file, empty map - if the file does not exist or it is broken
+def loadInventoryCache(fileName):
+    if os.path.exists(fileName):
+        try:
+            with open(fileName) as cacheFile:
+                return json.load(cacheFile)
+        except ValueError:
+            printStatus(None, None, "inventory cache is broken and it is not used: " + fileName)
+    return {}
+
+
+# writing the entry of current server and domain to file; the entries of other servers and domains are read again
+# because they can be written by the processes of other domains; the processes take the lock of <file>.lock while
+# the file is read and replaced; the file is replaced at once, so interrupted run does not break the cache
+# fileName - the name of cache file
+# ---
+# returns: nothing
+def saveInventoryCache(fileName):
+    with inventoryCacheLock, open(fileName + ".lock", "w") as lockFile:
+        if fcntl is not None:
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+        inventoryCache = loadInventoryCache(fileName)
+        inventoryCache[inventoryCacheKey] = inventoryCacheEntry
+        cacheDir = os.path.dirname(os.path.abspath(fileName))
+        cacheFile = tempfile.NamedTemporaryFile("w", dir=cacheDir, suffix=".tmp", delete=False)
+        with cacheFile:
+            json.dump(inventoryCache, cacheFile)
+        os.replace(cacheFile.name, fileName)
+
+
+# providing the key of current server and domain in the cache file; the port is the one which is used by client,
+# so the run without --port and the run with the default port share the entry
+# ---
+# returns: the key as string
+def provideInventoryCacheKey():
+    port = args.port if args.port is not None else defaultManagementPort
+    return args.management + ":" + str(port) + "/" + (args.domain if args.domain is not None else "")
+
+
+# opening the cache of objects which are read from server by previous runs
+# the cached lists are revalidated by show-changes since the publish time of previous read;
+# the cache of server and domain is dropped if the changes can not be read, so the objects are read from server again;
+# the entry is written to file once by saveInventoryCache at the end of run
+# client - client object
+# fileName - the name of cache file
+# ---
+# returns: nothing
+def openInventoryCache(client, fileName):
+    global inventoryCacheKey, inventoryCacheEntry
+    res_last_session = client.api_call("show-last-published-session", {})
+    if res_last_session.success is False or 'publish-time' not in res_last_session.data:
+        printStatus(None, None, "publish time can not be read from server, the inventory cache is not used")
+        printStatus(None, "")
+        return
+    publishTime = res_last_session.data['publish-time']['iso-8601']
+    inventoryCacheKey = provideInventoryCacheKey()
+    cachedEntry = loadInventoryCache(fileName).get(inventoryCacheKey)
+    inventoryCacheEntry = {"publish-time": publishTime, "objects": {}}
+    if cachedEntry is not None and cachedEntry.get('publish-time') == publishTime:
+        inventoryCacheEntry["objects"] = cachedEntry['objects']
+        printStatus(None, "inventory cache is valid: nothing is published since " + publishTime)
+    elif cachedEntry is not None:
+        printStatus(None, "reading changes from server since " + cachedEntry['publish-time'])
+        res_changes = client.api_call("show-changes", {"from-date": cachedEntry['publish-time'],
+                                                       "to-date": publishTime})
+        printStatus(res_changes, None)
+        if res_changes.success is True:
+            changes = []
+            for task in res_changes.data.get('tasks', []):
+                for taskDetails in task.get('task-details', []):
+                    changes.extend(taskDetails.get('changes', []))
+            inventoryCacheEntry["objects"] = cachedEntry['objects']
+            applyInventoryChanges(changes)
+            printStatus(None, "inventory cache is revalidated by " + str(len(changes)) + " changes")
+        else:
+            printStatus(None, "inventory cache is dropped, objects will be read from server")
+    printStatus(None, "")
+
+
+# reading all objects by the read command; the paging is done by api_query
+# the objects are taken from the inventory cache if it is opened and it contains the objects of command
+# client - client object
+# apiCommand - the read command, e.g. show-address-ranges
+# ---
+# returns: the list of objects, None - if reading is failed
+def readServerInventory(client, apiCommand):
+    if inventoryCacheEntry is not None:
+        with inventoryCacheLock:
+            serverObjects = None
+            if apiCommand not in inventoryCacheServedCommands:
+                serverObjects = inventoryCacheEntry["objects"].get(apiCommand)
+            inventoryCacheServedCommands.add(apiCommand)
+        if serverObjects is not None:
+            printStatus(None, "REPORT: " + str(len(serverObjects)) + " objects are taken from inventory cache")
+            return serverObjects
+    res_get_objects = client.api_query(apiCommand)
+    printStatus(res_get_objects, None)
+    if res_get_objects.success is False:
+        return None
+    if inventoryCacheEntry is not None:
+        with inventoryCacheLock:
+            inventoryCacheEntry["objects"][apiCommand] = res_get_objects.data
+    return res_get_objects.data
 
 
 # check if response contains message that name of "new" object exists in database
@@ -124,20 +1248,311 @@ def isServerObjectLocal(serverObject):
     return serverObject['domain']['domain-type'] == "domain"
 
 
+# merging the maps of server objects which come from different domains
+# the objects from "local" domain have precedence by default, the objects from "global" domain have precedence
+# if isReplaceFromGlobalFirst is set
+# serverObjectsMap - the map of objects which come neither from "local" nor from "global" domain; it is updated
+#                    and returned, the callers replace it by the result
+# serverObjectsMapLocal - the map of objects which come from "local" domain
+# serverObjectsMapGlobal - the map of objects which come from "global" domain
+# ---
+# returns: merged map
+def mergeServerObjectsMaps(serverObjectsMap, serverObjectsMapLocal, serverObjectsMapGlobal):
+    if sys.version_info >= (3, 0):
+        if isReplaceFromGlobalFirst:
+            serverObjectsMap.update(serverObjectsMapLocal)
+            serverObjectsMap.update(serverObjectsMapGlobal)
+        else:
+            serverObjectsMap.update(serverObjectsMapGlobal)
+            serverObjectsMap.update(serverObjectsMapLocal)
+    else:
+        if isReplaceFromGlobalFirst:
+            serverObjectsMap = dict(
+                serverObjectsMap.items() + serverObjectsMapLocal.items() + serverObjectsMapGlobal.items())
+        else:
+            serverObjectsMap = dict(
+                serverObjectsMap.items() + serverObjectsMapGlobal.items() + serverObjectsMapLocal.items())
+    return serverObjectsMap
+
+
+# providing the canonical key of IP address or subnet: tuple of IP version, integer form of address and prefix length
+# so the same address which is written differently (e.g. IPv6 with or without leading zeros) has the same key
+# the address which can not be parsed is kept as is: the version is None and address string is used instead of integer
+# ipAddress - IP address of host or subnet as string
+# prefix - IPv4 netmask or prefix length of subnet; None for IP address of host
+# ---
+# returns: tuple as key
+def provideIpKey(ipAddress, prefix=None):
+    try:
+        if prefix is None:
+            address = ipaddress.ip_address(ipAddress)
+            return address.version, int(address), address.max_prefixlen
+        network = ipaddress.ip_network(ipAddress + '/' + str(prefix), strict=False)
+        return network.version, int(network.network_address), network.prefixlen
+    except (ValueError, TypeError):
+        return None, ipAddress, prefix
+
+
+# providing the canonical key of IP range: tuple of IP version and integer forms of first and last addresses
+# ipAddressFirst - first IP address of range
+# ipAddressLast - last IP address of range
+# ---
+# returns: tuple as key
+def provideIpRangeKey(ipAddressFirst, ipAddressLast):
+    versionFirst, integerFirst, prefixFirst = provideIpKey(ipAddressFirst)
+    versionLast, integerLast, prefixLast = provideIpKey(ipAddressLast)
+    if versionFirst is None or versionFirst != versionLast:
+        return None, ipAddressFirst, ipAddressLast
+    return versionFirst, integerFirst, integerLast
+
+
+# normalizing IP fields of user's host, network or range once after parsing
+# the IP version, the integer form of address and the prefix length (or integer forms of first and last addresses for
+# range) are attached to the object; they are used for finding of objects with the same IP instead of strings
+# userObject - user's object; the objects of other types are not changed
+# ---
+# returns: nothing
+def normalizeUserObjectIp(userObject):
+    if userObject['TypeName'] == 'CheckPoint_Host':
+        (userObject['IpVersion'], userObject['IpInteger'],
+         userObject['IpPrefixLength']) = provideIpKey(userObject['IpAddress'])
+    elif userObject['TypeName'] == 'CheckPoint_Network':
+        prefix = userObject['Netmask'] if userObject['Netmask'] is not None else userObject['MaskLength']
+        (userObject['IpVersion'], userObject['IpInteger'],
+         userObject['IpPrefixLength']) = provideIpKey(userObject['Subnet'], prefix)
+    elif userObject['TypeName'] == 'CheckPoint_Range':
+        (userObject['IpVersion'], userObject['IpIntegerFirst'],
+         userObject['IpIntegerLast']) = provideIpRangeKey(userObject['RangeFrom'], userObject['RangeTo'])
+
+
+# providing the key of normalized user's host or network for the index of server objects with IP
+# userObject - user's host or network, see normalizeUserObjectIp
+# ---
+# returns: tuple as key
+def provideUserIpObjectKey(userObject):
+    return userObject['IpVersion'], userObject['IpInteger'], userObject['IpPrefixLength']
+
+
+# providing the keys of server object with IP for the index of server objects with IP: hosts, networks
+# serverObject - host or network in JSON format
+# ---
+# returns: list of tuples as keys; host can have IPv4 and IPv6 addresses both
+def provideServerIpObjectKeys(serverObject):
+    keys = []
+    if 'ipv4-address' in serverObject:
+        keys.append(provideIpKey(serverObject['ipv4-address']))
+    if 'ipv6-address' in serverObject:
+        keys.append(provideIpKey(serverObject['ipv6-address']))
+    if 'subnet4' in serverObject:
+        keys.append(provideIpKey(serverObject['subnet4'], serverObject['subnet-mask']))
+    if 'subnet6' in serverObject:
+        keys.append(provideIpKey(serverObject['subnet6'], serverObject['mask-length6']))
+    return keys
+
+
+# providing the key of server address range
+# serverRange - address range in JSON format
+# ---
+# returns: tuple as key
+def provideServerRangeKey(serverRange):
+    if 'ipv4-address-first' in serverRange:
+        return provideIpRangeKey(serverRange['ipv4-address-first'], serverRange['ipv4-address-last'])
+    return provideIpRangeKey(serverRange['ipv6-address-first'], serverRange['ipv6-address-last'])
+
+
+# providing the key of normalized user's range
+# userRange - user's range, see normalizeUserObjectIp
+# ---
+# returns: tuple as key
+def provideUserRangeKey(userRange):
+    return userRange['IpVersion'], userRange['IpIntegerFirst'], userRange['IpIntegerLast']
+
+
+# collapsing the user's objects which have the same canonical value: IP, subnet, range, port of service or
+# type and code of ICMP service; only the first object with the value is processed and the rest objects are
+# its aliases, so the aliases do not cost the requests of duplicated IP or value
+# the object which name is repeated is not collapsed, it is processed as usual; the repeated names of list are
+# found before collapsing, so such objects are neither aliases nor the objects which aliases are mapped to
+# the objects are not consumed if they are provided by iterator (see --stream-input), so the name which is repeated
+# later is not known: the alias with the name is dropped when the name is repeated and the object is processed
+# as usual, the aliases of the first object with the name are mapped to the result of the last one
+# userObjects - list or iterator of user's objects
+# provideKey - function which returns the canonical value of user's object
+# aliases - the map which is filled: the name of alias (key) and the name of processed object (value)
+# ---
+# returns: iterator of the objects which are processed
+def collapseEquivalentObjects(userObjects, provideKey, aliases):
+    representativesNames = {}
+    userObjectsNames = set()
+    repeatedNames = set()
+    if isinstance(userObjects, list):
+        for userObject in userObjects:
+            if userObject['Name'] in userObjectsNames:
+                repeatedNames.add(userObject['Name'])
+            userObjectsNames.add(userObject['Name'])
+        userObjectsNames.clear()
+    for userObject in userObjects:
+        if userObject['Name'] in userObjectsNames or userObject['Name'] in repeatedNames:
+            aliases.pop(userObject['Name'], None)
+            userObjectsNames.add(userObject['Name'])
+            yield userObject
+            continue
+        key = provideKey(userObject)
+        userObjectsNames.add(userObject['Name'])
+        if key in representativesNames:
+            aliases[userObject['Name']] = representativesNames[key]
+            continue
+        representativesNames[key] = userObject['Name']
+        yield userObject
+
+
+# mapping the aliases of collapsed objects to the resulting objects, see collapseEquivalentObjects
+# mergedObjectsNamesMap - the map which contains name of user's object (key) and uid or name of resulting object (value)
+# aliases - the map which contains the name of alias (key) and the name of processed object (value)
+# ---
+# returns: updated mergedObjectsNamesMap
+def mapEquivalentObjects(mergedObjectsNamesMap, aliases):
+    if len(aliases) == 0:
+        return mergedObjectsNamesMap
+    for alias, userObjectName in aliases.items():
+        if userObjectName in mergedObjectsNamesMap:
+            mergedObjectsNamesMap[alias] = mergedObjectsNamesMap[userObjectName]
+            printStatus(None, "REPORT: " + alias + " has the same value as " + userObjectName + " and is mapped to it")
+        else:
+            printStatus(None, "REPORT: " + alias + " has the same value as " + userObjectName + " and is not added.")
+    printStatus(None, "REPORT: " + str(len(aliases)) + " objects with repeated values are not sent to server")
+    printStatus(None, "")
+    return mergedObjectsNamesMap
+
+
+# reading all objects with IP (hosts or networks) from server once and building the index by IP
+# the paging is done by api_query; "local" and "global" objects are merged as for the address ranges
+# client - client object
+# userObjectType - the type of object: host or network
+# ---
+# returns: the map which contains key by IP (key) and tuple of name and uid of server object (value),
+#          None - if reading is failed
+def readServerObjectsWithIp(client, userObjectType):
+    serverObjectsMap = {}
+    serverObjectsMapGlobal = {}
+    serverObjectsMapLocal = {}
+    printStatus(None, "reading " + userObjectType + "s from server")
+    serverObjects = readServerInventory(client, "show-" + userObjectType + "s")
+    if serverObjects is None:
+        printStatus(None, "")
+        return None
+    for serverObject in serverObjects:
+        registerServerName(serverObject['name'])
+        if serverObject.get('uid') in deltaModifiedUids:
+            # the object of previous run is modified by the user's object, it is not used instead of others
+            continue
+        for key in provideServerIpObjectKeys(serverObject):
+            if isServerObjectGlobal(serverObject) and key not in serverObjectsMapGlobal:
+                serverObjectsMapGlobal[key] = (serverObject['name'], serverObject['uid'])
+            elif isServerObjectLocal(serverObject) and key not in serverObjectsMapLocal:
+                serverObjectsMapLocal[key] = (serverObject['name'], serverObject['uid'])
+            elif key not in serverObjectsMapGlobal and key not in serverObjectsMapLocal and key not in serverObjectsMap:
+                serverObjectsMap[key] = (serverObject['name'], serverObject['uid'])
+    printStatus(None, "")
+    return mergeServerObjectsMaps(serverObjectsMap, serverObjectsMapLocal, serverObjectsMapGlobal)
+
+
+# registering the name which is used at server
+# serverObjectName - the name of object at server
+# ---
+# returns: nothing
+def registerServerName(serverObjectName):
+    with serverNamesLock:
+        serverNames.add(serverObjectName)
+
+
+# registering the uid of object which is added or modified by the run
+# serverObject - JSON presentation of object from response of server
+# ---
+# returns: nothing
+def registerServerUid(serverObject):
+    if serverObject is None or serverObject.get('uid') is None:
+        return
+    with serverNamesLock:
+        serverUidsNames[serverObject['uid']] = serverObject.get('name')
+        if serverObject.get('name') is not None:
+            serverNamesUids[serverObject['name']] = serverObject['uid']
+
+
+# checking if the name is used at server
+# userObjectName - the name of object
+# ---
+# returns: True - if the name is registered as used, False - otherwise
+def isServerNameUsed(userObjectName):
+    with serverNamesLock:
+        return userObjectName in serverNames
+
+
+# providing the first free name in format <initial_object_name>_<postfix>
+# the names are not removed from registry, so the search is started from the postfix which was found last time
+# the name of time object can not be longer than 11 symbols, so the initial name is cut for long postfix
+# userObjectNameInitial - the initial name of object
+# isTimeObject - True if the name is for time object or time group
+# ---
+# returns: the name which is not registered as used
+def provideFreeServerName(userObjectNameInitial, isTimeObject=False):
+    with serverNamesLock:
+        userObjectNamePostfix = serverNamesPostfixes.get((userObjectNameInitial, isTimeObject), 1)
+        while True:
+            if isTimeObject and (len(str(userObjectNamePostfix)) + len(userObjectNameInitial) + 1) > 11:
+                userObjectName = userObjectNameInitial[:-(len(str(userObjectNamePostfix)) + 1)] + '_' + str(
+                    userObjectNamePostfix)
+            else:
+                userObjectName = userObjectNameInitial + '_' + str(userObjectNamePostfix)
+            if userObjectName not in serverNames:
+                break
+            userObjectNamePostfix += 1
+        serverNamesPostfixes[(userObjectNameInitial, isTimeObject)] = userObjectNamePostfix
+        return userObjectName
+
+
+# reading the names of all objects from server once and registering them
+# client - client object
+# ---
+# returns: nothing
+def readServerNames(client):
+    printStatus(None, "reading names of objects from server")
+    serverObjects = readServerInventory(client, "show-objects")
+    if serverObjects is not None:
+        for serverObject in serverObjects:
+            registerServerName(serverObject['name'])
+        printStatus(None, "REPORT: " + str(len(serverObjects)) + " names are read from server")
+    printStatus(None, "")
+
+
 # adding "new" object to server
 # adjusting the name if object with the name exists at server: <initial_object_name>_<postfix>
 # client - client object
 # apiCommand - short string which indicates what should be done
 # payload - JSON representation of "new" object
-# userObjectNamePostfix - postfix as number
 # changeName=True - True: to try to add object and adjust the name; False: to try to add object and NOT adjust the name
+# the name which is registered as used at server is adjusted before request, see provideFreeServerName
+# the object which is changed since the run of --delta manifest is modified instead, see modifyUserObjectAtServer
 # ---
 # returns: added object from server in JSON format, None - otherwise
-def addUserObjectToServer(client, apiCommand, payload, userObjectNamePostfix=1, changeName=True):
+def addUserObjectToServer(client, apiCommand, payload, changeName=True):
     isObjectAdded = False
     userObjectNameInitial = ""
+    #if we have time object need to fill name with condition 11 symbols as max length
+    isTimeObject = apiCommand == 'add-time' or apiCommand == 'add-time-group'
+    isReuseGroupName = args.reuse_group_name.lower() == "true" and \
+        (apiCommand == 'add-group'
+         or apiCommand == 'add-service-group'
+         or apiCommand == 'add-time-group'
+         or apiCommand == 'add-group-with-exclusion'
+         or apiCommand == 'add-application-site-group')
+    if (apiCommand[len("add-"):], payload.get('name')) in deltaModifiedObjects:
+        # the object is changed since the run which wrote the manifest of --delta
+        return modifyUserObjectAtServer(client, apiCommand[len("add-"):], payload)
     if changeName:
         userObjectNameInitial = payload['name']
+        if not isReuseGroupName and isServerNameUsed(payload['name']):
+            payload['name'] = provideFreeServerName(userObjectNameInitial, isTimeObject)
     addedObject = None
     while not isObjectAdded:
         res_add_obj = client.api_call(apiCommand, payload)
@@ -147,33 +1562,156 @@ def addUserObjectToServer(client, apiCommand, payload, userObjectNamePostfix=1,
                 addedObject = None
                 break
             if isNameDuplicated(res_add_obj):
-                if (apiCommand == 'add-time' or apiCommand == 'add-time-group') and (len(str(userObjectNamePostfix)) + len(userObjectNameInitial) + 1) > 11:
-                    #if we have time object need to fill name with condition 11 symbols as max length
-                    payload['name'] = userObjectNameInitial[:-(len(str(userObjectNamePostfix))+1)] + '_' + str(userObjectNamePostfix)
-                    userObjectNamePostfix += 1
-                elif args.reuse_group_name.lower() == "true" and \
-                    (apiCommand == 'add-group'
-                     or apiCommand == 'add-service-group'
-                     or apiCommand == 'add-time-group'
-                     or apiCommand == 'add-group-with-exclusion'
-                     or apiCommand == 'add-application-site-group'):
+                registerServerName(payload['name'])
+                if isReuseGroupName:
                     # In the case of duplicate names and the user uses the 'reuse-group-name' flag,
                     # the smartconnector will not create a new name, it will add the data to the existing name
                     addedObject = res_add_obj.data
                     isObjectAdded = True
                     addedObject["name"] = payload['name']
                 else:
-                    payload['name'] = userObjectNameInitial + '_' + str(userObjectNamePostfix)
-                    userObjectNamePostfix += 1
+                    payload['name'] = provideFreeServerName(userObjectNameInitial, isTimeObject)
             else:
                 break
         else:
             addedObject = res_add_obj.data
+            if changeName:
+                registerServerName(payload['name'])
+            registerServerUid(addedObject)
             isObjectAdded = True
 
     return addedObject
 
 
+# collecting objects from response of add-objects-batch request
+# data - data of response or its part
+# addedObjects - the list of objects in JSON format in the order of response
+# ---
+# returns: nothing
+def collectBatchObjects(data, addedObjects):
+    if isinstance(data, dict):
+        if 'name' in data and 'uid' in data and 'type' in data:
+            addedObjects.append(data)
+        for value in data.values():
+            collectBatchObjects(value, addedObjects)
+    elif isinstance(data, list):
+        for value in data:
+            collectBatchObjects(value, addedObjects)
+
+
+# adding to server the list of "new" objects of the same type by one add-objects-batch request
+# the batch is added entirely or is not added at all
+# client - client object
+# objectType - the type of objects, e.g. host
+# payloads - the list of JSON representations of "new" objects
+# ---
+# returns: the list of added objects in JSON format in the order of payloads, None - if the batch is not added
+def addObjectsBatchToServer(client, objectType, payloads):
+    printStatus(None, "adding batch of " + str(len(payloads)) + " objects: " + objectType)
+    res_add_batch = client.api_call("add-objects-batch", {
+        "objects": [{
+            "type": objectType,
+            "list": [{key: value for key, value in payload.items() if key != "ignore-warnings"} for payload in payloads]
+        }],
+        "ignore-warnings": True
+    })
+    if res_add_batch.success is False:
+        printStatus(None, None, "batch of " + str(len(payloads)) + " objects is not added: " + objectType)
+        return None
+    serverObjectsList = []
+    collectBatchObjects(res_add_batch.data, serverObjectsList)
+    serverObjects = {serverObject['name']: serverObject for serverObject in serverObjectsList}
+    addedObjects = []
+    for i, payload in enumerate(payloads):
+        # the response may not contain all fields of added object, so fields of payload are used as well
+        addedObject = {key: value for key, value in payload.items() if key != "ignore-warnings"}
+        if len(serverObjectsList) == len(payloads) and serverObjectsList[i]['name'] == payload['name']:
+            # the names of rules can be repeated or empty, so the objects are matched by order of response
+            addedObject.update(serverObjectsList[i])
+        elif payload['name'] in serverObjects:
+            addedObject.update(serverObjects[payload['name']])
+        registerServerUid(addedObject)
+        addedObjects.append(addedObject)
+    return addedObjects
+
+
+# adding to server the "new" objects of the same type by add-objects-batch requests
+# the failed batch is split by halves until the objects which can not be added in batch are found,
+# these objects are added one by one for processing of the name collision or IP duplication
+# client - client object
+# objectType - the type of objects, e.g. host
+# batchItems - the list of tuples; first item of tuple is JSON representation of "new" object,
+#              the rest items are passed to onObjectAdded and addObjectOneByOne functions
+# onObjectAdded - function which is called for the object added by batch; added object is passed as last argument
+#                 the session is published after all objects of batch are passed to the function,
+#                 so the journal contains all objects of published batch
+# addObjectOneByOne - function which adds the object to server by regular "add-..." request and publishes session
+# ---
+# returns: nothing
+def addObjectsByBatches(client, objectType, batchItems, onObjectAdded, addObjectOneByOne):
+    if len(batchItems) == 0:
+        return
+    if len(batchItems) == 1:
+        addObjectOneByOne(*batchItems[0])
+        return
+    addedObjects = addObjectsBatchToServer(client, objectType, [batchItem[0] for batchItem in batchItems])
+    if addedObjects is None:
+        middle = len(batchItems) // 2
+        addObjectsByBatches(client, objectType, batchItems[:middle], onObjectAdded, addObjectOneByOne)
+        addObjectsByBatches(client, objectType, batchItems[middle:], onObjectAdded, addObjectOneByOne)
+        return
+    for batchItem, addedObject in zip(batchItems, addedObjects):
+        onObjectAdded(*(batchItem + (addedObject,)))
+    for batchItem in batchItems:
+        publishUpdate(client, False)
+
+
+# processing the items by waves of concurrent requests: at most args.in_flight items are processed at the same time
+# the items which have a common key (e.g. IP or name) are not processed in the same wave and they are processed in
+# the order of items, so the duplication is resolved as by processing one by one
+# the session is published between waves only, so the journal contains all objects of published session
+# client - client object which session is used by processItem
+# items - list or iterator of tuples which are passed to processItem
+# provideItemKeys - function which returns the set of keys of item
+# processItem - function which processes the item in separate thread; returns True if the session is changed
+# ---
+# returns: nothing
+def processItemsByWaves(client, items, provideItemKeys, processItem):
+    phase = getattr(apiCallState, "phase", None)
+
+    def processItemInPhase(*item):
+        apiCallState.phase = phase
+        return processItem(*item)
+
+    itemsIterator = iter(items)
+    pendingItems = []
+    isExhausted = False
+    with ThreadPoolExecutor(max_workers=args.in_flight) as executor:
+        while True:
+            while not isExhausted and len(pendingItems) < args.in_flight * 4:
+                for item in itemsIterator:
+                    pendingItems.append((provideItemKeys(*item), item))
+                    break
+                else:
+                    isExhausted = True
+            if len(pendingItems) == 0:
+                break
+            waveItems = []
+            restItems = []
+            blockedKeys = set()
+            for itemKeys, item in pendingItems:
+                if len(waveItems) < args.in_flight and blockedKeys.isdisjoint(itemKeys):
+                    waveItems.append(item)
+                else:
+                    restItems.append((itemKeys, item))
+                blockedKeys.update(itemKeys)
+            pendingItems = restItems
+            futures = [executor.submit(processItemInPhase, *item) for item in waveItems]
+            for future in futures:
+                if future.result():
+                    publishUpdate(client, False)
+
+
 # adding to server the object which contains fields with IP: hosts, networks
 # adjusting the name if object with the name exists at server: <initial_object_name>_<postfix>
 # using the object from server side if object exits with the same IP at server
@@ -181,69 +1719,353 @@ def addUserObjectToServer(client, apiCommand, payload, userObjectNamePostfix=1,
 # payload - JSON representation of "new" object
 # userObjectType - the type of object: host or network
 # userObjectIp - IP which will be used as filter in request to server
-# mergedObjectsNamesMap - the map which contains name of user's object (key) and name of resulting object (value)
+# mergedObjectsNamesMap - the map which contains name of user's object (key) and uid or name of resulting object (value)
+# userObjectIp - IP address or subnet of object as it is written by user
+# userObjectKey - the key of normalized IP of object, see provideUserIpObjectKey
+# serverObjectsIndex - the map of server objects with IP (see readServerObjectsWithIp); if it is set then
+#                      the server object with the same IP is found locally instead of "show-objects" request
 # ---
 # returns: updated mergedObjectsNamesMap
-def addCpObjectWithIpToServer(client, payload, userObjectType, userObjectIp, mergedObjectsNamesMap):
+def addCpObjectWithIpToServer(client, payload, userObjectType, userObjectIp, userObjectKey, mergedObjectsNamesMap,
+                              serverObjectsIndex=None):
     printStatus(None, "processing " + userObjectType + ": " + payload['name'])
     userObjectNameInitial = payload['name']
-    userObjectNamePostfix = 1
     isFinished = False
     isIgnoreWarnings = False
+    if (userObjectType, userObjectNameInitial) in deltaModifiedObjects:
+        # the object is changed since the run which wrote the manifest of --delta
+        modifiedObject = modifyUserObjectAtServer(client, userObjectType, payload)
+        if modifiedObject is not None:
+            mergedObjectsNamesMap[userObjectNameInitial] = modifiedObject.get('uid', modifiedObject['name'])
+            if serverObjectsIndex is not None:
+                serverObjectsIndex[userObjectKey] = (modifiedObject['name'],
+                                                     mergedObjectsNamesMap[userObjectNameInitial])
+        return mergedObjectsNamesMap
+    if serverObjectsIndex is not None:
+        if userObjectKey in serverObjectsIndex:
+            printStatus(None, None, "More than one " + userObjectType + " has the same ip: '" + userObjectIp + "'")
+            mergedObjectsNamesMap[userObjectNameInitial] = serverObjectsIndex[userObjectKey][1]
+            printStatus(None, "REPORT: " + "CP object " + serverObjectsIndex[userObjectKey][
+                0] + " is used instead of " + userObjectNameInitial)
+            return mergedObjectsNamesMap
+        # the index contains all hosts/networks of server, so the IP duplication can be only with objects of other types
+        isIgnoreWarnings = True
+    if isServerNameUsed(payload['name']):
+        payload['name'] = provideFreeServerName(userObjectNameInitial)
     while not isFinished:
         payload["ignore-warnings"] = isIgnoreWarnings
         # payload["--user-agent"] = "mgmt_cli_smartmove";
         res_add_obj_with_ip = client.api_call("add-" + userObjectType, payload)
-        print("add-" + userObjectType, payload)
+        if isLogLevelEnabled("debug"):
+            printStatus(None, "add-" + userObjectType + " " + json.dumps(payload), level="debug")
         printStatus(res_add_obj_with_ip, "REPORT: " + userObjectNameInitial + " is added as " + payload['name'])
         if res_add_obj_with_ip.success is False:
             if isIpDuplicated(res_add_obj_with_ip) and not isIgnoreWarnings:
                 res_get_obj_with_ip = client.api_query("show-objects", payload={"filter": userObjectIp, "ip-only": False, "type": userObjectType})
                 printStatus(res_get_obj_with_ip, None)
                 if res_get_obj_with_ip.success is True:
+                    # this is additional filter in order to remove irrelevant results (show-objects command is also
+                    # filtering by other unexpected fields and we want to filter by IP address or subnet)
+                    res_get_obj_with_ip.data = [obj for obj in res_get_obj_with_ip.data
+                                                if userObjectKey in provideServerIpObjectKeys(obj)]
                     if len(res_get_obj_with_ip.data) > 0:
-                        if userObjectType == "network" and next((x for x in res_get_obj_with_ip.data if x['subnet4' if is_valid_ipv4(payload['subnet']) else 'subnet6'] == payload['subnet'] and (x['subnet-mask'] == payload['subnet-mask']) if is_valid_ipv4(payload['subnet'])), None) is None:
-                            isIgnoreWarnings = True
-                        else:
-                            if userObjectType == "host":
-                                res_get_obj_with_ip.data = [obj for obj in res_get_obj_with_ip.data if userObjectIp in obj['ipv4-address']]  # this is additional filter in order to remove irrelevant results (show-objects command is also filtering by other unexpected fields and we want to filter by ip-address)
-                                mergedObjectsNamesMap[userObjectNameInitial] = res_get_obj_with_ip.data[0]['name']
-                                printStatus(None, "REPORT: " + "CP object " + mergedObjectsNamesMap[userObjectNameInitial] + " is used instead of " + userObjectNameInitial)
-                                isFinished = True
-                                break
-                            for serverObject in res_get_obj_with_ip.data:
-                                # if more then one network in res_get_obj_with_ip, map to the one that matches subnet
-                                mergedObjectsNamesMap[userObjectNameInitial] = next(x['name'] for x in res_get_obj_with_ip.data if x['subnet4' if is_valid_ipv4(payload['subnet']) else 'subnet6'] == payload['subnet'] and (x['subnet-mask'] == payload['subnet-mask']) if is_valid_ipv4(payload['subnet']))
-                                if (isServerObjectLocal(serverObject) and not isReplaceFromGlobalFirst) or (
-                                        isServerObjectGlobal(serverObject) and isReplaceFromGlobalFirst):
-                                    break
-                            printStatus(None, "REPORT: " + "CP object " + mergedObjectsNamesMap[
-                                userObjectNameInitial] + " is used instead of " + userObjectNameInitial)
+                        if userObjectType == "host":
+                            serverObject = res_get_obj_with_ip.data[0]
+                            mergedObjectsNamesMap[userObjectNameInitial] = serverObject.get('uid', serverObject['name'])
+                            printStatus(None, "REPORT: " + "CP object " + serverObject['name'] + " is used instead of " + userObjectNameInitial)
                             isFinished = True
+                            break
+                        for serverObject in res_get_obj_with_ip.data:
+                            # if more then one network in res_get_obj_with_ip, map to the local or global one
+                            mergedObjectsNamesMap[userObjectNameInitial] = serverObject.get('uid', serverObject['name'])
+                            if (isServerObjectLocal(serverObject) and not isReplaceFromGlobalFirst) or (
+                                    isServerObjectGlobal(serverObject) and isReplaceFromGlobalFirst):
+                                break
+                        printStatus(None, "REPORT: " + "CP object " + serverObject['name'] + " is used instead of " +
+                                    userObjectNameInitial)
+                        isFinished = True
                     else:
                         isIgnoreWarnings = True
                 else:
                     isFinished = True
             elif isNameDuplicated(res_add_obj_with_ip):
-                payload['name'] = userObjectNameInitial + '_' + str(userObjectNamePostfix)
-                userObjectNamePostfix += 1
+                registerServerName(payload['name'])
+                payload['name'] = provideFreeServerName(userObjectNameInitial)
             else:
                 isFinished = True
         else:
-            mergedObjectsNamesMap[userObjectNameInitial] = payload['name']
+            mergedObjectsNamesMap[userObjectNameInitial] = res_add_obj_with_ip.data.get('uid', payload['name'])
+            registerServerName(payload['name'])
+            registerServerUid(res_add_obj_with_ip.data)
+            if serverObjectsIndex is not None:
+                serverObjectsIndex[userObjectKey] = (payload['name'], mergedObjectsNamesMap[userObjectNameInitial])
             isFinished = True
     return mergedObjectsNamesMap
 
 
+# adding to server the objects which contains fields with IP: hosts, networks
+# the objects are added one by one; if args.batch_size is set then the objects with IP which does not exist
+# at server are added by batches and the rest objects are added one by one
+# client - client object
+# userObjectType - the type of object: host or network
+# userObjectsItems - the list of tuples: JSON representation of "new" object, its IP and the key of normalized IP
+# serverObjectsIndex - the map of server objects with IP (see readServerObjectsWithIp), can be None
+# ---
+# returns: mergedObjectsNamesMap dictionary
+# the map contains name of user's object (key) and uid or name of resulting object (value)
+def addCpObjectsWithIpToServer(client, userObjectType, userObjectsItems, serverObjectsIndex):
+    mergedObjectsNamesMap = {}
+    batchItems = []
+    batchKeys = set()
+
+    def addObjectWithoutPublish(payload, userObjectIp, userObjectKey):
+        userObjectNameInitial = payload['name']
+        isMapped = userObjectNameInitial in mergedObjectsNamesMap
+        addCpObjectWithIpToServer(client, payload, userObjectType, userObjectIp, userObjectKey, mergedObjectsNamesMap,
+                                  serverObjectsIndex)
+        isAdded = not isMapped and userObjectNameInitial in mergedObjectsNamesMap
+        if not isAdded:
+            printStatus(None, "REPORT: " + userObjectNameInitial + ' is not added.')
+        else:
+            recordJournalEntry(client, userObjectType + "s", userObjectNameInitial,
+                               mergedObjectsNamesMap[userObjectNameInitial])
+        printStatus(None, "")
+        return isAdded
+
+    def addObjectOneByOne(payload, userObjectIp, userObjectKey):
+        if addObjectWithoutPublish(payload, userObjectIp, userObjectKey):
+            publishUpdate(client, False)
+
+    def onObjectAdded(payload, userObjectIp, userObjectKey, addedObject):
+        mergedObjectsNamesMap[payload['name']] = addedObject.get('uid', addedObject['name'])
+        recordJournalEntry(client, userObjectType + "s", payload['name'], mergedObjectsNamesMap[payload['name']])
+        registerServerName(addedObject['name'])
+        serverObjectsIndex[userObjectKey] = (addedObject['name'], mergedObjectsNamesMap[payload['name']])
+        printStatus(None, "REPORT: " + payload['name'] + " is added as " + addedObject['name'])
+
+    def flushBatch():
+        addObjectsByBatches(client, userObjectType, list(batchItems), onObjectAdded, addObjectOneByOne)
+        del batchItems[:]
+        batchKeys.clear()
+        printStatus(None, "")
+
+    if args.in_flight > 1 and (args.batch_size <= 0 or serverObjectsIndex is None):
+        userObjectsItems = (userObjectItem for userObjectItem in userObjectsItems
+                            if not restoreFromJournal(userObjectType + "s", userObjectItem[0]['name'],
+                                                      mergedObjectsNamesMap))
+        processItemsByWaves(client, userObjectsItems,
+                            lambda payload, userObjectIp, userObjectKey: {userObjectKey, payload['name']},
+                            addObjectWithoutPublish)
+        return mergedObjectsNamesMap
+    for payload, userObjectIp, userObjectKey in userObjectsItems:
+        if restoreFromJournal(userObjectType + "s", payload['name'], mergedObjectsNamesMap):
+            continue
+        if args.batch_size <= 0 or serverObjectsIndex is None or \
+                (userObjectType, payload['name']) in deltaModifiedObjects:
+            addObjectOneByOne(payload, userObjectIp, userObjectKey)
+            continue
+        if userObjectKey in batchKeys:
+            # the object with the same IP is waiting in batch, it will be used after adding
+            flushBatch()
+        if userObjectKey in serverObjectsIndex or isServerNameUsed(payload['name']):
+            addObjectOneByOne(payload, userObjectIp, userObjectKey)
+            continue
+        printStatus(None, "processing " + userObjectType + ": " + payload['name'])
+        batchItems.append((payload, userObjectIp, userObjectKey))
+        batchKeys.add(userObjectKey)
+        if len(batchItems) >= args.batch_size:
+            flushBatch()
+    if len(batchItems) > 0:
+        flushBatch()
+    return mergedObjectsNamesMap
+
+
+# ordering the objects by dependencies: the object is placed after the objects of the list which it depends on
+# the objects keep the order of file if they do not depend on the objects which are placed later in file
+# userObjects - list or iterator of user's objects
+# provideDependencies - function which returns the names of objects which the object depends on
+# ---
+# returns: tuple: the ordered list of objects and the list of objects which are in cycle or depend on cycle;
+#          the objects of second list are placed at the end of first list in the order of file
+def orderByDependencies(userObjects, provideDependencies):
+    userObjects = list(userObjects)
+    userObjectsIndexes = {}
+    for i, userObject in enumerate(userObjects):
+        userObjectsIndexes.setdefault(userObject['Name'], []).append(i)
+    dependentIndexes = [[] for userObject in userObjects]
+    dependenciesCounts = [0] * len(userObjects)
+    for i, userObject in enumerate(userObjects):
+        for dependencyName in set(provideDependencies(userObject)):
+            for j in userObjectsIndexes.get(dependencyName, []):
+                dependentIndexes[j].append(i)
+                dependenciesCounts[i] += 1
+    readyIndexes = [i for i in range(len(userObjects)) if dependenciesCounts[i] == 0]
+    heapq.heapify(readyIndexes)
+    orderedIndexes = []
+    while len(readyIndexes) > 0:
+        i = heapq.heappop(readyIndexes)
+        orderedIndexes.append(i)
+        for j in dependentIndexes[i]:
+            dependenciesCounts[j] -= 1
+            if dependenciesCounts[j] == 0:
+                heapq.heappush(readyIndexes, j)
+    cycledObjects = [userObjects[i] for i in range(len(userObjects)) if dependenciesCounts[i] > 0]
+    return [userObjects[i] for i in orderedIndexes] + cycledObjects, cycledObjects
+
+
+# providing the names of objects which the group depends on: members, include and except
+# userGroup - user's group
+# ---
+# returns: the list of names
+def provideGroupDependencies(userGroup):
+    if 'Members' in userGroup:
+        return userGroup['Members'] or []
+    return [userGroup.get('Include'), userGroup.get('Except')]
+
+
+# providing the keys of group for processItemsByWaves: the group is not processed at the same time with the groups
+# which it depends on, so the nested groups are added before the group
+# userGroup - user's group
+# groupsNames - the set of names of groups of the same type
+# ---
+# returns: the set of names
+def provideGroupKeys(userGroup, groupsNames):
+    groupKeys = groupsNames.intersection(provideGroupDependencies(userGroup))
+    groupKeys.add(userGroup['Name'])
+    return groupKeys
+
+
+# providing the group which references the added groups instead of their aliases, see collapseEquivalentGroups
+# userGroup - user's group
+# aliases - the name of alias (key) and the name of added group (value)
+# ---
+# returns: the copy of group if it references aliases, the group itself otherwise
+def provideCollapsedGroup(userGroup, aliases):
+    if 'Members' in userGroup:
+        if not any(groupMember in aliases for groupMember in userGroup['Members'] or []):
+            return userGroup
+        return dict(userGroup, Members=[aliases.get(groupMember, groupMember) for groupMember in userGroup['Members']])
+    if userGroup.get('Include') not in aliases and userGroup.get('Except') not in aliases:
+        return userGroup
+    return dict(userGroup, Include=aliases.get(userGroup['Include'], userGroup['Include']),
+                Except=aliases.get(userGroup['Except'], userGroup['Except']))
+
+
+# collapsing the user's groups which have the same members: the fingerprint of group is the hash of sorted resulting
+# members, the nested groups are replaced by their fingerprints recursively; only the first group of each
+# fingerprint, comments and tags is added, the rest groups are its aliases and the references to aliases are replaced
+# in the copies of groups, the user's groups are not changed
+# the group which name is repeated is not collapsed, the groups in cycle and the groups without resolved members
+# (the members are neither objects of map nor groups, e.g. the group is empty) have own fingerprints
+# userGroups - list or iterator of user's groups of the same type
+# mergedObjectsMap - map of objects which will be used for replacing of members
+# aliases - the map which is filled: the name of alias (key) and the name of added group (value)
+# ---
+# returns: the list of groups which are added
+def collapseEquivalentGroups(userGroups, mergedObjectsMap, aliases):
+    userGroups = list(userGroups)
+    userGroupsByNames = {}
+    for userGroup in userGroups:
+        userGroupsByNames.setdefault(userGroup['Name'], userGroup)
+    fingerprints = {}
+    visitedNames = set()
+
+    def provideMemberFingerprint(userGroupMember):
+        if userGroupMember not in userGroupsByNames:
+            return "object:" + str(mergedObjectsMap.get(userGroupMember, userGroupMember))
+        if userGroupMember in fingerprints:
+            return fingerprints[userGroupMember]
+        if userGroupMember in visitedNames:
+            return "cycle:" + userGroupMember
+        visitedNames.add(userGroupMember)
+        userGroup = userGroupsByNames[userGroupMember]
+        if 'Members' in userGroup and not any(groupMember in mergedObjectsMap or groupMember in userGroupsByNames
+                                              for groupMember in userGroup['Members'] or []):
+            membersFingerprints = ["unresolved:" + userGroupMember]
+        elif 'Members' in userGroup:
+            membersFingerprints = sorted(set(provideMemberFingerprint(groupMember)
+                                             for groupMember in userGroup['Members'] or []))
+        else:
+            membersFingerprints = ["include:" + provideMemberFingerprint(userGroup['Include']),
+                                   "except:" + provideMemberFingerprint(userGroup['Except'])]
+        visitedNames.discard(userGroupMember)
+        fingerprints[userGroupMember] = "group:" + provideContentHash(membersFingerprints)
+        return fingerprints[userGroupMember]
+
+    representativesNames = {}
+    collapsedGroups = []
+    savedMembersRequests = 0
+    for userGroup in userGroups:
+        if userGroup['Name'] in aliases:
+            continue
+        # the comments and tags of alias would be lost, so only the groups with the same ones are collapsed
+        fingerprint = (provideMemberFingerprint(userGroup['Name']), userGroup.get('Comments'),
+                       json.dumps(userGroup.get('Tags'), sort_keys=True))
+        if representativesNames.setdefault(fingerprint, userGroup['Name']) != userGroup['Name']:
+            aliases[userGroup['Name']] = representativesNames[fingerprint]
+            if 'Members' in userGroup:
+                membersCount = len(set(userGroup['Members'] or []))
+                savedMembersRequests += (membersCount + args.members_chunk_size - 1) // args.members_chunk_size
+            continue
+        collapsedGroups.append(userGroup)
+    if len(aliases) > 0:
+        collapsedGroups = [provideCollapsedGroup(userGroup, aliases) for userGroup in collapsedGroups]
+        printStatus(None, "REPORT: " + str(len(aliases)) + " groups have the same members as other groups, " +
+                    str(len(aliases) + savedMembersRequests) + " requests of groups and members are saved")
+        printStatus(None, "")
+    return collapsedGroups
+
+
+# providing the names of layers which the layer depends on: the inline layers of its rules
+# userLayer - user's layer
+# ---
+# returns: the list of names
+def provideLayerDependencies(userLayer):
+    return [rule['SubPolicyName'] for rule in userLayer['Rules'] if rule['SubPolicyName'] != ""]
+
+
+# adding the members to group by one request
+# if request is failed then the members are bisected and each half is added separately,
+# so only the members which can not be added are reported as failed
+# client - client object
+# apiSetCommand - set command for the type of group
+# groupName - the name of group at server
+# groupMembers - the list of names or UIDs of members
+# ---
+# returns: the number of members which are not added
+def addGroupMembers(client, apiSetCommand, groupName, groupMembers):
+    res_set_group = client.api_call(
+        apiSetCommand,
+        {
+            "name": groupName,
+            "members": {"add": groupMembers}
+        })
+    if res_set_group.success:
+        for groupMember in groupMembers:
+            printStatus(None, "REPORT: " + groupName + " is set with new member " + str(groupMember))
+        return 0
+    printStatus(res_set_group, None)
+    if len(groupMembers) == 1:
+        printStatus(None, "REPORT: " + groupName + " is not set with new member " + str(groupMembers[0]))
+        return 1
+    printStatus(None, None, "adding of " + str(len(groupMembers)) + " members to " + groupName +
+                " is failed, the members are added by halves")
+    middle = len(groupMembers) // 2
+    return addGroupMembers(client, apiSetCommand, groupName, groupMembers[:middle]) + \
+        addGroupMembers(client, apiSetCommand, groupName, groupMembers[middle:])
+
+
 # processing and adding to server the groups which contains list of members
 # adjusting the name if group with the name exists at server: <initial_object_name>_<postfix>
 # client - client object
 # apiCommand - short string which indicates what should be done
 # userGroup - group which will be processed and added to server
 # mergedObjectsMap - map of objects which will be used for replacing
-# mergedGroupsNamesMap - the map which contains name of user's object (key) and name of resulting object (value)
+# mergedGroupsNamesMap - the map which contains name of user's object (key) and uid or name of resulting object (value)
+# isNeedSplitted - True: to set the members of added group; False: to add the group without members
+# the members of changed group which are not in file anymore are removed, see --delta
 # ---
-# returns: updated mergedGroupsNamesMap
+# returns: added group in JSON format if isNeedSplitted is False, the list of members of group - otherwise
 def processGroupWithMembers(client, apiCommand, userGroup, mergedObjectsMap, mergedGroupsNamesMap, isNeedSplitted):
     apiSetCommand = "set-group"
     addedGroup = None
@@ -252,19 +2074,28 @@ def processGroupWithMembers(client, apiCommand, userGroup, mergedObjectsMap, mer
     elif "service" in apiCommand:
         apiSetCommand = "set-service-group"
 
+    groupMembers = []
     if isNeedSplitted:
         if ("Members" in userGroup):    #group with list of members
-            for i, userGroupMember in enumerate(userGroup['Members']):
-                print(userGroupMember)
+            for userGroupMember in userGroup['Members']:
                 if userGroupMember in mergedObjectsMap:
                     userGroupMember = mergedObjectsMap[userGroupMember]
-                res_add_obj = client.api_call(
-                    apiSetCommand,
-                    {
-                        "name": userGroup['Name'],
-                        "members": {"add": userGroupMember}
-                    })
-                printStatus(None, "REPORT: " + userGroup['Name'] + " is set with new member " + str(userGroupMember))
+                elif userGroupMember in mergedGroupsNamesMap:
+                    # nested group is processed before the group, see orderByDependencies
+                    userGroupMember = mergedGroupsNamesMap[userGroupMember]
+                if userGroupMember not in groupMembers:
+                    groupMembers.append(userGroupMember)
+            for i in range(0, len(groupMembers), args.members_chunk_size):
+                addGroupMembers(client, apiSetCommand, userGroup['Name'], groupMembers[i:i + args.members_chunk_size])
+            staleMembers = [groupMember for groupMember in deltaGroupsMembers.get(userGroup['Name'], [])
+                            if groupMember not in groupMembers]
+            if len(staleMembers) > 0:
+                res_set_group = client.api_call(apiSetCommand, {"name": userGroup['Name'],
+                                                                "members": {"remove": staleMembers}})
+                printStatus(res_set_group, None)
+                if res_set_group.success:
+                    for staleMember in staleMembers:
+                        printStatus(None, "REPORT: " + userGroup['Name'] + " is set without member " + str(staleMember))
         else:   #group with exclusion with include/exclude fields with groups name
             printStatus(None, "WARN: " + userGroup['Name'] + " hasn't any member by the type GroupWithExlusions")
     else:
@@ -277,7 +2108,8 @@ def processGroupWithMembers(client, apiCommand, userGroup, mergedObjectsMap, mer
                 "tags": userGroup['Tags']
             }
         )
-    return addedGroup
+        return addedGroup
+    return groupMembers
 
 
 # processing and adding to server the CheckPoint Domains
@@ -286,14 +2118,16 @@ def processGroupWithMembers(client, apiCommand, userGroup, mergedObjectsMap, mer
 # userDomains - the list of domains which will be processed and added to server
 # ---
 # returns: mergedDomainsNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processDomains(client, userDomains):
     printMessageProcessObjects("domains...")
-    publishCounter = 0
     mergedDomainsNamesMap = {}
-    if len(userDomains) == 0:
+    isEmpty, userDomains = peekUserObjects(userDomains)
+    if isEmpty:
         return mergedDomainsNamesMap
     for userDomain in userDomains:
+        if restoreFromJournal("domains", userDomain['Name'], mergedDomainsNamesMap):
+            continue
         userDomainNameInitial = userDomain['Name']
         printStatus(None, "processing domain: " + userDomain['Name'])
         addedDomain = addUserObjectToServer(
@@ -308,153 +2142,104 @@ def processDomains(client, userDomains):
             changeName = False
         )
         if addedDomain is not None:
-            mergedDomainsNamesMap[userDomainNameInitial] = addedDomain['name']
+            mergedDomainsNamesMap[userDomainNameInitial] = addedDomain.get('uid', addedDomain['name'])
+            recordJournalEntry(client, "domains", userDomainNameInitial, mergedDomainsNamesMap[userDomainNameInitial])
             printStatus(None, "REPORT: " + userDomainNameInitial + " is added as " + addedDomain['name'])
-            publishCounter = publishUpdate(publishCounter, False)
+            publishUpdate(client, False)
         else:
             printStatus(None, "REPORT: " + userDomainNameInitial + ' is not added.')
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
     return mergedDomainsNamesMap
 
 
+# creating the payload of request for adding the user's host to server
+# userHost - user's host
+# ---
+# returns: payload in JSON format
+def provideHostPayload(userHost):
+    return {
+        "name": userHost['Name'],
+        "ip-address": userHost['IpAddress'],
+        "comments": userHost['Comments'],
+        "tags": userHost['Tags']
+    }
+
+
 # processing and adding to server the CheckPoint Hosts
 # adjusting the name if host with the name exists at server: <initial_object_name>_<postfix>
 # if host contains existing IP address then Host object from server will be used instead
+# if isUseServerSnapshot is set then all hosts are read from server once and existing IP address is found locally
 # client - client object
 # userHosts - the list of hosts which will be processed and added to server
 # ---
 # returns: mergedHostsNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processHosts(client, userHosts):
     printMessageProcessObjects("hosts")
-    publishCounter = 0
-    mergedHostsNamesMap = {}
-    if len(userHosts) == 0:
-        return mergedHostsNamesMap
-    for userHost in userHosts:
-        payload = {
-            "name": userHost['Name'],
-            "ip-address": userHost['IpAddress'],
-            "comments": userHost['Comments'],
-            "tags": userHost['Tags']
-        }
-        initialMapLength = len(mergedHostsNamesMap)
-        mergedHostsNamesMap = addCpObjectWithIpToServer(client, payload, "host", userHost['IpAddress'],
-                                                        mergedHostsNamesMap)
-        if initialMapLength == len(mergedHostsNamesMap):
-            printStatus(None, "REPORT: " + userHost['Name'] + ' is not added.')
-        else:
-            publishCounter = publishUpdate(publishCounter, False)
-        printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedHostsNamesMap
+    isEmpty, userHosts = peekUserObjects(userHosts)
+    if isEmpty:
+        return {}
+    serverHostsIndex = None
+    if isUseServerSnapshot or args.batch_size > 0:
+        serverHostsIndex = readServerObjectsWithIp(client, "host")
+    userHostsAliases = {}
+    userHosts = collapseEquivalentObjects(userHosts, provideUserIpObjectKey, userHostsAliases)
+    userHostsItems = ((provideHostPayload(userHost), userHost['IpAddress'], provideUserIpObjectKey(userHost))
+                      for userHost in userHosts)
+    return mapEquivalentObjects(addCpObjectsWithIpToServer(client, "host", userHostsItems, serverHostsIndex),
+                                userHostsAliases)
 
 
 def is_valid_ipv4(ip):
-    pattern = re.compile(r"""
-        ^
-        (?:
-          # Dotted variants:
-          (?:
-            # Decimal 1-255 (no leading 0's)
-            [3-9]\d?|2(?:5[0-5]|[0-4]?\d)?|1\d{0,2}
-          |
-            0x0*[0-9a-f]{1,2}  # Hexadecimal 0x0 - 0xFF (possible leading 0's)
-          |
-            0+[1-3]?[0-7]{0,2} # Octal 0 - 0377 (possible leading 0's)
-          )
-          (?:                  # Repeat 0-3 times, separated by a dot
-            \.
-            (?:
-              [3-9]\d?|2(?:5[0-5]|[0-4]?\d)?|1\d{0,2}
-            |
-              0x0*[0-9a-f]{1,2}
-            |
-              0+[1-3]?[0-7]{0,2}
-            )
-          ){0,3}
-        |
-          0x0*[0-9a-f]{1,8}    # Hexadecimal notation, 0x0 - 0xffffffff
-        |
-          0+[0-3]?[0-7]{0,10}  # Octal notation, 0 - 037777777777
-        |
-          # Decimal notation, 1-4294967295:
-          429496729[0-5]|42949672[0-8]\d|4294967[01]\d\d|429496[0-6]\d{3}|
-          42949[0-5]\d{4}|4294[0-8]\d{5}|429[0-3]\d{6}|42[0-8]\d{7}|
-          4[01]\d{8}|[1-3]\d{0,9}|[4-9]\d{0,8}
-        )
-        $
-    """, re.VERBOSE | re.IGNORECASE)
-    return pattern.match(ip) is not None
+    return ipv4Pattern.match(ip) is not None
 
 
 def is_valid_ipv6(ip):
-    pattern = re.compile(r"""
-        ^
-        \s*                         # Leading whitespace
-        (?!.*::.*::)                # Only a single whildcard allowed
-        (?:(?!:)|:(?=:))            # Colon iff it would be part of a wildcard
-        (?:                         # Repeat 6 times:
-            [0-9a-f]{0,4}           #   A group of at most four hexadecimal digits
-            (?:(?<=::)|(?<!::):)    #   Colon unless preceeded by wildcard
-        ){6}                        #
-        (?:                         # Either
-            [0-9a-f]{0,4}           #   Another group
-            (?:(?<=::)|(?<!::):)    #   Colon unless preceeded by wildcard
-            [0-9a-f]{0,4}           #   Last group
-            (?: (?<=::)             #   Colon iff preceeded by exacly one colon
-             |  (?<!:)              #
-             |  (?<=:) (?<!::) :    #
-             )                      # OR
-         |                          #   A v4 address with NO leading zeros
-            (?:25[0-4]|2[0-4]\d|1\d\d|[1-9]?\d)
-            (?: \.
-                (?:25[0-4]|2[0-4]\d|1\d\d|[1-9]?\d)
-            ){3}
-        )
-        \s*                         # Trailing whitespace
-        $
-    """, re.VERBOSE | re.IGNORECASE | re.DOTALL)
-    return pattern.match(ip) is not None
+    return ipv6Pattern.match(ip) is not None
+
+
+# creating the payload of request for adding the user's network to server
+# userNetwork - user's network
+# ---
+# returns: payload in JSON format
+def provideNetworkPayload(userNetwork):
+    payload = {
+        "name": userNetwork['Name'],
+        "comments": userNetwork['Comments'],
+        "tags": userNetwork['Tags'],
+        "subnet": userNetwork['Subnet']
+    }
+    if userNetwork['IpVersion'] == 4 or (userNetwork['IpVersion'] is None and is_valid_ipv4(userNetwork['Subnet'])):
+        payload["subnet-mask"] = userNetwork['Netmask']
+    else:
+        payload["mask-length6"] = userNetwork['MaskLength']
+    return payload
 
 
 # processing and adding to server the CheckPoint Networks
 # adjusting the name if network with the name exists at server: <initial_object_name>_<postfix>
 # if network contains existing IP subnet then Network object from server will be used instead
+# if isUseServerSnapshot is set then all networks are read from server once and existing IP subnet is found locally
 # client - client object
 # userNetworks - the list of networks which will be processed and added to server
 # ---
 # returns: mergedNetworksNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processNetworks(client, userNetworks):
     printMessageProcessObjects("networks")
-    publishCounter = 0
-    mergedNetworksNamesMap = {}
     userNetworks = sorted(userNetworks, key=lambda K: ('' if K['Netmask'] is None else K['Netmask'], '' if K['MaskLength'] is None else K['MaskLength']), reverse=True)
-    if len(userNetworks) == 0:
-        return mergedNetworksNamesMap
-    for userNetwork in userNetworks:
-        payload = {
-            "name": userNetwork['Name'],
-            "comments": userNetwork['Comments'],
-            "tags": userNetwork['Tags'],
-            "subnet": userNetwork['Subnet']
-        }
-        if is_valid_ipv4(userNetwork['Subnet']):
-            payload["subnet-mask"] = userNetwork['Netmask']
-        else:
-            payload["mask-length6"] = userNetwork['MaskLength']
-        initialMapLength = len(mergedNetworksNamesMap)
-        mergedNetworksNamesMap = addCpObjectWithIpToServer(client, payload, "network", userNetwork['Subnet'],
-                                                           mergedNetworksNamesMap)
-        if initialMapLength == len(mergedNetworksNamesMap):
-            printStatus(None, "REPORT: " + userNetwork['Name'] + ' is not added.')
-        else:
-            publishCounter = publishUpdate(publishCounter, False)
-        printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedNetworksNamesMap
+    isEmpty, userNetworks = peekUserObjects(userNetworks)
+    if isEmpty:
+        return {}
+    serverNetworksIndex = None
+    if isUseServerSnapshot or args.batch_size > 0:
+        serverNetworksIndex = readServerObjectsWithIp(client, "network")
+    userNetworksAliases = {}
+    userNetworks = collapseEquivalentObjects(userNetworks, provideUserIpObjectKey, userNetworksAliases)
+    userNetworksItems = ((provideNetworkPayload(userNetwork), userNetwork['Subnet'], provideUserIpObjectKey(userNetwork))
+                         for userNetwork in userNetworks)
+    return mapEquivalentObjects(addCpObjectsWithIpToServer(client, "network", userNetworksItems, serverNetworksIndex),
+                                userNetworksAliases)
 
 
 # processing and adding to server the CheckPoint Ranges
@@ -464,69 +2249,84 @@ def processNetworks(client, userNetworks):
 # userRanges - the list of ranges which will be processed and added to server
 # ---
 # returns: mergedRangesNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processRanges(client, userRanges):
     printMessageProcessObjects("ranges")
-    publishCounter = 0
     mergedRangesNamesMap = {}
-    if len(userRanges) == 0:
+    isEmpty, userRanges = peekUserObjects(userRanges)
+    if isEmpty:
         return mergedRangesNamesMap
+    userRangesAliases = {}
+    userRanges = collapseEquivalentObjects(userRanges, provideUserRangeKey, userRangesAliases)
     serverRangesMap = {}
     serverRangesMapGlobal = {}
     serverRangesMapLocal = {}
     printStatus(None, "reading address ranges from server")
-    res_get_ranges = client.api_query("show-address-ranges")
-    printStatus(res_get_ranges, None)
-    for serverRange in res_get_ranges.data:
-        key = ''
-        if 'ipv4-address-first' in serverRange:
-            key = serverRange['ipv4-address-first'] + '_' + serverRange['ipv4-address-last']
-        else:
-            key = serverRange['ipv6-address-first'] + '_' + serverRange['ipv6-address-last']
-
+    serverRanges = readServerInventory(client, "show-address-ranges")
+    for serverRange in serverRanges if serverRanges is not None else []:
+        registerServerName(serverRange['name'])
+        if serverRange.get('uid') in deltaModifiedUids:
+            continue
+        key = provideServerRangeKey(serverRange)
         if isServerObjectGlobal(serverRange) and key not in serverRangesMapGlobal:
-            serverRangesMapGlobal[key] = serverRange['name']
+            serverRangesMapGlobal[key] = (serverRange['name'], serverRange['uid'])
         elif isServerObjectLocal(serverRange) and key not in serverRangesMapLocal:
-            serverRangesMapLocal[key] = serverRange['name']
+            serverRangesMapLocal[key] = (serverRange['name'], serverRange['uid'])
         elif key not in serverRangesMapGlobal and key not in serverRangesMapLocal and key not in serverRangesMap:
-            serverRangesMap[key] = serverRange['name']
+            serverRangesMap[key] = (serverRange['name'], serverRange['uid'])
 
     printStatus(None, "")
-    if sys.version_info >= (3, 0):
-        serverRangesMap = serverRangesMap.copy()
-        if isReplaceFromGlobalFirst:
-            serverRangesMap.update(serverRangesMapLocal)
-            serverRangesMap.update(serverRangesMapGlobal)
-        else:
-            serverRangesMap.update(serverRangesMapGlobal)
-            serverRangesMap.update(serverRangesMapLocal)
-    else:
-        if isReplaceFromGlobalFirst:
-            serverRangesMap = dict(
-                serverRangesMap.items() + serverRangesMapLocal.items() + serverRangesMapGlobal.items())
+    serverRangesMap = mergeServerObjectsMaps(serverRangesMap, serverRangesMapLocal, serverRangesMapGlobal)
+    batchItems = []
+    batchKeys = set()
+    batchNames = set()
+
+    def onRangeAdded(payload, userRangeNameInitial, key, addedRange):
+        mergedRangesNamesMap[userRangeNameInitial] = addedRange.get('uid', addedRange['name'])
+        registerServerName(addedRange['name'])
+        recordJournalEntry(client, "ranges", userRangeNameInitial, mergedRangesNamesMap[userRangeNameInitial])
+        if 'ipv4-address-first' in addedRange or 'ipv6-address-first' in addedRange:
+            key = provideServerRangeKey(addedRange)
+        serverRangesMap[key] = (addedRange['name'], mergedRangesNamesMap[userRangeNameInitial])
+        printStatus(None, "REPORT: " + userRangeNameInitial + " is added as " + addedRange['name'])
+
+    def addRangeOneByOne(payload, userRangeNameInitial, key):
+        addedRange = addUserObjectToServer(client, "add-address-range", payload)
+        if addedRange is not None:
+            onRangeAdded(payload, userRangeNameInitial, key, addedRange)
+            publishUpdate(client, False)
         else:
-            serverRangesMap = dict(
-                serverRangesMap.items() + serverRangesMapGlobal.items() + serverRangesMapLocal.items())
+            printStatus(None, "REPORT: " + userRangeNameInitial + ' is not added.')
+
+    def flushBatch():
+        addObjectsByBatches(client, "address-range", list(batchItems), onRangeAdded, addRangeOneByOne)
+        del batchItems[:]
+        batchKeys.clear()
+        batchNames.clear()
+        printStatus(None, "")
+
     for userRange in userRanges:
+        if restoreFromJournal("ranges", userRange['Name'], mergedRangesNamesMap):
+            continue
         printStatus(None, "processing range: " + userRange['Name'])
         userRangeNameInitial = userRange['Name']
-        rngFrom = '' if userRange['RangeFrom'] is None else userRange['RangeFrom']
-        rngTo =  '' if userRange['RangeTo'] is None else userRange['RangeTo']
-        key = rngFrom + '_' + rngTo
+        key = provideUserRangeKey(userRange)
+        if key in batchKeys or userRange['Name'] in batchNames:
+            # the range with the same IPs or name is waiting in batch, it should be added at first
+            flushBatch()
         if key in serverRangesMap:
             printStatus(None, None,
                         "More than one range has the same ip: '" + userRange['RangeFrom'] + "' and '" + userRange[
                             'RangeTo'] + "'")
-            mergedRangesNamesMap[userRangeNameInitial] = serverRangesMap[key]
-            printStatus(None, "REPORT: " + "CP object " + mergedRangesNamesMap[
-                userRangeNameInitial] + " is used instead of " + userRangeNameInitial)
+            mergedRangesNamesMap[userRangeNameInitial] = serverRangesMap[key][1]
+            printStatus(None, "REPORT: " + "CP object " + serverRangesMap[key][
+                0] + " is used instead of " + userRangeNameInitial)
         else:
-            userRangeNamePostfix = 1
-            if userRange['Name'] in serverRangesMap.values():
+            # the changed range of previous run keeps its name, see --delta
+            isModified = ("address-range", userRangeNameInitial) in deltaModifiedObjects
+            if not isModified and isServerNameUsed(userRange['Name']):
                 printStatus(None, None, "More than one object named '" + userRange['Name'] + "' exists.")
-                while userRange['Name'] in serverRangesMap.values():
-                    userRange['Name'] = userRangeNameInitial + '_' + str(userRangeNamePostfix)
-                    userRangeNamePostfix += 1
+                userRange['Name'] = provideFreeServerName(userRangeNameInitial)
             payload = {
                 "name": userRange['Name'],
                 "ip-address-first": userRange['RangeFrom'],
@@ -535,22 +2335,18 @@ def processRanges(client, userRanges):
                 "tags": userRange['Tags'],
                 "ignore-warnings": True
             }
-            addedRange = addUserObjectToServer(client, "add-address-range", payload, userRangeNamePostfix)
-            if addedRange is not None:
-                mergedRangesNamesMap[userRangeNameInitial] = addedRange['name']
-                key = ''
-                if 'ipv4-address-first' in addedRange:
-                    key = addedRange['ipv4-address-first'] + '_' + addedRange['ipv4-address-last']
-                else:
-                    key = addedRange['ipv6-address-first'] + '_' + addedRange['ipv6-address-last']
-                serverRangesMap[key] = addedRange['name']
-                printStatus(None, "REPORT: " + userRangeNameInitial + " is added as " + addedRange['name'])
-                publishCounter = publishUpdate(publishCounter, False)
-            else:
-                printStatus(None, "REPORT: " + userRangeNameInitial + ' is not added.')
+            if args.batch_size > 0 and not isModified:
+                batchItems.append((payload, userRangeNameInitial, key))
+                batchKeys.add(key)
+                batchNames.add(payload['name'])
+                if len(batchItems) >= args.batch_size:
+                    flushBatch()
+                continue
+            addRangeOneByOne(payload, userRangeNameInitial, key)
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedRangesNamesMap
+    if len(batchItems) > 0:
+        flushBatch()
+    return mapEquivalentObjects(mergedRangesNamesMap, userRangesAliases)
 
 
 # processing and adding to server the CheckPoint Network Groups
@@ -560,18 +2356,31 @@ def processRanges(client, userRanges):
 # mergedNetworkObjectsMap - map of network objects which will be used for replacing
 # ---
 # returns: mergedGroupsNamesDict dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processNetGroups(client, userNetworkGroups, mergedNetworkObjectsMap):
     printMessageProcessObjects("network groups")
-    publishCounter = 0
     mergedGroupsNamesDict = {}
-    if len(userNetworkGroups) == 0:
+    isEmpty, userNetworkGroups = peekUserObjects(userNetworkGroups)
+    if isEmpty:
         return mergedGroupsNamesDict
-    for userNetworkGroup in userNetworkGroups:
+    userNetworkGroupsAliases = {}
+    userNetworkGroups = collapseEquivalentGroups(userNetworkGroups, mergedNetworkObjectsMap, userNetworkGroupsAliases)
+    userNetworkGroups = orderByDependencies(userNetworkGroups, provideGroupDependencies)[0]
+    groupsNames = set(userNetworkGroup['Name'] for userNetworkGroup in userNetworkGroups)
+
+    def processNetGroup(userNetworkGroup):
+        isChanged = False
         userNetworkGroupNameInitial = userNetworkGroup['Name']
         addedNetworkGroup = None
-        if userNetworkGroup['TypeName'] == 'CheckPoint_GroupWithExclusion':
+        restoredNetworkGroupName = getJournalEntry("network-groups", userNetworkGroupNameInitial)
+        if restoredNetworkGroupName is not None:
+            printStatus(None, "processing network group: " + userNetworkGroup['Name'])
+            printStatus(None, "REPORT: " + userNetworkGroupNameInitial + " is restored from journal as " +
+                        restoredNetworkGroupName)
+            addedNetworkGroup = provideRestoredObject("network-groups", userNetworkGroupNameInitial, restoredNetworkGroupName)
+        elif userNetworkGroup['TypeName'] == 'CheckPoint_GroupWithExclusion':
             printStatus(None, "processing network group with exclusion: " + userNetworkGroup['Name'])
+            # nested groups are processed before the group, see orderByDependencies
             if userNetworkGroup['Include'] in mergedGroupsNamesDict:
                 userNetworkGroup['Include'] = mergedGroupsNamesDict[userNetworkGroup['Include']]
             if userNetworkGroup['Except'] in mergedGroupsNamesDict:
@@ -592,22 +2401,31 @@ def processNetGroups(client, userNetworkGroups, mergedNetworkObjectsMap):
             addedNetworkGroup = processGroupWithMembers(client, "add-group", userNetworkGroup, mergedNetworkObjectsMap,
                                                         mergedGroupsNamesDict, False)
         if addedNetworkGroup is not None:
-            mergedGroupsNamesDict[userNetworkGroupNameInitial] = addedNetworkGroup['name']
-            if 'errors' in addedNetworkGroup:
-                if 'More than one object' in addedNetworkGroup['errors'][0]['message']:
-                    printStatus(None, "REPORT: Using the existing object '{}'".format(addedNetworkGroup['name']))
-            else:
-                printStatus(None, "REPORT: " + userNetworkGroupNameInitial + " is added as " + addedNetworkGroup['name'])
-            publishCounter = publishUpdate(publishCounter, True)
+            mergedGroupsNamesDict[userNetworkGroupNameInitial] = addedNetworkGroup.get('uid', addedNetworkGroup['name'])
+            if restoredNetworkGroupName is None:
+                if 'errors' in addedNetworkGroup:
+                    if 'More than one object' in addedNetworkGroup['errors'][0]['message']:
+                        printStatus(None, "REPORT: Using the existing object '{}'".format(addedNetworkGroup['name']))
+                else:
+                    printStatus(None, "REPORT: " + userNetworkGroupNameInitial + " is added as " + addedNetworkGroup['name'])
+                recordJournalEntry(client, "network-groups", userNetworkGroupNameInitial, addedNetworkGroup['name'])
+                isChanged = True
             userNetworkGroup["Name"] = addedNetworkGroup['name']
-            if userNetworkGroup['TypeName'] != 'CheckPoint_GroupWithExclusion':
-                processGroupWithMembers(client, "add-group", userNetworkGroup, mergedNetworkObjectsMap,
-                                        mergedGroupsNamesDict, True)
+            if userNetworkGroup['TypeName'] != 'CheckPoint_GroupWithExclusion' and \
+                    getJournalEntry("network-groups-members", userNetworkGroupNameInitial) is None:
+                groupMembers = processGroupWithMembers(client, "add-group", userNetworkGroup, mergedNetworkObjectsMap,
+                                                       mergedGroupsNamesDict, True)
+                recordJournalEntry(client, "network-groups-members", userNetworkGroupNameInitial, groupMembers)
+                isChanged = True
         else:
             printStatus(None, "REPORT: " + userNetworkGroupNameInitial + " is not added.")
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedGroupsNamesDict
+        return isChanged
+
+    processItemsByWaves(client, ((userNetworkGroup,) for userNetworkGroup in userNetworkGroups),
+                        lambda userNetworkGroup: provideGroupKeys(userNetworkGroup, groupsNames),
+                        processNetGroup)
+    return mapEquivalentObjects(mergedGroupsNamesDict, userNetworkGroupsAliases)
 
 
 # processing and adding to server the CheckPoint Simple Gateways
@@ -616,14 +2434,16 @@ def processNetGroups(client, userNetworkGroups, mergedNetworkObjectsMap):
 # userSimpleGateways - the list of simple gateways which will be processed and added to server
 # ---
 # returns: mergedSimpleGatewaysNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processSimpleGateways(client, userSimpleGateways):
     printMessageProcessObjects("simple gateways")
-    publishCounter = 0
     mergedSimpleGatewaysNamesMap = {}
-    if len(userSimpleGateways) == 0:
+    isEmpty, userSimpleGateways = peekUserObjects(userSimpleGateways)
+    if isEmpty:
         return mergedSimpleGatewaysNamesMap
     for userSimpleGateway in userSimpleGateways:
+        if restoreFromJournal("simple-gateways", userSimpleGateway['Name'], mergedSimpleGatewaysNamesMap):
+            continue
         printStatus(None, "processing simple gateway: " + userSimpleGateway['Name'])
         userSimpleGatewayNameInitial = userSimpleGateway['Name']
         addedSimpleGateway = addUserObjectToServer(
@@ -637,13 +2457,13 @@ def processSimpleGateways(client, userSimpleGateways):
             }
         )
         if addedSimpleGateway is not None:
-            mergedSimpleGatewaysNamesMap[userSimpleGatewayNameInitial] = addedSimpleGateway['name']
+            mergedSimpleGatewaysNamesMap[userSimpleGatewayNameInitial] = addedSimpleGateway.get('uid', addedSimpleGateway['name'])
+            recordJournalEntry(client, "simple-gateways", userSimpleGatewayNameInitial, mergedSimpleGatewaysNamesMap[userSimpleGatewayNameInitial])
             printStatus(None, "REPORT: " + userSimpleGatewayNameInitial + " is added as " + addedSimpleGateway['name'])
-            publishCounter = publishUpdate(publishCounter, False)
+            publishUpdate(client, False)
         else:
             printStatus(None, "REPORT: " + userSimpleGatewayNameInitial + ' is not added.')
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
     return mergedSimpleGatewaysNamesMap
 
 
@@ -653,14 +2473,16 @@ def processSimpleGateways(client, userSimpleGateways):
 # userZones - the list of zones which will be processed and added to server
 # ---
 # returns: mergedZonesNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processZones(client, userZones):
     printMessageProcessObjects("zones")
-    publishCounter = 0
     mergedZonesNamesMap = {}
-    if len(userZones) == 0:
+    isEmpty, userZones = peekUserObjects(userZones)
+    if isEmpty:
         return mergedZonesNamesMap
     for userZone in userZones:
+        if restoreFromJournal("zones", userZone['Name'], mergedZonesNamesMap):
+            continue
         printStatus(None, "processing zone: " + userZone['Name'])
         userZoneNameInitial = userZone['Name']
         addedZone = addUserObjectToServer(
@@ -673,13 +2495,13 @@ def processZones(client, userZones):
             }
         )
         if addedZone is not None:
-            mergedZonesNamesMap[userZoneNameInitial] = addedZone['name']
+            mergedZonesNamesMap[userZoneNameInitial] = addedZone.get('uid', addedZone['name'])
+            recordJournalEntry(client, "zones", userZoneNameInitial, mergedZonesNamesMap[userZoneNameInitial])
             printStatus(None, "REPORT: " + userZoneNameInitial + " is added as " + addedZone['name'])
-            publishCounter = publishUpdate(publishCounter, False)
+            publishUpdate(client, False)
         else:
             printStatus(None, "REPORT: " + userZoneNameInitial + ' is not added.')
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
     return mergedZonesNamesMap
 
 
@@ -700,6 +2522,23 @@ def provideServerServiceKey(serverService):
     return key
 
 
+# providing the key of user's service which is compared with the key of server service, see provideServerServiceKey
+# userService - user's service
+# ---
+# returns: the port, the type and code of ICMP service or the IP protocol
+def provideUserServiceKey(userService):
+    key = ""
+    if 'Port' in userService:
+        key = userService['Port']
+    elif 'Type' in userService:
+        key = userService['Type']
+        if 'Code' in userService and userService['Code'] != 'null':
+            key += "_" + userService['Code']
+    elif 'IpProtocol' in userService:
+        key = userService['IpProtocol']
+    return key
+
+
 # processing and adding to server the CheckPoint Services (TCP, UDP, SCTP, ICMP or Other)
 # adjusting the name if service with the name exists at server: <initial_object_name>_<postfix>
 # if service contains existing port then Service object from server will be used instead
@@ -708,19 +2547,20 @@ def provideServerServiceKey(serverService):
 # userServiceType - the type of service which should be processed
 # ---
 # returns: mergedServicesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processServices(client, userServices, userServiceType):
     printMessageProcessObjects(userServiceType + " services")
-    publishCounter = 0
     mergedServicesMap = {}
     serverServicesMap = {}
     serverServicesMapGlobal = {}
     serverServicesMapLocal = {}
     printStatus(None, "reading " + userServiceType + " services from server")
-    res_get_services = client.api_query("show-services-" + userServiceType)
-    printStatus(res_get_services, None)
-    for serverService in res_get_services.data:
+    serverServices = readServerInventory(client, "show-services-" + userServiceType)
+    for serverService in serverServices if serverServices is not None else []:
         mergedServicesMap[serverService['name']] = serverService['uid']
+        registerServerName(serverService['name'])
+        if serverService['uid'] in deltaModifiedUids:
+            continue
         key = provideServerServiceKey(serverService)
         isServiceReplacing = False
         if 'port' in serverService and ('protocol' not in serverService or serverService['protocol'] == 'null'):
@@ -733,40 +2573,59 @@ def processServices(client, userServices, userServiceType):
                 key not in serverServicesMap or isServiceReplacing):
             serverServicesMap[key] = (serverService['name'], serverService['uid'])
     printStatus(None, "")
-    if sys.version_info >= (3, 0):
-        serverServicesMap = serverServicesMap.copy()
-        if isReplaceFromGlobalFirst:
-            serverServicesMap.update(serverServicesMapLocal)
-            serverServicesMap.update(serverServicesMapGlobal)
-        else:
-            serverServicesMap.update(serverServicesMapGlobal)
-            serverServicesMap.update(serverServicesMapLocal)
-    else:
-        if isReplaceFromGlobalFirst:
-            serverServicesMap = dict(
-                serverServicesMap.items() + serverServicesMapLocal.items() + serverServicesMapGlobal.items())
-        else:
-            serverServicesMap = dict(
-                serverServicesMap.items() + serverServicesMapGlobal.items() + serverServicesMapLocal.items())
-    if len(userServices) == 0:
+    serverServicesMap = mergeServerObjectsMaps(serverServicesMap, serverServicesMapLocal, serverServicesMapGlobal)
+    isEmpty, userServices = peekUserObjects(userServices)
+    if isEmpty:
         return mergedServicesMap
+    userServicesAliases = {}
+    userServices = collapseEquivalentObjects(userServices, provideUserServiceKey, userServicesAliases)
+    batchItems = []
+    batchKeys = set()
+    batchNames = set()
+
+    def onServiceAdded(payload, userServiceNameInitial, key, addedService):
+        mergedServicesMap[userServiceNameInitial] = addedService.get('uid', addedService['name'])
+        registerServerName(addedService['name'])
+        recordJournalEntry(client, "services-" + userServiceType, userServiceNameInitial,
+                           mergedServicesMap[userServiceNameInitial])
+        key = provideServerServiceKey(addedService)
+        serverServicesMap[key] = (addedService['name'], addedService.get('uid', addedService['name']))
+        printStatus(None, "REPORT: " + userServiceNameInitial + " is added as " + addedService['name'])
+
+    def addServiceOneByOne(payload, userServiceNameInitial, key):
+        addedService = addUserObjectToServer(client, "add-service-" + userServiceType, payload)
+        if addedService is not None:
+            onServiceAdded(payload, userServiceNameInitial, key, addedService)
+            publishUpdate(client, False)
+        else:
+            printStatus(None, "REPORT: " + userServiceNameInitial + ' is not added.')
+
+    def flushBatch():
+        addObjectsByBatches(client, "service-" + userServiceType, list(batchItems), onServiceAdded,
+                            addServiceOneByOne)
+        del batchItems[:]
+        batchKeys.clear()
+        batchNames.clear()
+        printStatus(None, "")
+
     for userService in userServices:
+        if restoreFromJournal("services-" + userServiceType, userService['Name'], mergedServicesMap):
+            continue
         printStatus(None, "processing " + userServiceType + " service: " + userService['Name'])
         userServiceNameInitial = userService['Name']
-        key = ""
+        key = provideUserServiceKey(userService)
         duplicationValueMessagePostfix = ""
         if 'Port' in userService:
-            key = userService['Port']
             duplicationValueMessagePostfix = "port: " + userService['Port']
         elif 'Type' in userService:
-            key = userService['Type']
             duplicationValueMessagePostfix = "type: " + userService['Type']
             if 'Code' in userService and userService['Code'] != 'null':
-                key += "_" + userService['Code']
                 duplicationValueMessagePostfix = "type / code: " + userService['Type'] + " / " + userService['Code']
         elif 'IpProtocol' in userService:
-            key = userService['IpProtocol']
             duplicationValueMessagePostfix = "ip-protocol: " + userService['IpProtocol']
+        if key in batchKeys or userService['Name'] in batchNames:
+            # the service with the same value or name is waiting in batch, it should be added at first
+            flushBatch()
         if key in serverServicesMap:
             printStatus(None, None,
                         "More than one " + userServiceType + " service has the same " + duplicationValueMessagePostfix)
@@ -774,13 +2633,11 @@ def processServices(client, userServices, userServiceType):
             printStatus(None, "REPORT: " + "CP object " + serverServicesMap[key][
                 0] + " is used instead of " + userServiceNameInitial)
         else:
-            userServiceNamePostfix = 1
-            serverServicesNames = [serverServiceNameUid[0] for serverServiceNameUid in serverServicesMap.values()]
-            if userService['Name'] in serverServicesNames:
+            # the changed service of previous run keeps its name, see --delta
+            isModified = ("service-" + userServiceType, userServiceNameInitial) in deltaModifiedObjects
+            if not isModified and isServerNameUsed(userService['Name']):
                 printStatus(None, None, "More than one object named '" + userService['Name'] + "' exists.")
-                while userService['Name'] in serverServicesNames:
-                    userService['Name'] = userServiceNameInitial + '_' + str(userServiceNamePostfix)
-                    userServiceNamePostfix += 1
+                userService['Name'] = provideFreeServerName(userServiceNameInitial)
             payload = {}
             payload["name"] = userService['Name']
             payload["comments"] = userService['Comments']
@@ -797,19 +2654,18 @@ def processServices(client, userServices, userServiceType):
             elif 'IpProtocol' in userService:
                 payload["ip-protocol"] = userService['IpProtocol']
                 payload["match-for-any"] = True
-            addedService = addUserObjectToServer(client, "add-service-" + userServiceType, payload,
-                                                 userServiceNamePostfix)
-            if addedService is not None:
-                mergedServicesMap[userServiceNameInitial] = addedService['uid']
-                key = provideServerServiceKey(addedService)
-                serverServicesMap[key] = (addedService['name'], addedService['uid'])
-                printStatus(None, "REPORT: " + userServiceNameInitial + " is added as " + addedService['name'])
-                publishCounter = publishUpdate(publishCounter, False)
-            else:
-                printStatus(None, "REPORT: " + userServiceNameInitial + ' is not added.')
+            if args.batch_size > 0 and not isModified:
+                batchItems.append((payload, userServiceNameInitial, key))
+                batchKeys.add(key)
+                batchNames.add(payload['name'])
+                if len(batchItems) >= args.batch_size:
+                    flushBatch()
+                continue
+            addServiceOneByOne(payload, userServiceNameInitial, key)
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedServicesMap
+    if len(batchItems) > 0:
+        flushBatch()
+    return mapEquivalentObjects(mergedServicesMap, userServicesAliases)
 
 
 # processing and adding to server the CheckPoint Service Groups
@@ -819,34 +2675,55 @@ def processServices(client, userServices, userServiceType):
 # mergedServicesMap - map of service objects which will be used for replacing
 # ---
 # returns: mergedServicesGroupsNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processServicesGroups(client, userServicesGroups, mergedServicesMap):
     printMessageProcessObjects("services groups")
-    publishCounter = 0
     mergedServicesGroupsNamesMap = {}
-    if len(userServicesGroups) == 0:
+    isEmpty, userServicesGroups = peekUserObjects(userServicesGroups)
+    if isEmpty:
         return mergedServicesGroupsNamesMap
-    for userServicesGroup in userServicesGroups:
+    userServicesGroupsAliases = {}
+    userServicesGroups = collapseEquivalentGroups(userServicesGroups, mergedServicesMap, userServicesGroupsAliases)
+    userServicesGroups = orderByDependencies(userServicesGroups, provideGroupDependencies)[0]
+    groupsNames = set(userServicesGroup['Name'] for userServicesGroup in userServicesGroups)
+
+    def processServicesGroup(userServicesGroup):
+        isChanged = False
         printStatus(None, "processing services group: " + userServicesGroup['Name'])
         userServicesGroupNameInitial = userServicesGroup['Name']
-        addedServicesGroup = processGroupWithMembers(client, "add-service-group", userServicesGroup, mergedServicesMap,
-                                                     mergedServicesGroupsNamesMap, False)
+        restoredServicesGroupName = getJournalEntry("services-groups", userServicesGroupNameInitial)
+        if restoredServicesGroupName is not None:
+            printStatus(None, "REPORT: " + userServicesGroupNameInitial + " is restored from journal as " +
+                        restoredServicesGroupName)
+            addedServicesGroup = provideRestoredObject("services-groups", userServicesGroupNameInitial, restoredServicesGroupName)
+        else:
+            addedServicesGroup = processGroupWithMembers(client, "add-service-group", userServicesGroup, mergedServicesMap,
+                                                         mergedServicesGroupsNamesMap, False)
         if addedServicesGroup is not None:
-            mergedServicesGroupsNamesMap[userServicesGroupNameInitial] = addedServicesGroup['name']
-            if 'errors' in addedServicesGroup:
-                if 'More than one object' in addedServicesGroup['errors'][0]['message']:
-                    printStatus(None, "REPORT: Using the existing object '{}'".format(addedServicesGroup['name']))
-            else:
-                printStatus(None, "REPORT: " + userServicesGroupNameInitial + " is added as " + addedServicesGroup['name'])
-            publishCounter = publishUpdate(publishCounter, True)
+            mergedServicesGroupsNamesMap[userServicesGroupNameInitial] = addedServicesGroup.get('uid', addedServicesGroup['name'])
+            if restoredServicesGroupName is None:
+                if 'errors' in addedServicesGroup:
+                    if 'More than one object' in addedServicesGroup['errors'][0]['message']:
+                        printStatus(None, "REPORT: Using the existing object '{}'".format(addedServicesGroup['name']))
+                else:
+                    printStatus(None, "REPORT: " + userServicesGroupNameInitial + " is added as " + addedServicesGroup['name'])
+                recordJournalEntry(client, "services-groups", userServicesGroupNameInitial, addedServicesGroup['name'])
+                isChanged = True
             userServicesGroup["Name"] = addedServicesGroup['name']
-            processGroupWithMembers(client, "add-service-group", userServicesGroup, mergedServicesMap,
-                                    mergedServicesGroupsNamesMap, True)
+            if getJournalEntry("services-groups-members", userServicesGroupNameInitial) is None:
+                groupMembers = processGroupWithMembers(client, "add-service-group", userServicesGroup,
+                                                       mergedServicesMap, mergedServicesGroupsNamesMap, True)
+                recordJournalEntry(client, "services-groups-members", userServicesGroupNameInitial, groupMembers)
+                isChanged = True
         else:
             printStatus(None, "REPORT: " + userServicesGroupNameInitial + " is not added.")
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedServicesGroupsNamesMap
+        return isChanged
+
+    processItemsByWaves(client, ((userServicesGroup,) for userServicesGroup in userServicesGroups),
+                        lambda userServicesGroup: provideGroupKeys(userServicesGroup, groupsNames),
+                        processServicesGroup)
+    return mapEquivalentObjects(mergedServicesGroupsNamesMap, userServicesGroupsAliases)
 
 
 # processing and adding to server the CheckPoint Time Groups
@@ -856,34 +2733,55 @@ def processServicesGroups(client, userServicesGroups, mergedServicesMap):
 # mergedTimesNamesMap - the list of the time names
 # ---
 # returns: mergedTimesGroupsNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processTimesGroups(client, userTimesGroups, mergedTimesNamesMap):
     printMessageProcessObjects("times groups")
-    publishCounter = 0
     mergedTimesGroupsNamesMap = {}
-    if len(userTimesGroups) == 0:
+    isEmpty, userTimesGroups = peekUserObjects(userTimesGroups)
+    if isEmpty:
         return mergedTimesGroupsNamesMap
-    for userTimesGroup in userTimesGroups:
+    userTimesGroupsAliases = {}
+    userTimesGroups = collapseEquivalentGroups(userTimesGroups, mergedTimesNamesMap, userTimesGroupsAliases)
+    userTimesGroups = orderByDependencies(userTimesGroups, provideGroupDependencies)[0]
+    groupsNames = set(userTimesGroup['Name'] for userTimesGroup in userTimesGroups)
+
+    def processTimesGroup(userTimesGroup):
+        isChanged = False
         printStatus(None, "processing times group: " + userTimesGroup['Name'])
         userTimesGroupNameInitial = userTimesGroup['Name']
-        addedTimesGroup = processGroupWithMembers(client, "add-time-group", userTimesGroup, mergedTimesNamesMap,
-                                                  mergedTimesGroupsNamesMap, False)
+        restoredTimesGroupName = getJournalEntry("times-groups", userTimesGroupNameInitial)
+        if restoredTimesGroupName is not None:
+            printStatus(None, "REPORT: " + userTimesGroupNameInitial + " is restored from journal as " +
+                        restoredTimesGroupName)
+            addedTimesGroup = provideRestoredObject("times-groups", userTimesGroupNameInitial, restoredTimesGroupName)
+        else:
+            addedTimesGroup = processGroupWithMembers(client, "add-time-group", userTimesGroup, mergedTimesNamesMap,
+                                                      mergedTimesGroupsNamesMap, False)
         if addedTimesGroup is not None:
-            mergedTimesGroupsNamesMap[userTimesGroupNameInitial] = addedTimesGroup['name']
-            if 'errors' in addedTimesGroup:
-                if 'More than one object' in addedTimesGroup['errors'][0]['message']:
-                    printStatus(None, "REPORT: Using the existing object '{}'".format(addedTimesGroup['name']))
-            else:
-                printStatus(None, "REPORT: " + userTimesGroupNameInitial + " is added as " + addedTimesGroup['name'])
-            publishCounter = publishUpdate(publishCounter, True)
+            mergedTimesGroupsNamesMap[userTimesGroupNameInitial] = addedTimesGroup.get('uid', addedTimesGroup['name'])
+            if restoredTimesGroupName is None:
+                if 'errors' in addedTimesGroup:
+                    if 'More than one object' in addedTimesGroup['errors'][0]['message']:
+                        printStatus(None, "REPORT: Using the existing object '{}'".format(addedTimesGroup['name']))
+                else:
+                    printStatus(None, "REPORT: " + userTimesGroupNameInitial + " is added as " + addedTimesGroup['name'])
+                recordJournalEntry(client, "times-groups", userTimesGroupNameInitial, addedTimesGroup['name'])
+                isChanged = True
             userTimesGroup["Name"] = addedTimesGroup['name']
-            processGroupWithMembers(client, "add-time-group", userTimesGroup, mergedTimesNamesMap,
-                                    mergedTimesGroupsNamesMap, True)
+            if getJournalEntry("times-groups-members", userTimesGroupNameInitial) is None:
+                groupMembers = processGroupWithMembers(client, "add-time-group", userTimesGroup, mergedTimesNamesMap,
+                                                       mergedTimesGroupsNamesMap, True)
+                recordJournalEntry(client, "times-groups-members", userTimesGroupNameInitial, groupMembers)
+                isChanged = True
         else:
             printStatus(None, "REPORT: " + userTimesGroupNameInitial + ' is not added.')
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
-    return mergedTimesGroupsNamesMap
+        return isChanged
+
+    processItemsByWaves(client, ((userTimesGroup,) for userTimesGroup in userTimesGroups),
+                        lambda userTimesGroup: provideGroupKeys(userTimesGroup, groupsNames),
+                        processTimesGroup)
+    return mapEquivalentObjects(mergedTimesGroupsNamesMap, userTimesGroupsAliases)
 
 
 # processing and adding to server the CheckPoint Time objects
@@ -892,16 +2790,18 @@ def processTimesGroups(client, userTimesGroups, mergedTimesNamesMap):
 # userTimes - the list of time objects which will be processed and added to server
 # ---
 # returns: mergedTimesNamesMap dictionary
-# the map contains name of user's object (key) and name of resulting object (value)
+# the map contains name of user's object (key) and uid or name of resulting object (value)
 def processTimes(client, userTimes):
     printMessageProcessObjects("times")
-    publishCounter = 0
     mergedTimesNamesMap = {}
     payload = {}
-    if len(userTimes) == 0:
+    isEmpty, userTimes = peekUserObjects(userTimes)
+    if isEmpty:
         return mergedTimesNamesMap
     weekdays = {0: "Sun", 1: "Mon", 2: "Tue", 3: "Wed", 4: "Thu", 5: "Fri", 6: "Sat"}
     for userTime in userTimes:
+        if restoreFromJournal("times", userTime['Name'], mergedTimesNamesMap):
+            continue
         printStatus(None, "processing time: " + userTime['Name'])
         userTimeNameInitial = userTime['Name']
 
@@ -962,18 +2862,23 @@ def processTimes(client, userTimes):
         )
 
         if addedTime is not None:
-            mergedTimesNamesMap[userTimeNameInitial] = addedTime['name']
+            mergedTimesNamesMap[userTimeNameInitial] = addedTime.get('uid', addedTime['name'])
+            recordJournalEntry(client, "times", userTimeNameInitial, mergedTimesNamesMap[userTimeNameInitial])
             printStatus(None, "REPORT: " + userTimeNameInitial + " is added as " + addedTime['name'])
-            publishCounter = publishUpdate(publishCounter, False)
+            publishUpdate(client, False)
         else:
             printStatus(None, "REPORT: " + userTimeNameInitial + ' is not added.')
         printStatus(None, "")
-    publishUpdate(publishCounter, True)
     return mergedTimesNamesMap
 
 
 # processing and adding to server the CheckPoint Access Rules
-# the rules is added in back order: the last item of list goes first and the first item goes last
+# the rules are added in natural order at explicit positions: the layer is empty or it contains "Clean up" rule only,
+# so each rule is added above "Clean up" rule and the server does not renumber the rules of whole layer;
+# the next position is moved only if rule is added or it was added by interrupted run (see --resume)
+# if args.batch_size is set then the rules are added by add-objects-batch requests,
+# the failed batch is added rule by rule
+# the objects of file are referenced by uid which is kept by the maps, so the server does not resolve the names
 # client - client object
 # userRules - the list of access rules which will be processed and added to server
 # userLayerName - the name of layer where access rules will be added
@@ -986,17 +2891,57 @@ def processTimes(client, userTimes):
 def addAccessRules(client, userRules, userLayerName, skipCleanUpRule, mergedNetworkObjectsMap, mergedServiceObjectsMap,
                    mergedTimesGroupsNamesMap, mergedTimesNamesMap):
     if userRules is not None:
-        publishCounter = 0
         printStatus(None, "processing access rules to " + userLayerName + " layer")
         printStatus(None, "")
-        userRulesStartPosition = -2 if skipCleanUpRule else -1
-        # userRules[userRulesStartPosition::-1]:
-        # -1 - minus means to iterate backwards, 1 means step
-        # userRulesStartPosition - start point, length of list "- userRulesStartPosition" because reverse mode is specified
-        # end point is not specified - all elements
-        for i, userRule in enumerate(userRules[userRulesStartPosition::-1]):
-            printStatus(None, "processing access rule: #" + str(len(userRules) - i) + ", " + (
-                userRule['Name'] if userRule['Name'] is not None else ""))
+        userRulesCount = len(userRules) - 1 if skipCleanUpRule else len(userRules)
+        rulePosition = 1
+        batchItems = []
+
+        def onRuleAdded(userRuleJournalKey, addedRule):
+            nonlocal rulePosition
+            rulePosition += 1
+            printStatus(None, "REPORT: access rule is added")
+            # the uid of rule is kept for deleting of rule by --delta run
+            recordJournalEntry(client, "access-rules", userRuleJournalKey, addedRule.get('uid', True))
+
+        def addRuleOneByOne(payload, userRuleJournalKey):
+            payload["position"] = rulePosition
+            addedRule = addUserObjectToServer(client, "add-access-rule", payload, changeName=False)
+            if addedRule is not None:
+                onRuleAdded(userRuleJournalKey, addedRule)
+                publishUpdate(client, False, args.rules_threshold)
+            else:
+                printStatus(None, "REPORT: access rule is not added")
+
+        def flushBatch():
+            for offset, batchItem in enumerate(batchItems):
+                batchItem[0]["position"] = rulePosition + offset
+            addedRules = addObjectsBatchToServer(client, "access-rule", [batchItem[0] for batchItem in batchItems])
+            if addedRules is None:
+                for batchItem in batchItems:
+                    addRuleOneByOne(*batchItem)
+            else:
+                # all rules of batch are recorded to journal before publishing
+                for batchItem, addedRule in zip(batchItems, addedRules):
+                    onRuleAdded(batchItem[1], addedRule)
+                for batchItem in batchItems:
+                    publishUpdate(client, False, args.rules_threshold)
+            del batchItems[:]
+            printStatus(None, "")
+
+        for i, userRule in enumerate(userRules[:userRulesCount]):
+            if userRule['Name'] is not None:
+                printStatus(None, "processing access rule: #" + str(i + 1) + ", " + userRule['Name'])
+            else:
+                printStatus(None, "processing access rule: #" + str(i + 1) + ", ")
+            userRuleJournalKey = userRule['Layer'] + "#" + str(i)
+            if getJournalEntry("access-rules", userRuleJournalKey) is not None:
+                if len(batchItems) > 0:
+                    flushBatch()
+                rulePosition += 1
+                printStatus(None, "REPORT: access rule is restored from journal")
+                printStatus(None, "")
+                continue
             # JSON access rules contain "action" as number
             # "action" number points to the next list of values from SmartMove:
             # 0 = Accept
@@ -1038,7 +2983,6 @@ def addAccessRules(client, userRules, userLayerName, skipCleanUpRule, mergedNetw
                 times.append(timeName)
             payload = {
                 "layer": userRule['Layer'],
-                "position": "top",
                 "name": userRule['Name'],
                 "action": actions[userRule['Action']],
                 "destination": destinations,
@@ -1055,14 +2999,15 @@ def addAccessRules(client, userRules, userLayerName, skipCleanUpRule, mergedNetw
                 payload["inline-layer"] = userRule['SubPolicyName']
             if userRule['ConversionComments'].strip() != "":
                 payload["custom-fields"] = {"field-1": userRule['ConversionComments']}
-            addedRule = addUserObjectToServer(client, "add-access-rule", payload, changeName=False)
-            if addedRule is not None:
-                printStatus(None, "REPORT: access rule is added")
-                publishCounter = publishUpdate(publishCounter, False)
-            else:
-                printStatus(None, "REPORT: access rule is not added")
+            if args.batch_size > 0:
+                batchItems.append((payload, userRuleJournalKey))
+                if len(batchItems) >= args.batch_size:
+                    flushBatch()
+                continue
+            addRuleOneByOne(payload, userRuleJournalKey)
             printStatus(None, "")
-        publishUpdate(publishCounter, True)
+        if len(batchItems) > 0:
+            flushBatch()
 
 
 # processing and adding to server the CheckPoint Package with Layers and Access Rules
@@ -1080,54 +3025,76 @@ def processPackage(client, userPackage, mergedNetworkObjectsMap, mergedServiceOb
     addedPackage = None
     if userPackage is not None:
         original_package_name = userPackage['Name']
-        userPackage['Name'] = userPackage['Name'] + "_" + str(uuid.uuid4().hex[:3].upper())
-        publishCounter = 0
-        printStatus(None, "processing package: " + userPackage['Name'])
-        addedPackage = addUserObjectToServer(
-            client,
-            "add-package",
-            {
-                "name": userPackage['Name'],
-                "threat-prevention": False,
-                "tags": userPackage['Tags']
-            },
-            changeName=False
-        )
-        if addedPackage is None:
-            printStatus(None, "REPORT: " + userPackage['Name'] + " package is not added")
-            return addedPackage
-        printStatus(None, "REPORT: " + userPackage['Name'] + " package is added")
-        printStatus(None, "")
-        publishCounter = publishUpdate(publishCounter, True)
+        restoredPackageName = getJournalEntry("package", original_package_name)
+        if restoredPackageName is not None:
+            userPackage['Name'] = restoredPackageName
+            printStatus(None, "processing package: " + userPackage['Name'])
+            addedPackage = {"name": restoredPackageName}
+            printStatus(None, "REPORT: " + userPackage['Name'] + " package is restored from journal")
+            printStatus(None, "")
+        else:
+            userPackage['Name'] = userPackage['Name'] + "_" + str(uuid.uuid4().hex[:3].upper())
+            printStatus(None, "processing package: " + userPackage['Name'])
+            addedPackage = addUserObjectToServer(
+                client,
+                "add-package",
+                {
+                    "name": userPackage['Name'],
+                    "threat-prevention": False,
+                    "tags": userPackage['Tags']
+                },
+                changeName=False
+            )
+            if addedPackage is None:
+                printStatus(None, "REPORT: " + userPackage['Name'] + " package is not added")
+                return addedPackage
+            printStatus(None, "REPORT: " + userPackage['Name'] + " package is added")
+            printStatus(None, "")
+            recordJournalEntry(client, "package", original_package_name, userPackage['Name'])
+            publishUpdate(client, False)
         if userPackage['SubPolicies'] is not None:
-            for userSubLayer in userPackage['SubPolicies']:
+            # the inline layers are added before the layers which rules use them
+            userSubLayers = orderByDependencies(userPackage['SubPolicies'], provideLayerDependencies)[0]
+            for userSubLayer in userSubLayers:
                 originalName = userSubLayer['Name']
-                userSubLayer['Name'] = userSubLayer['Name'] + "_" + str(uuid.uuid4().hex[:3].upper())
-                allExistingLayers[originalName] = userSubLayer['Name']
+                restoredSubLayerName = getJournalEntry("layers", originalName)
+                if restoredSubLayerName is not None:
+                    allExistingLayers[originalName] = restoredSubLayerName
+                else:
+                    allExistingLayers[originalName] = originalName + "_" + str(uuid.uuid4().hex[:3].upper())
+            for userSubLayer in userSubLayers:
+                originalName = userSubLayer['Name']
+                restoredSubLayerName = getJournalEntry("layers", originalName)
+                userSubLayer['Name'] = allExistingLayers[originalName]
                 for rule in userSubLayer['Rules']:
                     rule['Layer'] = userSubLayer['Name']
                     if rule['SubPolicyName'] != "":
-                        rule['SubPolicyName'] = allExistingLayers[rule['SubPolicyName']]
+                        rule['SubPolicyName'] = allExistingLayers.get(rule['SubPolicyName'], rule['SubPolicyName'])
                 printStatus(None, "processing access layer: " + userSubLayer['Name'])
 
-                addedSubLayer = addUserObjectToServer(
-                    client,
-                    "add-access-layer",
-                    {
-                        "name": userSubLayer['Name'],
-                        "add-default-rule": False,
-                        "applications-and-url-filtering": userSubLayer['ApplicationsAndUrlFiltering'],
-                        "comments": userSubLayer['Comments'],
-                        "tags": userSubLayer['Tags']
-                    },
-                    changeName=False
-                )
-                if addedSubLayer is None:
-                    printStatus(None, "REPORT: " + userSubLayer['Name'] + " layer is not added")
-                    continue
-                printStatus(None, "REPORT: " + userSubLayer['Name'] + " layer is added")
-                printStatus(None, "")
-                publishCounter = publishUpdate(publishCounter, True)
+                if restoredSubLayerName is not None:
+                    printStatus(None, "REPORT: " + userSubLayer['Name'] + " layer is restored from journal")
+                    printStatus(None, "")
+                else:
+                    addedSubLayer = addUserObjectToServer(
+                        client,
+                        "add-access-layer",
+                        {
+                            "name": userSubLayer['Name'],
+                            "add-default-rule": False,
+                            "applications-and-url-filtering": userSubLayer['ApplicationsAndUrlFiltering'],
+                            "comments": userSubLayer['Comments'],
+                            "tags": userSubLayer['Tags']
+                        },
+                        changeName=False
+                    )
+                    if addedSubLayer is None:
+                        printStatus(None, "REPORT: " + userSubLayer['Name'] + " layer is not added")
+                        continue
+                    printStatus(None, "REPORT: " + userSubLayer['Name'] + " layer is added")
+                    printStatus(None, "")
+                    recordJournalEntry(client, "layers", originalName, userSubLayer['Name'])
+                    publishUpdate(client, False)
                 addAccessRules(client, userSubLayer['Rules'], userSubLayer['Name'], False, mergedNetworkObjectsMap,
                                mergedServiceObjectsMap, mergedTimesGroupsNamesMap, mergedTimesNamesMap)
         if userPackage['ParentLayer'] is not None:
@@ -1136,7 +3103,8 @@ def processPackage(client, userPackage, mergedNetworkObjectsMap, mergedServiceOb
             for parentRule in userPackage['ParentLayer']['Rules']:
                 parentRule['Layer'] = userPackage['ParentLayer']['Name']
                 if parentRule['SubPolicyName'] != "":
-                    parentRule['SubPolicyName'] = allExistingLayers[parentRule['SubPolicyName']]
+                    parentRule['SubPolicyName'] = allExistingLayers.get(parentRule['SubPolicyName'],
+                                                                        parentRule['SubPolicyName'])
             addAccessRules(client, userPackage['ParentLayer']['Rules'], "parent", True, mergedNetworkObjectsMap,
                            mergedServiceObjectsMap, mergedTimesGroupsNamesMap, mergedTimesNamesMap)
     return addedPackage
@@ -1157,6 +3125,7 @@ def getMethodType(typeValue):
 
 # processing and adding to server the CheckPoint NAT rules
 # NAT rules are added if package has been added
+# the objects of file are referenced by uid which is kept by the maps, see addAccessRules
 # client - client object
 # addedPackage - added package in JSON format
 # userNatRules - the list of NAT rules which will be processed and added to server
@@ -1169,10 +3138,13 @@ def processNatRules(client, addedPackage, userNatRules, mergedNetworkObjectsMap,
     if addedPackage is None:
         printStatus(None, "REPORT: nat rules can not been added because package was not added")
         return
-    publishCounter = 0
     for i, userNatRule in enumerate(userNatRules):
         userNatRule['Package'] = addedPackage['name']
         printStatus(None, "processing nat rule: #" + str(i))
+        if getJournalEntry("nat-rules", str(i)) is not None:
+            printStatus(None, "REPORT: nat rule is restored from journal")
+            printStatus(None, "")
+            continue
         sourceOrig = ""
         if userNatRule['Source'] is not None:
             sourceOrig = userNatRule['Source']['Name']
@@ -1204,7 +3176,7 @@ def processNatRules(client, addedPackage, userNatRules, mergedNetworkObjectsMap,
                 serviceTrans] if serviceTrans in mergedServiceObjectsMap else serviceTrans
         payload = {
             "package": userNatRule['Package'],
-            "position": "bottom",
+            "position": deltaNatRulesPositions.get(str(i), "bottom"),
             "comments": userNatRule['Comments'],
             "enabled": userNatRule['Enabled'],
             "method": getMethodType(userNatRule['Method']),
@@ -1218,11 +3190,645 @@ def processNatRules(client, addedPackage, userNatRules, mergedNetworkObjectsMap,
         addedNatRule = addUserObjectToServer(client, "add-nat-rule", payload, changeName=False)
         if addedNatRule is not None:
             printStatus(None, "REPORT: nat rule is added")
-            publishCounter = publishUpdate(publishCounter, False)
+            recordJournalEntry(client, "nat-rules", str(i), addedNatRule.get('uid', True))
+            publishUpdate(client, False, args.rules_threshold)
         else:
             printStatus(None, "REPORT: nat rule is not added")
         printStatus(None, "")
-    publishCounter = publishUpdate(publishCounter, True)
+
+
+# login to server by the input arguments: as root, by user and password or by api key
+# client - client object
+# ---
+# returns: response from server
+def loginToServer(client):
+    if args.root:
+        msg = "login as root to "
+        if args.domain is not None:
+            msg += args.domain + " domain of local server"
+        else:
+            msg += "local server"
+        printStatus(None, msg)
+        return client.login_as_root(domain=args.domain)
+    elif args.user:
+        msg = "login as " + args.user + " to "
+        if args.domain is not None:
+            msg += args.domain + " domain of " + args.management + " server"
+        else:
+            msg += args.management + " server"
+        printStatus(None, msg)
+        return client.login(args.user, args.password, domain=args.domain)
+    else:
+        msg = "login by api key to "
+        if args.domain is not None:
+            msg += args.domain + " domain of " + args.management + " server"
+        else:
+            msg += args.management + " server"
+        printStatus(None, msg)
+        return client.login_with_api_key(args.key, domain=args.domain)
+
+
+# opening additional logged in sessions which are used by the workers
+# clientArgs - arguments of client object
+# sessionsCount - number of sessions which should be opened
+# ---
+# returns: list of client objects, the session which can not be opened is skipped
+def openWorkerSessions(clientArgs, sessionsCount):
+    workerClients = []
+    for i in range(sessionsCount):
+        printStatus(None, "opening worker session #" + str(i + 1))
+        workerClient = provideApiClient(clientArgs)
+        if workerClient.check_fingerprint() is False:
+            printStatus(None, "Could not get the server's fingerprint - Check connectivity with the server.")
+            continue
+        trackSessionChanges(workerClient)
+        login_res = loginToServer(workerClient)
+        if login_res.success is False:
+            printStatus(None, "Login failed: " + str(login_res.error_message))
+            continue
+        workerClients.append(workerClient)
+    printStatus(None, "")
+    return workerClients
+
+
+# closing the sessions which are used by the workers
+# the changes of sessions are published before, because the main session uses the objects of worker sessions
+# workerClients - list of client objects
+# ---
+# returns: nothing
+def closeWorkerSessions(workerClients):
+    for workerClient in workerClients:
+        publishUpdate(workerClient, True)
+        printStatus(workerClient.api_call("logout", {}), None)
+
+
+# merging the maps of user's objects which are returned by phases: the largest map (e.g. hosts) is updated in place,
+# so its entries are not copied; the map of later phase has precedence as if the maps were merged in order
+# phasesMaps - the list of maps in the order of phases
+# ---
+# returns: merged map
+def mergePhasesMaps(phasesMaps):
+    if len(phasesMaps) == 0:
+        return {}
+    largestIndex = max(range(len(phasesMaps)), key=lambda i: len(phasesMaps[i]))
+    mergedMap = phasesMaps[largestIndex]
+    # the maps of earlier phases do not replace the entries which are set by later phases
+    for phaseMap in reversed(phasesMaps[:largestIndex]):
+        for key, value in phaseMap.items():
+            mergedMap.setdefault(key, value)
+    for phaseMap in phasesMaps[largestIndex + 1:]:
+        mergedMap.update(phaseMap)
+    return mergedMap
+
+
+# running the phases which do not depend on each other
+# each phase takes free session; the changes of worker sessions are published by closeWorkerSessions
+# all phases are finished when function returns
+# client - client object
+# workerClients - list of additional client objects; phases are running one by one if the list is empty
+# phases - list of tuples: process function and its arguments without client
+# ---
+# returns: list of results of phases in the same order
+def runIndependentPhases(client, workerClients, phases):
+    if len(workerClients) == 0:
+        return [processFunction(client, *processArgs) for processFunction, processArgs in phases]
+    freeClients = queue.Queue()
+    for freeClient in [client] + workerClients:
+        freeClients.put(freeClient)
+
+    def runPhase(processFunction, processArgs):
+        phaseClient = freeClients.get()
+        try:
+            return processFunction(phaseClient, *processArgs)
+        finally:
+            freeClients.put(phaseClient)
+
+    with ThreadPoolExecutor(max_workers=len(workerClients) + 1) as executor:
+        futures = [executor.submit(runPhase, processFunction, processArgs) for processFunction, processArgs in phases]
+        return [future.result() for future in futures]
+
+
+# interning the string and the strings of list: the names are repeated by groups, rules and other objects
+# value - value of field of JSON object
+# ---
+# returns: interned value
+def internUserValue(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [sys.intern(item) if isinstance(item, str) else item for item in value]
+    return value
+
+
+# providing the map of JSON object which is decoded; the names of fields and the strings are interned, so the fields
+# of all objects and the names which are referenced by groups and rules share one string
+# fields - the list of pairs of JSON object: the name of field and its value
+# ---
+# returns: user's object
+def provideUserObject(fields):
+    return {sys.intern(key): internUserValue(value) for key, value in fields}
+
+
+# the decoder of JSON file and of spilled objects which interns the names of user's objects
+userObjectsDecoder = json.JSONDecoder(object_pairs_hook=provideUserObject)
+
+
+# reading the JSON file which contains array of objects incrementally, only the current object is kept in memory
+# if the object is not complete in the read part of file then the size of next read part is doubled
+# fileName - the name of JSON file
+# chunkSize - the number of characters which are read from file at once
+# ---
+# returns: generator of the objects of array
+def iterateJsonArray(fileName, chunkSize=1048576):
+    decoder = userObjectsDecoder
+    with open(fileName) as jsonFile:
+        buffer = ''
+        chunk = jsonFile.read(chunkSize)
+        while buffer == '' and len(chunk) > 0:
+            buffer = chunk.lstrip('\ufeff').lstrip()
+            chunk = jsonFile.read(chunkSize) if buffer == '' else ''
+        if not buffer.startswith('['):
+            raise ValueError("JSON file does not contain array of objects: " + fileName)
+        position = 1
+        readSize = chunkSize
+        isEndOfFile = False
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                if buffer[position] == ']':
+                    return
+                try:
+                    jsonObject, position_end = decoder.raw_decode(buffer, position)
+                    # the object which ends with the read part of file can be incomplete number or literal
+                    if position_end < len(buffer) or isEndOfFile:
+                        yield jsonObject
+                        position = position_end
+                        readSize = chunkSize
+                        continue
+                except ValueError:
+                    if isEndOfFile:
+                        raise
+            elif isEndOfFile:
+                raise ValueError("JSON file is truncated: " + fileName)
+            chunk = jsonFile.read(readSize)
+            isEndOfFile = len(chunk) == 0
+            buffer = buffer[position:] + chunk
+            position = 0
+            readSize = max(chunkSize, len(buffer))
+
+
+# providing the objects from queue until the end mark (None) is received
+# the end mark is returned to queue, so the rest of queue can be read again
+# objectsQueue - queue of objects
+# ---
+# returns: generator of objects
+def iterateQueue(objectsQueue):
+    while True:
+        userObject = objectsQueue.get()
+        if userObject is None:
+            objectsQueue.put(None)
+            return
+        yield userObject
+
+
+# reading the objects which were spilled to temporary file while JSON file was read
+# spilledObjects - map of spilled objects: the name of spilled objects (key) and temporary file (value)
+# spillName - the name of spilled objects
+# ---
+# returns: generator of objects, the objects are read from temporary file one by one
+def iterateSpilledObjects(spilledObjects, spillName):
+    if spillName not in spilledObjects:
+        return
+    spillFile = spilledObjects[spillName]
+    spillFile.seek(0)
+    for line in spillFile:
+        yield userObjectsDecoder.decode(line)
+
+
+# the types of objects which are passed to their phases while JSON file is read: the type name (key) and
+# tuple of process function, its additional arguments and the name of merged map for the result of phase (value)
+streamedObjectsTypes = {
+    'CheckPoint_Domain': (processDomains, (), "network"),
+    'CheckPoint_Host': (processHosts, (), "network"),
+    'CheckPoint_Network': (processNetworks, (), "network"),
+    'CheckPoint_Range': (processRanges, (), "network"),
+    'CheckPoint_SimpleGateway': (processSimpleGateways, (), "network"),
+    'CheckPoint_Zone': (processZones, (), "network"),
+    'CheckPoint_TcpService': (processServices, ("tcp",), "services"),
+    'CheckPoint_UdpService': (processServices, ("udp",), "services"),
+    'CheckPoint_SctpService': (processServices, ("sctp",), "services"),
+    'CheckPoint_IcmpService': (processServices, ("icmp",), "services"),
+    'CheckPoint_OtherService': (processServices, ("other",), "services")
+}
+
+# the types of objects which depend on other objects and are spilled to temporary files while JSON file is read:
+# the type name (key) and the name of spilled objects (value)
+spilledObjectsTypes = {
+    'CheckPoint_NetworkGroup': "network-groups",
+    'CheckPoint_GroupWithExclusion': "network-groups",
+    'CheckPoint_ServiceGroup': "services-groups",
+    'CheckPoint_TimeGroup': "times-groups",
+    'CheckPoint_Time': "times",
+    'CheckPoint_Package': "package",
+    'CheckPoint_NAT_Rule': "nat-rules"
+}
+
+
+# processing the objects of JSON file while the file is read
+# each sequence of objects of the same independent type is passed to its phase by bounded queue;
+# the phase takes free session and the number of running phases is not more than the number of sessions,
+# so the number of objects which are kept in memory does not depend on the size of file
+# the objects of other types are spilled to temporary files and are processed after all independent objects
+# client - client object
+# workerClients - list of additional client objects
+# fileName - the name of JSON file
+# ---
+# returns: tuple: mergedNetworkObjectsMap, mergedServicesObjectsMap and map of spilled objects:
+# the name of spilled objects (key) and temporary file (value)
+def processStreamedObjects(client, workerClients, fileName):
+    freeClients = queue.Queue()
+    for freeClient in [client] + workerClients:
+        freeClients.put(freeClient)
+    runningPhases = threading.BoundedSemaphore(len(workerClients) + 1)
+    streamedPhases = []
+    spilledObjects = {}
+
+    def runStreamedPhase(processFunction, processArgs, objectsQueue):
+        phaseClient = freeClients.get()
+        try:
+            return processFunction(phaseClient, iterateQueue(objectsQueue), *processArgs)
+        finally:
+            # the rest of objects is dropped if the phase is failed, so reading of file is not blocked
+            for userObject in iterateQueue(objectsQueue):
+                pass
+            freeClients.put(phaseClient)
+            runningPhases.release()
+
+    def startStreamedPhase(typeName):
+        processFunction, processArgs, mergedMapName = streamedObjectsTypes[typeName]
+        runningPhases.acquire()
+        objectsQueue = queue.Queue(maxsize=args.stream_queue_size)
+        future = executor.submit(runStreamedPhase, processFunction, processArgs, objectsQueue)
+        streamedPhases.append((future, mergedMapName))
+        streamedTypesNames.add(typeName)
+        return objectsQueue
+
+    streamedTypesNames = set()
+    with ThreadPoolExecutor(max_workers=len(workerClients) + 1) as executor:
+        currentTypeName = None
+        currentQueue = None
+        try:
+            for jsonObject in iterateJsonArray(fileName):
+                if jsonObject is None or 'TypeName' not in jsonObject:
+                    continue
+                typeName = jsonObject['TypeName']
+                if typeName in spilledObjectsTypes:
+                    spillName = spilledObjectsTypes[typeName]
+                    if spillName not in spilledObjects:
+                        spilledObjects[spillName] = tempfile.TemporaryFile("w+")
+                    spilledObjects[spillName].write(json.dumps(jsonObject) + "\n")
+                    continue
+                if typeName not in streamedObjectsTypes:
+                    continue
+                normalizeUserObjectIp(jsonObject)
+                if typeName != currentTypeName:
+                    if currentQueue is not None:
+                        currentQueue.put(None)
+                    currentQueue = startStreamedPhase(typeName)
+                    currentTypeName = typeName
+                currentQueue.put(jsonObject)
+            if currentQueue is not None:
+                currentQueue.put(None)
+                currentQueue = None
+            # the phases of types which are absent in file are run too, e.g. services phase reads services of server
+            for typeName in streamedObjectsTypes:
+                if typeName not in streamedTypesNames:
+                    startStreamedPhase(typeName).put(None)
+        finally:
+            if currentQueue is not None:
+                currentQueue.put(None)
+    mergedNetworkObjectsMap = mergePhasesMaps([future.result() for future, mergedMapName in streamedPhases
+                                               if mergedMapName == "network"])
+    mergedServicesObjectsMap = mergePhasesMaps([future.result() for future, mergedMapName in streamedPhases
+                                                if mergedMapName != "network"])
+    return mergedNetworkObjectsMap, mergedServicesObjectsMap, spilledObjects
+
+
+# parsing JSON file to the lists of user's objects by type
+# fileName - the name of JSON file
+# ---
+# returns: the map which contains the type (key) and the list of user's objects of the type (value); the package is
+# the object, not the list
+def parseUserObjects(fileName):
+    userObjects = {"domains": [], "hosts": [], "networks": [], "ranges": [], "network-groups": [],
+                   "simple-gateways": [], "zones": [], "services-tcp": [], "services-udp": [], "services-sctp": [],
+                   "services-icmp": [], "services-other": [], "services-groups": [], "times-groups": [], "times": [],
+                   "package": None, "nat-rules": []}
+    userObjectsTypes = {'CheckPoint_Domain': "domains", 'CheckPoint_Host': "hosts", 'CheckPoint_Network': "networks",
+                        'CheckPoint_Range': "ranges", 'CheckPoint_NetworkGroup': "network-groups",
+                        'CheckPoint_GroupWithExclusion': "network-groups",
+                        'CheckPoint_SimpleGateway': "simple-gateways", 'CheckPoint_Zone': "zones",
+                        'CheckPoint_TcpService': "services-tcp", 'CheckPoint_UdpService': "services-udp",
+                        'CheckPoint_SctpService': "services-sctp", 'CheckPoint_IcmpService': "services-icmp",
+                        'CheckPoint_OtherService': "services-other", 'CheckPoint_ServiceGroup': "services-groups",
+                        'CheckPoint_TimeGroup': "times-groups", 'CheckPoint_Time': "times",
+                        'CheckPoint_NAT_Rule': "nat-rules"}
+    for jsonObject in iterateJsonArray(fileName):
+        if jsonObject is None or 'TypeName' not in jsonObject:
+            continue
+        normalizeUserObjectIp(jsonObject)
+        if jsonObject['TypeName'] == 'CheckPoint_Package':
+            userObjects["package"] = jsonObject
+        elif jsonObject['TypeName'] in userObjectsTypes:
+            userObjects[userObjectsTypes[jsonObject['TypeName']]].append(jsonObject)
+    return userObjects
+
+
+# checking the references between user's objects before any request to server: hosts and networks to groups,
+# groups to groups, objects to rules and layers to inline layers
+# the names which are not defined in file are reported once, they have to exist at server (e.g. predefined services);
+# the groups and layers which are in cycle or depend on cycle are reported, they are processed in the order of file
+# userObjects - the map of user's objects by type, see parseUserObjects
+# ---
+# returns: tuple: the number of names which are not defined in file and the number of objects in cycles
+def checkUserObjectsDependencies(userObjects):
+    printStatus(None, "checking references between objects")
+    networkNames = set()
+    for objectsType in ("domains", "hosts", "networks", "ranges", "network-groups", "simple-gateways", "zones"):
+        networkNames.update(userObject['Name'] for userObject in userObjects[objectsType])
+    servicesNames = set()
+    for objectsType in ("services-tcp", "services-udp", "services-sctp", "services-icmp", "services-other",
+                        "services-groups"):
+        servicesNames.update(userObject['Name'] for userObject in userObjects[objectsType])
+    timesNames = set(userObject['Name'] for userObject in userObjects["times"] + userObjects["times-groups"])
+    userLayers = []
+    if userObjects["package"] is not None:
+        userLayers = userObjects["package"]['SubPolicies'] or []
+    layersNames = set(userLayer['Name'] for userLayer in userLayers)
+    undefinedNames = set()
+
+    def checkName(referenceName, definedNames, referringName):
+        if referenceName is None or referenceName == "" or referenceName == "Any" or referenceName in definedNames \
+                or referenceName in undefinedNames:
+            return
+        undefinedNames.add(referenceName)
+        printStatus(None, "REPORT: " + referenceName + " is used by " + referringName +
+                    " but it is not defined in file, it has to exist at server")
+
+    for objectsType, definedNames in (("network-groups", networkNames), ("services-groups", servicesNames),
+                                      ("times-groups", timesNames)):
+        for userGroup in userObjects[objectsType]:
+            for dependencyName in provideGroupDependencies(userGroup):
+                checkName(dependencyName, definedNames, userGroup['Name'])
+    userRulesLayers = list(userLayers)
+    if userObjects["package"] is not None and userObjects["package"]['ParentLayer'] is not None:
+        userRulesLayers.append(userObjects["package"]['ParentLayer'])
+    for userLayer in userRulesLayers:
+        for i, userRule in enumerate(userLayer['Rules']):
+            referringName = "access rule #" + str(i + 1) + " of " + userLayer['Name']
+            for fieldName, definedNames in (("Source", networkNames), ("Destination", networkNames),
+                                            ("Service", servicesNames), ("Time", timesNames)):
+                for reference in userRule.get(fieldName) or []:
+                    checkName(reference['Name'], definedNames, referringName)
+            checkName(userRule['SubPolicyName'], layersNames, referringName)
+    for i, userNatRule in enumerate(userObjects["nat-rules"]):
+        for fieldName, definedNames in (("Source", networkNames), ("Destination", networkNames),
+                                        ("Service", servicesNames), ("TranslatedSource", networkNames),
+                                        ("TranslatedDestination", networkNames), ("TranslatedService", servicesNames)):
+            if userNatRule.get(fieldName) is not None:
+                checkName(userNatRule[fieldName]['Name'], definedNames, "nat rule #" + str(i))
+    cycledCount = 0
+    for objectsType in ("network-groups", "services-groups", "times-groups"):
+        cycledObjects = orderByDependencies(userObjects[objectsType], provideGroupDependencies)[1]
+        cycledCount += len(cycledObjects)
+        if len(cycledObjects) > 0:
+            printStatus(None, None, objectsType + " are in cycle or depend on cycle, they are processed in the order "
+                                                  "of file: " + ", ".join(userObject['Name'] for userObject in cycledObjects))
+    cycledLayers = orderByDependencies(userLayers, provideLayerDependencies)[1]
+    cycledCount += len(cycledLayers)
+    if len(cycledLayers) > 0:
+        printStatus(None, None, "layers are in cycle or depend on cycle, they are processed in the order of file: " +
+                    ", ".join(userLayer['Name'] for userLayer in cycledLayers))
+    printStatus(None, "REPORT: " + str(len(undefinedNames)) + " names are not defined in file, " + str(cycledCount) +
+                " groups and layers are in cycle or depend on cycle")
+    printStatus(None, "")
+    return len(undefinedNames), cycledCount
+
+
+# pruning the user's objects which are not referenced: the reachable names are collected from access rules of package
+# (the sub-policies are included) and from NAT rules, then the members of reachable groups are reachable too;
+# the simple gateways are not pruned; the pruned objects are removed from the lists and written to report file
+# userObjects - the map of user's objects by type, see parseUserObjects
+# fileName - the name of report file
+# ---
+# returns: the number of pruned objects
+def pruneUnreferencedObjects(userObjects, fileName):
+    printStatus(None, "pruning objects which are not referenced by rules")
+    objectsTypesNamespaces = {"domains": "network", "hosts": "network", "networks": "network", "ranges": "network",
+                              "network-groups": "network", "zones": "network", "services-tcp": "service",
+                              "services-udp": "service", "services-sctp": "service", "services-icmp": "service",
+                              "services-other": "service", "services-groups": "service", "times": "time",
+                              "times-groups": "time"}
+    reachableNames = {"network": set(), "service": set(), "time": set()}
+    userRulesLayers = []
+    if userObjects["package"] is not None:
+        userRulesLayers = list(userObjects["package"]['SubPolicies'] or [])
+        if userObjects["package"]['ParentLayer'] is not None:
+            userRulesLayers.append(userObjects["package"]['ParentLayer'])
+    for userLayer in userRulesLayers:
+        for userRule in userLayer['Rules']:
+            for fieldName, namespace in (("Source", "network"), ("Destination", "network"), ("Service", "service"),
+                                         ("Time", "time")):
+                reachableNames[namespace].update(reference['Name'] for reference in userRule.get(fieldName) or [])
+    for userNatRule in userObjects["nat-rules"]:
+        for fieldName, namespace in (("Source", "network"), ("Destination", "network"), ("Service", "service"),
+                                     ("TranslatedSource", "network"), ("TranslatedDestination", "network"),
+                                     ("TranslatedService", "service")):
+            if userNatRule.get(fieldName) is not None:
+                reachableNames[namespace].add(userNatRule[fieldName]['Name'])
+    for groupsType, namespace in (("network-groups", "network"), ("services-groups", "service"),
+                                  ("times-groups", "time")):
+        userGroupsByNames = {}
+        for userGroup in userObjects[groupsType]:
+            userGroupsByNames.setdefault(userGroup['Name'], []).append(userGroup)
+        pendingNames = [name for name in reachableNames[namespace] if name in userGroupsByNames]
+        while len(pendingNames) > 0:
+            for userGroup in userGroupsByNames.pop(pendingNames.pop(), []):
+                for dependencyName in provideGroupDependencies(userGroup):
+                    if dependencyName is None or dependencyName in reachableNames[namespace]:
+                        continue
+                    reachableNames[namespace].add(dependencyName)
+                    if dependencyName in userGroupsByNames:
+                        pendingNames.append(dependencyName)
+    prunedObjects = []
+    for objectsType, namespace in objectsTypesNamespaces.items():
+        reachableObjects = []
+        for userObject in userObjects[objectsType]:
+            if userObject['Name'] in reachableNames[namespace]:
+                reachableObjects.append(userObject)
+            else:
+                prunedObjects.append({"type": userObject['TypeName'], "name": userObject['Name']})
+        userObjects[objectsType] = reachableObjects
+    with open(fileName, "w") as pruned_file:
+        json.dump({"file": args.file, "domain": args.domain, "objects": prunedObjects}, pruned_file, indent=2)
+    printStatus(None, "REPORT: " + str(len(prunedObjects)) + " objects are not referenced by rules and are not "
+                                                            "added, they are written to " + fileName)
+    printStatus(None, "")
+    return len(prunedObjects)
+
+
+# providing the name of log file without extension; the journal file has the same name
+# fileName - the name of JSON file
+# domain - the name of domain if the domain is processed by separate process, None - otherwise
+# ---
+# returns: the name of log file without extension
+def provideLogFileName(fileName, domain=None):
+    logFileName = "smartconnector"
+    if fileName != "cp_objects.json":
+        logFileName += "_" + os.path.splitext(fileName)[0]
+    if domain is not None:
+        logFileName += "_" + re.sub(r'[^\w.-]', "_", domain)
+    return logFileName
+
+
+# providing the pairs of JSON file and domain which are processed by separate processes
+# the pairs are read from manifest file if it is set: each line contains "<file>,<domain>", empty lines and lines
+# which start from '#' are skipped; otherwise the file from --file is used for each domain from --domains
+# the pairs are ordered by file, so each file is parsed once
+# ---
+# returns: the list of tuples: the name of JSON file and the name of domain
+def provideDomainsRuns():
+    domainsRuns = []
+    if args.domains_manifest is not None:
+        with open(args.domains_manifest) as manifestFile:
+            for line in manifestFile:
+                line = line.strip()
+                if line == "" or line.startswith("#"):
+                    continue
+                if "," not in line:
+                    printStatus(None, None, "the line of domains manifest is skipped, it is not <file>,<domain>: " + line)
+                    continue
+                fileName, domain = line.split(",", 1)
+                domainsRuns.append((fileName.strip(), domain.strip()))
+    elif args.domains is not None:
+        domainsRuns = [(args.file, domain.strip()) for domain in args.domains.split(",") if domain.strip() != ""]
+    filesNames = []
+    for fileName, domain in domainsRuns:
+        if fileName not in filesNames:
+            filesNames.append(fileName)
+    return sorted(domainsRuns, key=lambda domainRun: filesNames.index(domainRun[0]))
+
+
+# waiting for one of forked processes and reporting its result
+# domainsProcesses - the map which contains the process id (key) and the pair of file and domain (value)
+# ---
+# returns: True - if the process is completed successfully, False - otherwise
+def waitDomainProcess(domainsProcesses):
+    pid, status = os.wait()
+    fileName, domain = domainsProcesses.pop(pid)
+    exitCode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+    if exitCode == 0:
+        printStatus(None, "REPORT: domain " + domain + " is completed, file: " + fileName + ", log: " +
+                    provideLogFileName(fileName, domain) + ".log")
+    else:
+        printStatus(None, None, "REPORT: domain " + domain + " is failed with exit code " + str(exitCode) +
+                    ", file: " + fileName + ", log: " + provideLogFileName(fileName, domain) + ".log")
+    return exitCode == 0
+
+
+# running the migration of each domain in separate process which is forked after the JSON file is parsed,
+# so the file is parsed once for all domains; at most args.domains_workers processes are running at the same time
+# domainsRuns - the list of tuples: the name of JSON file and the name of domain
+# ---
+# returns: tuple: the tuple of file name, domain and parsed user's objects in forked process and None in main process
+#          when all forked processes are finished; the number of domains which are completed
+def forkDomainsProcesses(domainsRuns):
+    domainsProcesses = {}
+    completedCount = 0
+    parsedFileName = None
+    userObjects = None
+    for fileName, domain in domainsRuns:
+        if fileName != parsedFileName:
+            printStatus(None, "reading and parsing processes are started for JSON file: " + fileName)
+            userObjects = parseUserObjects(fileName)
+            parsedFileName = fileName
+            printStatus(None, "reading and parsing processes are completed for JSON file: " + fileName)
+            checkUserObjectsDependencies(userObjects)
+        while len(domainsProcesses) >= args.domains_workers:
+            completedCount += 1 if waitDomainProcess(domainsProcesses) else 0
+        # the buffers are written before fork and the lock is not held by other thread at fork
+        with printLock:
+            writeLogBuffers(True)
+            pid = os.fork()
+        if pid == 0:
+            return (fileName, domain, userObjects), completedCount
+        domainsProcesses[pid] = (fileName, domain)
+        printStatus(None, "process " + str(pid) + " is started for domain: " + domain)
+    while len(domainsProcesses) > 0:
+        completedCount += 1 if waitDomainProcess(domainsProcesses) else 0
+    printStatus(None, "==========")
+    printStatus(None, "REPORT: " + str(completedCount) + " of " + str(len(domainsRuns)) + " domains are completed")
+    return None, completedCount
+
+
+# opening the simulated server of --plan mode; the module of simulated server is loaded only in this mode
+# ---
+# returns: nothing
+def openPlanServer():
+    global planServer
+    sys.path.append(planServerDir)
+    from planserver import PlanServer
+    planServer = PlanServer(lambda: getattr(apiCallState, "phase", None), provideServerIpObjectKeys)
+
+
+# loading the objects of inventory cache to simulated server of --plan mode
+# ---
+# returns: nothing
+def loadPlanInventory():
+    cachedEntry = loadInventoryCache(file_name_inventory).get(provideInventoryCacheKey())
+    if cachedEntry is None:
+        printStatus(None, "inventory cache does not contain objects of server, the plan is made for empty server")
+        return
+    printStatus(None, "REPORT: " + str(planServer.loadInventory(cachedEntry)) +
+                " objects of server are loaded from inventory cache")
+
+
+# printing the number of requests by phases and the projected time of run in --plan mode
+# ---
+# returns: nothing
+def printPlanReport():
+    planLatencies = {"add": 100, "set": 100, "delete": 100, "show": 50, "publish": 3000}
+    for planLatency in args.plan_latency.split(","):
+        if "=" in planLatency:
+            command, latency = planLatency.split("=", 1)
+            planLatencies[command.strip()] = float(latency)
+    printStatus(None, "==========")
+    printStatus(None, "REPORT: plan of requests by phases")
+    totalCount = 0
+    totalTime = 0.0
+    for phase, phaseCount, verbsCounts, phaseTime, phaseCalls in planServer.provideReport(args.plan_rtt, planLatencies):
+        totalCount += phaseCount
+        totalTime += phaseTime
+        printStatus(None, "REPORT: " + phase + ": " + str(phaseCount) + " requests (" +
+                    ", ".join(verb + ": " + str(verbsCounts.get(verb, 0))
+                              for verb in ("add", "set", "show", "publish", "other")) +
+                    "), " + "{:.1f}".format(phaseTime) + " seconds")
+        for command in sorted(phaseCalls):
+            printStatus(None, "\t" + command + ": " + str(phaseCalls[command]))
+    printStatus(None, "REPORT: " + str(totalCount) + " requests, projected time " + "{:.1f}".format(totalTime) +
+                " seconds if requests are sent one by one; --workers and --in-flight can reduce it")
+
+
+# providing the client object: the client of simulated server in --plan mode, the client of server otherwise
+# clientArgs - the arguments of client
+# ---
+# returns: client object
+def provideApiClient(clientArgs):
+    if args.plan:
+        from planserver import PlanClient
+        return PlanClient(clientArgs, planServer)
+    return APIClient(clientArgs)
 
 
 # START
@@ -1250,23 +3856,143 @@ args_parser.add_argument('-c', '--context', default='web_api',
                          help="Context of WebAPI.")
 args_parser.add_argument('-t', '--threshold', type=int, default=100,
                          help="Parameter specifies maximum number of Check Point objects/rules to add before starting publish operation. Default: 100")
+args_parser.add_argument('--rules-threshold', type=int, default=1000,
+                         help="Parameter specifies maximum number of access/NAT rules to add before starting publish "
+                              "operation. Default: 1000")
+args_parser.add_argument('--publish-size', type=int, default=1024,
+                         help="Maximum size in KB of changes in session before starting publish operation. "
+                              "0 - the size is not limited. Default: 1024")
+args_parser.add_argument('--publish-interval', type=int, default=300,
+                         help="Maximum time in seconds between the first change in session which is not published and "
+                              "publish operation. 0 - the time is not limited. Default: 300")
 args_parser.add_argument('-d', '--domain', default=None,
                          help="The name/uid of the domain you want to log into in an MDS environment.")
+args_parser.add_argument('--domains', default=None,
+                         help="Comma separated names of domains in an MDS environment. The JSON file is parsed once and "
+                              "each domain is processed by separate process with its own log.")
+args_parser.add_argument('--domains-manifest', default=None,
+                         help="The name of file which lines contain <file>,<domain> for processing different JSON files "
+                              "in different domains of an MDS environment. Each JSON file is parsed once.")
+args_parser.add_argument('--domains-workers', type=int, default=4,
+                         help="Number of domains which are processed in parallel by --domains or --domains-manifest. "
+                              "Default: 4")
 args_parser.add_argument('--replace-from-global-first', default="false",
                          help="The argument indicates that SmartConnector should use 'Global' objects at first, by default it uses 'Local' objects. [true, false]")
 args_parser.add_argument('--reuse-group-name', default="false",
                          help="The argument indicates that SmartConnector should use reuse the group by name instead "
                               "of creating a new group, take cautions. [true, false]")
+args_parser.add_argument('--inventory-cache', default="false",
+                         help="The argument indicates that SmartConnector should keep the objects which are read from "
+                              "server in the file smartconnector_inventory.json and revalidate them by the changes "
+                              "which are published since the previous run. [true, false]")
+args_parser.add_argument('--preload-names', default="false",
+                         help="The argument indicates that SmartConnector should read the names of all objects from "
+                              "server before processing, so the names are adjusted without failed requests. [true, false]")
+args_parser.add_argument('-w', '--workers', type=int, default=1,
+                         help="Number of sessions which process independent objects types in parallel. Default: 1")
+args_parser.add_argument('-b', '--batch-size', type=int, default=0,
+                         help="Maximum number of hosts, networks, ranges, services or access rules which are added by one "
+                              "add-objects-batch request. Default: 0 - objects are added one by one")
+args_parser.add_argument('--in-flight', type=int, default=1,
+                         help="Maximum number of requests which are sent by one session at the same time. Hosts and "
+                              "networks with different IPs and names are added concurrently if it is more than 1. "
+                              "Default: 1")
+args_parser.add_argument('--server-in-flight', type=int, default=0,
+                         help="Maximum number of requests which are sent by all sessions at the same time. "
+                              "Default: 0 - the number is not limited")
+args_parser.add_argument('--plan', action="store_true",
+                         help="Count the requests which would be sent to server by phases and project the time of run "
+                              "without connecting to server. The objects of server are taken from inventory cache as they "
+                              "were at the last run if --inventory-cache is set, other objects are considered absent.")
+args_parser.add_argument('--plan-rtt', type=float, default=50,
+                         help="Round trip time to server in milliseconds for --plan. Default: 50")
+args_parser.add_argument('--plan-latency', default="",
+                         help="Comma separated latencies of commands at server in milliseconds for --plan, the command "
+                              "or its verb can be set, e.g. add-host=80,show=40,publish=5000. "
+                              "Default: add=100,set=100,delete=100,show=50,publish=3000")
+args_parser.add_argument('--members-chunk-size', type=int, default=100,
+                         help="Maximum number of members which are added to group by one request. Default: 100")
+args_parser.add_argument('--resume', action="store_true",
+                         help="Resume the interrupted run: the objects and rules which are recorded in the journal "
+                              "of the previous run with the same file are skipped.")
+args_parser.add_argument('--stream-input', action="store_true",
+                         help="Read the JSON file incrementally after login: hosts, networks, ranges, services and other "
+                              "independent objects are processed while the file is read, the rest objects are kept in "
+                              "temporary files. Peak memory usage does not depend on the size of file.")
+args_parser.add_argument('--stream-queue-size', type=int, default=1000,
+                         help="Maximum number of read objects which wait for processing when --stream-input is set. "
+                              "Default: 1000")
+args_parser.add_argument('--use-server-snapshot', default="false",
+                         help="The argument indicates that SmartConnector should read all hosts and networks from server "
+                              "once and resolve duplicated IPs locally instead of requesting server for each object. "
+                              "[true, false]")
+
+args_parser.add_argument('--log-level', default="info",
+                         help="The verbosity of console and log file; the log file contains warnings and reports "
+                              "always. Default: info [warn, report, info, debug]")
+args_parser.add_argument('--log-format', default="text",
+                         help="The format of log file: text (.log file) or JSON record per line (.jsonl file). "
+                              "Default: text [text, jsonl]")
+args_parser.add_argument('--log-flush-interval', type=float, default=1,
+                         help="The interval in seconds of writing the buffered messages to console and log file. "
+                              "Default: 1")
+args_parser.add_argument('--api-trace',
+                         help="The name of file where each request and response is written as JSON record per line "
+                              "while the requests are sent; passwords, API keys and session ids are not written. "
+                              "The trace is disabled by default.")
+args_parser.add_argument('--api-trace-max-size', type=int, default=100,
+                         help="The size of records in megabytes which are written to trace file before the file is "
+                              "rotated: the file is renamed to <file>.1 and new file is started. "
+                              "0 - the file is not rotated. Default: 100")
+args_parser.add_argument('--api-trace-files', type=int, default=5,
+                         help="The number of trace files which are kept by rotation including the current file. "
+                              "Default: 5")
+args_parser.add_argument('--api-trace-gzip', default="false",
+                         help="The argument indicates that trace files are compressed by gzip, \".gz\" is added to "
+                              "the names of files. [true, false]")
+args_parser.add_argument('--api-trace-max-body', type=int, default=0,
+                         help="The number of characters of response which are written to trace, the longer response "
+                              "is truncated. 0 - the response is written entirely. Default: 0")
+args_parser.add_argument('--metrics', default="true",
+                         help="The argument indicates that the latency of requests is measured by commands and phases "
+                              "and the metrics are written to .metrics.json and .metrics.prom files (Prometheus text "
+                              "format) at the end of run. Default: true [true, false]")
+args_parser.add_argument('--manifest', default="true",
+                         help="The argument indicates that the result of run is written to .manifest.json file: each "
+                              "object, group members, rule and NAT rule of file is mapped to the name and uid at "
+                              "server and to the hash of its content. Default: true [true, false]")
+args_parser.add_argument('--delta',
+                         help="The manifest of previous run with the previous version of file: only the objects, group "
+                              "members, rules and NAT rules which are changed since then are added, modified or deleted "
+                              "at server, the rest are reused.")
+args_parser.add_argument('--prune-unreferenced', default="false",
+                         help="The argument indicates that the objects which are not referenced by access rules, "
+                              "inline layers and NAT rules directly or by groups are not added; the skipped objects "
+                              "are written to .pruned.json file. Default: false [true, false]")
 
 args = args_parser.parse_args()
 
-file_name_log = "smartconnector"
-if args.file != "cp_objects.json":
-    file_name_log += "_" + os.path.splitext(args.file)[0]
-file_name_log += ".log"
+file_name_log = provideLogFileName(args.file)
+file_name_journal = file_name_log + ".journal"
+file_name_metrics = file_name_log + ".metrics"
+file_name_manifest = file_name_log + ".manifest.json"
+file_name_pruned = file_name_log + ".pruned.json"
+file_name_inventory = "smartconnector_inventory.json"
+isLogJsonLines = args.log_format.lower() == "jsonl"
+logLevel = logLevels.get(args.log_level.lower(), logLevel)
+file_name_log += ".jsonl" if isLogJsonLines else ".log"
 if os.path.exists(file_name_log):
     os.remove(file_name_log)
 file_log = open(file_name_log, "w+")
+atexit.register(flushLog)
+atexit.register(closeApiTrace)
+# the file and the domain which are processed by forked process, see forkDomainsProcesses
+domainRun = None
+# the console output of forked process which is redirected to os.devnull till the end of run
+domainConsole = contextlib.ExitStack()
+# the runs of domains and the number of completed ones in main process, see forkDomainsProcesses
+domainsRuns = []
+domainsCompletedCount = 0
 
 if args.root and args.user and args.key is not None:
     print("")
@@ -1288,6 +4014,28 @@ elif not os.path.isfile(args.file):
     printStatus(None, None, "The file does not exists")
     print("")
     args_parser.print_help()
+elif (args.domains is not None or args.domains_manifest is not None) and \
+        (args.domain is not None or args.stream_input or (args.domains is not None and args.domains_manifest is not None)):
+    print("")
+    printStatus(None, None, "Command contains ambiguous parameters. Only one of --domain, --domains and --domains-manifest "
+                            "is expected, --stream-input is not expected with --domains and --domains-manifest.")
+    print("")
+    args_parser.print_help()
+elif (args.domains is not None or args.domains_manifest is not None) and not hasattr(os, "fork"):
+    print("")
+    printStatus(None, None, "smartconnector.py: error: arguments --domains and --domains-manifest are not supported on this platform")
+    print("")
+    args_parser.print_help()
+elif args.domains_manifest is not None and not os.path.isfile(args.domains_manifest):
+    print("")
+    printStatus(None, None, "Cannot find domains manifest: " + args.domains_manifest)
+    print("")
+    args_parser.print_help()
+elif args.domains_workers < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --domains-workers: must be positive number: " + str(args.domains_workers))
+    print("")
+    args_parser.print_help()
 elif args.replace_from_global_first.lower() != "true" and args.replace_from_global_first.lower() != "false":
     print("")
     printStatus(None, None,
@@ -1298,147 +4046,368 @@ elif args.reuse_group_name.lower() != "true" and args.reuse_group_name.lower() !
     print("")
     printStatus(None, None, "smartconnector.py: error: argument --reuse-group-name: invalid boolean value: '" + args.reuse_group_name + "'")
     print("")
+elif args.inventory_cache.lower() != "true" and args.inventory_cache.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --inventory-cache: invalid boolean value: '" + args.inventory_cache + "'")
+    print("")
+    args_parser.print_help()
+elif args.preload_names.lower() != "true" and args.preload_names.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --preload-names: invalid boolean value: '" + args.preload_names + "'")
+    print("")
+    args_parser.print_help()
+elif args.rules_threshold < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --rules-threshold: must be positive number: " + str(args.rules_threshold))
+    print("")
+    args_parser.print_help()
+elif args.publish_size < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --publish-size: must not be negative number: " + str(args.publish_size))
+    print("")
+    args_parser.print_help()
+elif args.publish_interval < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --publish-interval: must not be negative number: " + str(args.publish_interval))
+    print("")
+    args_parser.print_help()
+elif args.workers < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument -w/--workers: must be positive number: " + str(args.workers))
+    print("")
+    args_parser.print_help()
+elif args.batch_size < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument -b/--batch-size: must not be negative number: " + str(args.batch_size))
+    print("")
+    args_parser.print_help()
+elif args.stream_queue_size < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --stream-queue-size: must be positive number: " + str(args.stream_queue_size))
+    print("")
+    args_parser.print_help()
+elif args.in_flight < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --in-flight: must be positive number: " + str(args.in_flight))
+    print("")
+    args_parser.print_help()
+elif args.server_in_flight < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --server-in-flight: must not be negative number: " + str(args.server_in_flight))
+    print("")
+    args_parser.print_help()
+elif args.plan_rtt < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --plan-rtt: must not be negative number: " + str(args.plan_rtt))
+    print("")
+    args_parser.print_help()
+elif args.plan_latency != "" and not re.match(r'^\s*[\w-]+\s*=\s*\d+(\.\d+)?\s*(,\s*[\w-]+\s*=\s*\d+(\.\d+)?\s*)*$', args.plan_latency):
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --plan-latency: invalid value: '" + args.plan_latency + "'")
+    print("")
+    args_parser.print_help()
+elif args.plan and not os.path.isfile(os.path.join(planServerDir, "planserver.py")):
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --plan: the simulated server is not found: " + os.path.join(planServerDir, "planserver.py"))
+    print("")
+    args_parser.print_help()
+elif args.members_chunk_size < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --members-chunk-size: must be positive number: " + str(args.members_chunk_size))
+    print("")
+    args_parser.print_help()
+elif args.use_server_snapshot.lower() != "true" and args.use_server_snapshot.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --use-server-snapshot: invalid boolean value: '" + args.use_server_snapshot + "'")
+    print("")
+    args_parser.print_help()
+elif args.log_level.lower() not in logLevels:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --log-level: invalid value: '" + args.log_level + "'")
+    print("")
+    args_parser.print_help()
+elif args.log_format.lower() != "text" and args.log_format.lower() != "jsonl":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --log-format: invalid value: '" + args.log_format + "'")
+    print("")
+    args_parser.print_help()
+elif args.log_flush_interval <= 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --log-flush-interval: must be positive number: " + str(args.log_flush_interval))
+    print("")
+    args_parser.print_help()
+elif args.api_trace_max_size < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --api-trace-max-size: must not be negative number: " + str(args.api_trace_max_size))
+    print("")
+    args_parser.print_help()
+elif args.api_trace_files < 1:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --api-trace-files: must be positive number: " + str(args.api_trace_files))
+    print("")
+    args_parser.print_help()
+elif args.api_trace_gzip.lower() != "true" and args.api_trace_gzip.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --api-trace-gzip: invalid boolean value: '" + args.api_trace_gzip + "'")
+    print("")
+    args_parser.print_help()
+elif args.api_trace_max_body < 0:
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --api-trace-max-body: must not be negative number: " + str(args.api_trace_max_body))
+    print("")
+    args_parser.print_help()
+elif args.metrics.lower() != "true" and args.metrics.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --metrics: invalid boolean value: '" + args.metrics + "'")
+    print("")
+    args_parser.print_help()
+elif args.manifest.lower() != "true" and args.manifest.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --manifest: invalid boolean value: '" + args.manifest + "'")
+    print("")
+    args_parser.print_help()
+elif args.delta is not None and not os.path.isfile(args.delta):
+    print("")
+    printStatus(None, None, "Cannot find delta manifest: " + args.delta)
+    print("")
+    args_parser.print_help()
+elif args.delta is not None and (args.plan or args.stream_input or args.domains is not None or
+                                 args.domains_manifest is not None):
+    print("")
+    printStatus(None, None, "Command contains ambiguous parameters. --delta is not expected with --plan, --stream-input, "
+                            "--domains and --domains-manifest.")
+    print("")
+    args_parser.print_help()
+elif args.prune_unreferenced.lower() != "true" and args.prune_unreferenced.lower() != "false":
+    print("")
+    printStatus(None, None, "smartconnector.py: error: argument --prune-unreferenced: invalid boolean value: '" + args.prune_unreferenced + "'")
+    print("")
+    args_parser.print_help()
+elif args.prune_unreferenced.lower() == "true" and args.stream_input:
+    print("")
+    printStatus(None, None, "Command contains ambiguous parameters. --prune-unreferenced is not expected with --stream-input.")
+    print("")
+    args_parser.print_help()
 else:
     if args.replace_from_global_first.lower() == "true":
         isReplaceFromGlobalFirst = True
     elif args.replace_from_global_first.lower() == "false":
         isReplaceFromGlobalFirst = False
+    isUseServerSnapshot = args.use_server_snapshot.lower() == "true"
+    startLogBuffering()
     printStatus(None, "Input arguments:")
     printStatus(None, "root flag is set" if args.root else "root flag is not set")
     printStatus(None, "management: " + args.management)
     printStatus(None,
                 "port: " + str(args.port) if args.port is not None else "port: is not set, default value will be used")
     printStatus(None, "domain: " + args.domain if args.domain is not None else "domain: is not set")
+    printStatus(None, "domains: " + args.domains if args.domains is not None else "domains: is not set")
+    printStatus(None, "domains-manifest: " + args.domains_manifest if args.domains_manifest is not None else "domains-manifest: is not set")
+    printStatus(None, "domains-workers: " + str(args.domains_workers))
     printStatus(None, "user: " + args.user if args.user is not None else "user: is not set")
     printStatus(None, "password: ***" if args.password is not None else "password: is not set")
     printStatus(None, "API_KEY: " + args.key if args.key is not None else "API_KEY: is not set")
     printStatus(None, "file: " + args.file)
     printStatus(None, "threshold: " + str(args.threshold))
+    printStatus(None, "rules-threshold: " + str(args.rules_threshold))
+    printStatus(None, "publish-size: " + str(args.publish_size))
+    printStatus(None, "publish-interval: " + str(args.publish_interval))
+    printStatus(None, "workers: " + str(args.workers))
+    printStatus(None, "batch-size: " + str(args.batch_size))
+    printStatus(None, "in-flight: " + str(args.in_flight))
+    printStatus(None, "server-in-flight: " + str(args.server_in_flight))
+    printStatus(None, "plan flag is set" if args.plan else "plan flag is not set")
+    printStatus(None, "plan-rtt: " + str(args.plan_rtt))
+    printStatus(None, "plan-latency: " + args.plan_latency)
+    printStatus(None, "members-chunk-size: " + str(args.members_chunk_size))
     printStatus(None, "replace-from-global-first: " + str(isReplaceFromGlobalFirst))
     printStatus(None, "reuse-group-name: " + str(args.reuse_group_name).lower())
+    printStatus(None, "inventory-cache: " + str(args.inventory_cache).lower())
+    printStatus(None, "preload-names: " + str(args.preload_names).lower())
+    printStatus(None, "use-server-snapshot: " + str(isUseServerSnapshot))
+    printStatus(None, "log-level: " + args.log_level.lower())
+    printStatus(None, "log-format: " + args.log_format.lower())
+    printStatus(None, "log-flush-interval: " + str(args.log_flush_interval))
+    printStatus(None, "api-trace: " + args.api_trace if args.api_trace is not None else "api-trace: is not set")
+    printStatus(None, "api-trace-max-size: " + str(args.api_trace_max_size))
+    printStatus(None, "api-trace-files: " + str(args.api_trace_files))
+    printStatus(None, "api-trace-gzip: " + args.api_trace_gzip.lower())
+    printStatus(None, "api-trace-max-body: " + str(args.api_trace_max_body))
+    printStatus(None, "metrics: " + str(args.metrics).lower())
+    printStatus(None, "manifest: " + str(args.manifest).lower())
+    printStatus(None, "delta: " + args.delta if args.delta is not None else "delta: is not set")
+    printStatus(None, "prune-unreferenced: " + args.prune_unreferenced.lower())
+    printStatus(None, "resume flag is set" if args.resume else "resume flag is not set")
+    printStatus(None, "stream-input flag is set" if args.stream_input else "stream-input flag is not set")
+    printStatus(None, "stream-queue-size: " + str(args.stream_queue_size))
     printStatus(None, "===========================================")
-    printStatus(None, "reading and parsing processes are started for JSON file: " + args.file)
-    with open(args.file) as json_file:
-        json_data = json.load(json_file)
     # define lists of CheckPoint Objects
-    userDomains = []
-    userHosts = []
-    userNetworks = []
-    userRanges = []
-    userNetGroups = []
-    userSimpleGateways = []
-    userZones = []
-    userServicesTcp = []
-    userServicesUdp = []
-    userServicesSctp = []  # is not used in Cisco
-    userServicesIcmp = []  # is not used in Cisco
-    userServicesOther = []
-    userServicesGroups = []
-    userTimesGroups = []
-    userTimes = []
-    userPackage = None
-    userNatRules = []
-    for jsonObject in json_data:
-        if jsonObject is None or 'TypeName' not in jsonObject:
-            continue
-        if jsonObject['TypeName'] == 'CheckPoint_Domain':
-            userDomains.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_Host':
-            userHosts.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_Network':
-            userNetworks.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_Range':
-            userRanges.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_NetworkGroup' or jsonObject['TypeName'] == 'CheckPoint_GroupWithExclusion':
-            userNetGroups.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_SimpleGateway':
-            userSimpleGateways.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_Zone':
-            userZones.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_TcpService':
-            userServicesTcp.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_UdpService':
-            userServicesUdp.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_SctpService':
-            userServicesSctp.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_IcmpService':
-            userServicesIcmp.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_OtherService':
-            userServicesOther.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_ServiceGroup':
-            userServicesGroups.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_TimeGroup':
-            userTimesGroups.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_Time':
-            userTimes.append(jsonObject)
-        if jsonObject['TypeName'] == 'CheckPoint_Package':
-            userPackage = jsonObject
-        if jsonObject['TypeName'] == 'CheckPoint_NAT_Rule':
-            userNatRules.append(jsonObject)
-
-    printStatus(None, "reading and parsing processes are completed for JSON file: " + args.file)
-    client_args = None
-    if args.port is not None:
-        client_args = APIClientArgs(server=args.management, port=args.port, context=args.context, user_agent="mgmt_cli_smartmove")
+    userObjects = None
+    spilledObjects = {}
+    domainsRuns = provideDomainsRuns()
+    isMigrationCompleted = False
+    if args.stream_input:
+        printStatus(None, "JSON file will be read while the objects are processed: " + args.file)
+        userObjects = {}
+    elif len(domainsRuns) > 0:
+        domainRun, domainsCompletedCount = forkDomainsProcesses(domainsRuns)
+        if domainRun is not None:
+            # forked process: the log, the journal and the console output belong to the domain
+            args.file, args.domain, userObjects = domainRun
+            file_log.close()
+            file_name_log = provideLogFileName(args.file, args.domain)
+            file_name_journal = file_name_log + ".journal"
+            file_name_metrics = file_name_log + ".metrics"
+            file_name_manifest = file_name_log + ".manifest.json"
+            file_name_pruned = file_name_log + ".pruned.json"
+            file_name_log += ".jsonl" if isLogJsonLines else ".log"
+            file_log = open(file_name_log, "w+")
+            if args.api_trace is not None:
+                # the domain is inserted before the full suffix, e.g. trace_<domain>.jsonl.gz
+                traceDir, traceName = os.path.split(args.api_trace)
+                traceName, traceDot, traceSuffix = traceName.partition(".")
+                args.api_trace = os.path.join(traceDir, traceName + "_" + re.sub(r'[^\w.-]', "_", args.domain) +
+                                              traceDot + traceSuffix)
+            domainConsole.enter_context(contextlib.redirect_stdout(domainConsole.enter_context(open(os.devnull, "w"))))
+            # the thread which flushes the buffers is not copied by fork
+            startLogBuffering()
+            printStatus(None, "domain: " + args.domain)
+            printStatus(None, "file: " + args.file)
+            printStatus(None, "===========================================")
     else:
-        client_args = APIClientArgs(server=args.management, context=args.context, user_agent="mgmt_cli_smartmove")
-    with APIClient(client_args) as client:
-        client.debug_file = "api_calls.json"
-        printStatus(None, "checking fingerprint")
-        if client.check_fingerprint() is False:
-            printStatus(None, "Could not get the server's fingerprint - Check connectivity with the server.")
+        printStatus(None, "reading and parsing processes are started for JSON file: " + args.file)
+        userObjects = parseUserObjects(args.file)
+        printStatus(None, "reading and parsing processes are completed for JSON file: " + args.file)
+        checkUserObjectsDependencies(userObjects)
+    if userObjects is not None and not args.stream_input and args.prune_unreferenced.lower() == "true":
+        pruneUnreferencedObjects(userObjects, file_name_pruned)
+    if userObjects is not None and not args.stream_input:
+        collectContentHashes(userObjects)
+    if userObjects is not None:
+        userDomains = userObjects.get("domains", [])
+        userHosts = userObjects.get("hosts", [])
+        userNetworks = userObjects.get("networks", [])
+        userRanges = userObjects.get("ranges", [])
+        userNetGroups = userObjects.get("network-groups", [])
+        userSimpleGateways = userObjects.get("simple-gateways", [])
+        userZones = userObjects.get("zones", [])
+        userServicesTcp = userObjects.get("services-tcp", [])
+        userServicesUdp = userObjects.get("services-udp", [])
+        userServicesSctp = userObjects.get("services-sctp", [])  # is not used in Cisco
+        userServicesIcmp = userObjects.get("services-icmp", [])  # is not used in Cisco
+        userServicesOther = userObjects.get("services-other", [])
+        userServicesGroups = userObjects.get("services-groups", [])
+        userTimesGroups = userObjects.get("times-groups", [])
+        userTimes = userObjects.get("times", [])
+        userPackage = userObjects.get("package")
+        userNatRules = userObjects.get("nat-rules", [])
+    if userObjects is not None:
+        client_args = None
+        if args.port is not None:
+            client_args = APIClientArgs(server=args.management, port=args.port, context=args.context, user_agent="mgmt_cli_smartmove")
         else:
-            if args.root:
-                msg = "login as root to "
-                if args.domain is not None:
-                    msg += args.domain + " domain of local server"
-                else:
-                    msg += "local server"
-                printStatus(None, msg)
-                login_res = client.login_as_root(domain=args.domain)
-            elif args.user:
-                msg = "login as " + args.user + " to "
-                if args.domain is not None:
-                    msg += args.domain + " domain of " + args.management + " server"
-                else:
-                    msg += args.management + " server"
-                printStatus(None, msg)
-                login_res = client.login(args.user, args.password, domain=args.domain)
+            client_args = APIClientArgs(server=args.management, context=args.context, user_agent="mgmt_cli_smartmove")
+        if args.api_trace is not None:
+            openApiTrace(args.api_trace)
+        if args.plan:
+            openPlanServer()
+        with provideApiClient(client_args) as client:
+            printStatus(None, "checking fingerprint")
+            # the fingerprint may be confirmed by user, so the messages are shown before
+            flushLog()
+            if client.check_fingerprint() is False:
+                printStatus(None, "Could not get the server's fingerprint - Check connectivity with the server.")
             else:
-                msg = "login by api key to "
-                if args.domain is not None:
-                    msg += args.domain + " domain of " + args.management + " server"
+                trackSessionChanges(client)
+                login_res = loginToServer(client)
+                if login_res.success is False:
+                    printStatus(None, f"Login failed: {login_res.error_message}")
                 else:
-                    msg += args.management + " server"
-                printStatus(None, msg)
-
-                login_res = client.login_with_api_key(args.key, domain=args.domain)
-
-            if login_res.success is False:
-                printStatus(None, f"Login failed: {login_res.error_message}")
-            else:
-                printStatus(None, "")
-                mergedNetworkObjectsMap = {}
-                mergedNetworkObjectsMap.update(processDomains(client, userDomains))
-                mergedNetworkObjectsMap.update(processHosts(client, userHosts))
-                mergedNetworkObjectsMap.update(processNetworks(client, userNetworks))
-                mergedNetworkObjectsMap.update(processRanges(client, userRanges))
-                mergedNetworkObjectsMap.update(processNetGroups(client, userNetGroups, mergedNetworkObjectsMap)) 
-                mergedNetworkObjectsMap.update(processSimpleGateways(client, userSimpleGateways))
-                mergedNetworkObjectsMap.update(processZones(client, userZones))
-                mergedServicesObjectsMap = {}
-                mergedServicesObjectsMap.update(processServices(client, userServicesTcp, "tcp"))
-                mergedServicesObjectsMap.update(processServices(client, userServicesUdp, "udp"))
-                mergedServicesObjectsMap.update(processServices(client, userServicesSctp, "sctp"))
-                mergedServicesObjectsMap.update(processServices(client, userServicesIcmp, "icmp"))
-                mergedServicesObjectsMap.update(processServices(client, userServicesOther, "other"))
-                mergedServicesObjectsMap.update(
-                    processServicesGroups(client, userServicesGroups, mergedServicesObjectsMap))
-                mergedTimesMap = processTimes(client, userTimes)
-                mergedTimesGroupsMap = processTimesGroups(client, userTimesGroups, mergedTimesMap)
-                addedPackage = processPackage(client, userPackage, mergedNetworkObjectsMap, mergedServicesObjectsMap,
-                                              mergedTimesGroupsMap, mergedTimesMap)
-                processNatRules(client, addedPackage, userNatRules, mergedNetworkObjectsMap, mergedServicesObjectsMap)
-                printStatus(None, "==========")
-file_log.close()
+                    printStatus(None, "")
+                    if args.plan:
+                        if args.inventory_cache.lower() == "true":
+                            loadPlanInventory()
+                    elif args.inventory_cache.lower() == "true":
+                        openInventoryCache(client, file_name_inventory)
+                    if args.preload_names.lower() == "true":
+                        readServerNames(client)
+                    if not args.plan:
+                        openJournal(file_name_journal, args.resume)
+                    if args.delta is not None:
+                        openDelta(client, args.delta)
+                    workerClients = openWorkerSessions(client_args, args.workers - 1)
+                    if args.stream_input:
+                        printStatus(None, "reading and parsing processes are started for JSON file: " + args.file)
+                        mergedNetworkObjectsMap, mergedServicesObjectsMap, spilledObjects = \
+                            processStreamedObjects(client, workerClients, args.file)
+                        printStatus(None, "reading and parsing processes are completed for JSON file: " + args.file)
+                        userNetGroups = iterateSpilledObjects(spilledObjects, "network-groups")
+                        userServicesGroups = iterateSpilledObjects(spilledObjects, "services-groups")
+                        userTimes = iterateSpilledObjects(spilledObjects, "times")
+                        userTimesGroups = iterateSpilledObjects(spilledObjects, "times-groups")
+                        for userPackage in iterateSpilledObjects(spilledObjects, "package"):
+                            pass
+                        userNatRules = iterateSpilledObjects(spilledObjects, "nat-rules")
+                    else:
+                        # the objects of these types do not depend on each other, so they can be processed in parallel
+                        networkObjectsPhases = [
+                            (processDomains, (userDomains,)),
+                            (processHosts, (userHosts,)),
+                            (processNetworks, (userNetworks,)),
+                            (processRanges, (userRanges,)),
+                            (processSimpleGateways, (userSimpleGateways,)),
+                            (processZones, (userZones,))
+                        ]
+                        servicesPhases = [
+                            (processServices, (userServicesTcp, "tcp")),
+                            (processServices, (userServicesUdp, "udp")),
+                            (processServices, (userServicesSctp, "sctp")),
+                            (processServices, (userServicesIcmp, "icmp")),
+                            (processServices, (userServicesOther, "other"))
+                        ]
+                        phasesResults = runIndependentPhases(client, workerClients, networkObjectsPhases + servicesPhases)
+                        mergedNetworkObjectsMap = mergePhasesMaps(phasesResults[:len(networkObjectsPhases)])
+                        mergedServicesObjectsMap = mergePhasesMaps(phasesResults[len(networkObjectsPhases):])
+                    closeWorkerSessions(workerClients)
+                    mergedNetworkObjectsMap.update(processNetGroups(client, userNetGroups, mergedNetworkObjectsMap))
+                    mergedServicesObjectsMap.update(
+                        processServicesGroups(client, userServicesGroups, mergedServicesObjectsMap))
+                    mergedTimesMap = processTimes(client, userTimes)
+                    mergedTimesGroupsMap = processTimesGroups(client, userTimesGroups, mergedTimesMap)
+                    addedPackage = processPackage(client, userPackage, mergedNetworkObjectsMap, mergedServicesObjectsMap,
+                                                  mergedTimesGroupsMap, mergedTimesMap)
+                    processNatRules(client, addedPackage, userNatRules, mergedNetworkObjectsMap, mergedServicesObjectsMap)
+                    if args.delta is not None:
+                        deleteDeltaObjects(client, [mergedNetworkObjectsMap, mergedServicesObjectsMap, mergedTimesMap,
+                                                    mergedTimesGroupsMap])
+                    publishUpdate(client, True)
+                    printStatus(None, "==========")
+                    printStatus(None, "REPORT: " + str(publishStatistics["count"]) + " publishes took " +
+                                "{:.1f}".format(publishStatistics["time"]) + " seconds")
+                    if args.plan:
+                        printPlanReport()
+                    isMigrationCompleted = True
+    for spillFile in spilledObjects.values():
+        spillFile.close()
+    if inventoryCacheEntry is not None:
+        saveInventoryCache(file_name_inventory)
+    if args.metrics.lower() == "true" and not args.plan and len(apiCallsMetrics) > 0:
+        writeMetrics(file_name_metrics, isMigrationCompleted)
+    if args.manifest.lower() == "true" and file_journal is not None and not args.stream_input:
+        writeManifest(file_name_manifest, isMigrationCompleted)
+if file_journal is not None:
+    file_journal.close()
+closeApiTrace()
+with printLock:
+    writeLogBuffers(True)
+    file_log.close()
+if domainRun is not None:
+    # the forked process ends here and does not return to the code which has started the run (e.g. benchmark),
+    # the files are closed above, the console output is restored
+    domainConsole.close()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(0 if isMigrationCompleted else 1)
+if domainsCompletedCount < len(domainsRuns):
+    sys.exit(1)
 # END
\ No newline at end of file